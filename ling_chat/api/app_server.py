@@ -9,7 +9,11 @@ from fastapi import FastAPI, Request, Response
 
 from ling_chat.api.routes_manager import RoutesManager
 from ling_chat.core.logger import logger
+from ling_chat.core.service_manager import service_manager
+from ling_chat.core.TTS.voice_janitor import voice_janitor
 from ling_chat.database import init_db
+from ling_chat.database.compaction import message_compactor
+from ling_chat.database.database import close_db_connections
 from ling_chat.database.character_model import CharacterModel
 from ling_chat.utils.runtime_path import user_data_path
 
@@ -23,8 +27,18 @@ async def lifespan(app: FastAPI):
         logger.info("正在同步游戏角色数据...")
         CharacterModel.sync_characters_from_game_data(user_data_path / "game_data")
 
+        voice_janitor.start()
+        message_compactor.start()
+
         yield
 
+        ai_service = service_manager.ai_service
+        if ai_service is not None and ai_service.rag_manager is not None:
+            await ai_service.rag_manager.force_save_memory()
+        await voice_janitor.stop()
+        await message_compactor.stop()
+        close_db_connections()
+
     except (ImportError, Exception) as e:
         logger.error(f"应用启动时发生严重错误: {e}", exc_info=True)
         logger.stop_loading_animation(success=False, final_message="应用加载失败，程序将退出")
@@ -38,7 +52,8 @@ RoutesManager(app)
 @app.middleware("http")
 async def add_no_cache_headers(request: Request, call_next) -> Response:
     response = await call_next(request)
-    if not request.url.path.startswith("/api"):  # 排除API路由
+    # 排除API路由和语音文件（语音文件由AudioStaticFiles设置缓存头）
+    if not request.url.path.startswith(("/api", "/audio/")):
         response.headers.update(
             {"Cache-Control": "no-cache, no-store, must-revalidate", "Pragma": "no-cache", "Expires": "0"})
     return response
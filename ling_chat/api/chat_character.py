@@ -3,8 +3,7 @@ from pathlib import Path
 from fastapi import APIRouter, Body, HTTPException
 from fastapi.responses import FileResponse, JSONResponse
 from ling_chat.core.service_manager import service_manager
-from ling_chat.database.character_model import CharacterModel
-from ling_chat.database.user_model import UserModel
+from ling_chat.database.async_repository import character_repository, run_in_db_thread, user_repository
 from ling_chat.utils.function import Function
 from ling_chat.core.logger import logger
 from ling_chat.utils.runtime_path import user_data_path
@@ -15,7 +14,7 @@ router = APIRouter(prefix="/api/v1/chat/character", tags=["Chat Character"])
 @router.post("/refresh_characters")
 async def refresh_characters():
     try:
-        CharacterModel.sync_characters_from_game_data(user_data_path / "game_data")
+        await character_repository.sync_characters_from_game_data(user_data_path / "game_data")
         return {"success": True}
     except Exception as e:
         logger.error(f"刷新人物列表请求失败: {str(e)}")
@@ -68,12 +67,12 @@ async def select_character(
 ):
     try:
         # 1. 验证角色是否存在
-        character = CharacterModel.get_character_by_id(character_id=character_id)
+        character = await character_repository.get_character_by_id(character_id=character_id)
         if not character:
             raise HTTPException(status_code=404, detail="角色不存在")
 
         # 2. 切换AI服务角色
-        character_settings = CharacterModel.get_character_settings_by_id(character_id=character_id)
+        character_settings = await character_repository.get_character_settings_by_id(character_id=character_id)
         if character_settings is None: return HTTPException(status_code=500, detail="角色不存在")
 
         character_settings["character_id"] = character_id
@@ -81,7 +80,7 @@ async def select_character(
         service_manager.ai_service.reset_memory()
 
         # 2.5 更新用户的最后一次对话角色
-        UserModel.update_user_character(
+        await user_repository.update_user_character(
             user_id=user_id,
             character_id=character_id
         )
@@ -102,16 +101,19 @@ async def select_character(
 @router.get("/get_all_characters")
 async def get_all_characters():
     try:
-        db_chars = CharacterModel.get_all_characters()
+        db_chars = await character_repository.get_all_characters()
 
         if not db_chars:
             return {"data": [], "message": "未找到任何角色"}
 
-        characters = []
-        for char in db_chars:
-            settings_path = os.path.join(char['resource_path'], 'settings.txt')
-            settings = Function.parse_enhanced_txt(settings_path)
+        # 读取各角色的设置文件同样是阻塞IO，一并放到线程池中
+        settings_list = await run_in_db_thread(
+            lambda: [Function.parse_enhanced_txt(os.path.join(char['resource_path'], 'settings.txt'))
+                     for char in db_chars]
+        )
 
+        characters = []
+        for char, settings in zip(db_chars, settings_list):
             # 返回相对路径而不是完整路径
             avatar_relative_path = os.path.join(
                 os.path.basename(char['resource_path']),
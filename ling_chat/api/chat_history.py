@@ -1,8 +1,10 @@
 from fastapi import APIRouter, HTTPException, Request
 from datetime import datetime
-from ling_chat.database.user_model import UserModel, UserConversationModel
-from ling_chat.database.character_model import CharacterModel
-from ling_chat.database.conversation_model import ConversationModel
+from typing import Optional
+from ling_chat.database.async_repository import (
+    character_repository, conversation_repository, user_conversation_repository, user_repository
+)
+from ling_chat.core.logger import logger
 from ling_chat.core.service_manager import service_manager
 from ling_chat.utils.function import Function
 
@@ -11,7 +13,7 @@ router = APIRouter(prefix="/api/v1/chat/history", tags=["Chat History"])
 @router.get("/list")
 async def list_user_conversations(user_id: int, page: int = 1, page_size: int = 10):
     try:
-        result = UserConversationModel.get_user_conversations(user_id, page, page_size)
+        result = await user_conversation_repository.get_user_conversations(user_id, page, page_size)
         return {
             "code": 200,
             "data": result
@@ -23,18 +25,35 @@ async def list_user_conversations(user_id: int, page: int = 1, page_size: int =
             "error": str(e)
         }
     
+@router.get("/search")
+async def search_user_messages(user_id: int, query: str, page: int = 1, page_size: int = 20):
+    """在用户的所有对话中全文搜索消息"""
+    try:
+        page_size = max(1, min(page_size, 100))
+        result = await user_conversation_repository.search_messages(user_id, query, max(1, page), page_size)
+        return {
+            "code": 200,
+            "data": result
+        }
+    except Exception as e:
+        return {
+            "code": 500,
+            "msg": "Failed to search messages",
+            "error": str(e)
+        }
+
 @router.get("/load")
 async def load_user_conversations(user_id: int, conversation_id: int):
     try:
-        result = ConversationModel.get_conversation_messages(conversation_id=conversation_id)
-        character_id = ConversationModel.get_conversation_character(conversation_id=conversation_id)
-        if(result != None):
-            UserModel.update_user_character(user_id=user_id, character_id=character_id)
-            settings = CharacterModel.get_character_settings_by_id(character_id=character_id)
+        result = await conversation_repository.get_conversation_messages(conversation_id=conversation_id)
+        character_id = await conversation_repository.get_conversation_character(conversation_id=conversation_id)
+        if result:
+            await user_repository.update_user_character(user_id=user_id, character_id=character_id)
+            settings = await character_repository.get_character_settings_by_id(character_id=character_id)
             settings["character_id"] = character_id
             service_manager.ai_service.import_settings(settings)
-            service_manager.ai_service.load_memory(result)
-            print("成功调用记忆存储")
+            service_manager.ai_service.load_memory(result, conversation_id=conversation_id)
+            logger.info(f"已加载对话 {conversation_id} 的记忆，共 {len(result)} 条消息")
             return {
                 "code": 200,
                 "data": "success"
@@ -47,14 +66,148 @@ async def load_user_conversations(user_id: int, conversation_id: int):
             }
         
     except Exception as e:
-        print("创建conversation的时候出错")
-        print(str(e))
+        logger.error(f"加载对话 {conversation_id} 时出错: {e}")
         return {
             "code": 500,
             "msg": "Failed to load user conversations",
             "error": str(e)
         }
     
+@router.get("/messages")
+async def list_conversation_messages(conversation_id: int, before_id: Optional[int] = None, limit: int = 50):
+    """
+    分页获取对话消息，用于历史记录视图
+    首次请求不传 before_id 获取最新的一页，之后用返回的 next_before_id 向前加载
+    """
+    try:
+        limit = max(1, min(limit, 500))
+        result = await conversation_repository.get_conversation_messages_page(
+            conversation_id=conversation_id, before_id=before_id, limit=limit
+        )
+        return {
+            "code": 200,
+            "data": result
+        }
+    except Exception as e:
+        return {
+            "code": 500,
+            "msg": "Failed to fetch conversation messages",
+            "error": str(e)
+        }
+
+async def _reload_active_conversation(conversation_id: int) -> None:
+    """当前加载的就是这个对话时，按切换后的分支重新加载记忆"""
+    ai_service = service_manager.ai_service
+    if ai_service and ai_service.conversation_id == conversation_id:
+        messages = await conversation_repository.get_conversation_messages(conversation_id=conversation_id)
+        ai_service.load_memory(messages, conversation_id=conversation_id)
+
+@router.get("/branch/children")
+async def list_message_children(message_id: int):
+    """获取从某条消息分出的所有分支（例如同一条用户消息的多次回复）"""
+    try:
+        children = await conversation_repository.get_message_children(message_id=message_id)
+        return {
+            "code": 200,
+            "data": children
+        }
+    except Exception as e:
+        return {
+            "code": 500,
+            "msg": "Failed to fetch message children",
+            "error": str(e)
+        }
+
+@router.get("/branch/leaves")
+async def list_branch_leaves(conversation_id: int):
+    """获取对话中每个分支的末尾消息"""
+    try:
+        leaves = await conversation_repository.get_branch_leaves(conversation_id=conversation_id)
+        return {
+            "code": 200,
+            "data": leaves
+        }
+    except Exception as e:
+        return {
+            "code": 500,
+            "msg": "Failed to fetch conversation branches",
+            "error": str(e)
+        }
+
+@router.post("/branch/fork")
+async def fork_conversation_branch(request: Request):
+    """
+    从某条消息分出新分支（重新生成回复、修改之前的消息）
+    请求体格式:
+    {
+        "conversation_id": int,
+        "parent_id": int | null,
+        "messages": [{"role": str, "content": str}, ...]
+    }
+    """
+    try:
+        payload = await request.json()
+        conversation_id = payload.get("conversation_id")
+        messages = payload.get("messages")
+        if not conversation_id or not messages:
+            raise HTTPException(status_code=400, detail="缺少必要参数(conversation_id或messages)")
+
+        message_ids = await conversation_repository.fork_conversation(
+            conversation_id=conversation_id,
+            parent_id=payload.get("parent_id"),
+            messages=messages
+        )
+        await _reload_active_conversation(conversation_id)
+        return {
+            "code": 200,
+            "data": {
+                "conversation_id": conversation_id,
+                "message_ids": message_ids
+            }
+        }
+    except HTTPException as he:
+        raise he
+    except ValueError as ve:
+        raise HTTPException(status_code=404, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"创建分支失败: {str(e)}")
+
+@router.post("/branch/switch")
+async def switch_conversation_branch(request: Request):
+    """
+    切换到包含指定消息的分支（沿该消息最新的后续消息走到末尾）
+    请求体格式:
+    {
+        "conversation_id": int,
+        "message_id": int
+    }
+    """
+    try:
+        payload = await request.json()
+        conversation_id = payload.get("conversation_id")
+        message_id = payload.get("message_id")
+        if not conversation_id or not message_id:
+            raise HTTPException(status_code=400, detail="缺少必要参数(conversation_id或message_id)")
+
+        last_message_id = await conversation_repository.switch_branch(
+            conversation_id=conversation_id,
+            message_id=message_id
+        )
+        await _reload_active_conversation(conversation_id)
+        return {
+            "code": 200,
+            "data": {
+                "conversation_id": conversation_id,
+                "last_message_id": last_message_id
+            }
+        }
+    except HTTPException as he:
+        raise he
+    except ValueError as ve:
+        raise HTTPException(status_code=404, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"切换分支失败: {str(e)}")
+
 @router.post("/create")  # 改为POST方法
 async def create_user_conversations(request: Request):
     try:
@@ -67,21 +220,23 @@ async def create_user_conversations(request: Request):
         if not user_id or not title:
             raise HTTPException(status_code=400, detail="缺少必要参数")
         
-        # 获取消息记忆
-        messages = service_manager.ai_service.get_memory()
+        # 获取消息记忆（取快照，创建过程中新产生的消息之后会自动追加）
+        messages = list(service_manager.ai_service.get_memory())
         if not messages:  # 处理空消息情况
-            print("消息记录是空的，请检查错误！！！！！！！！")
+            logger.warning("创建对话时消息记录是空的")
 
         # 获取这个对话的角色
         character_id = service_manager.ai_service.character_id
         
         # 创建对话
-        conversation_id = ConversationModel.create_conversation(
+        conversation_id = await conversation_repository.create_conversation(
             user_id=user_id,
             messages=messages,
             character_id=character_id,
             title=title
         )
+        # 之后每轮对话结束时只追加新消息
+        service_manager.ai_service.bind_conversation(conversation_id, len(messages))
         
         return {
             "code": 200,
@@ -94,8 +249,7 @@ async def create_user_conversations(request: Request):
     except HTTPException as he:
         raise he  # 重新抛出已处理的HTTP异常
     except Exception as e:
-        print("创建conversation的时候出错")
-        print(str(e))
+        logger.error(f"创建对话时出错: {e}")
         raise HTTPException(
             status_code=500,
             detail=f"创建对话失败: {str(e)}"
@@ -123,20 +277,25 @@ async def save_user_conversation(request: Request):
         if not user_id or not conversation_id:
             raise HTTPException(status_code=400, detail="缺少必要参数(user_id或conversation_id)")
         
-        # 获取当前消息记忆
-        messages = service_manager.ai_service.get_memory()
+        ai_service = service_manager.ai_service
+        messages = list(ai_service.get_memory())
         if not messages:
-            print("警告: 消息记录是空的，将清空对话内容")
+            logger.warning(f"保存对话 {conversation_id} 时消息记录是空的，将清空对话内容")
         
-        # 更新对话
-        ConversationModel.change_conversation_messages(
-            conversation_id=conversation_id,
-            messages=messages
-        )
+        if ai_service.conversation_id == int(conversation_id):
+            # 当前记忆就是这个对话：只追加尚未保存的消息
+            await ai_service.persist_new_messages()
+        else:
+            # 保存到另一个对话：整体替换，之后自动追加到该对话
+            await conversation_repository.change_conversation_messages(
+                conversation_id=conversation_id,
+                messages=messages
+            )
+            ai_service.bind_conversation(conversation_id, len(messages))
         
         # 如果需要更新标题
         if title:
-            ConversationModel.update_conversation_title(conversation_id, title)
+            await conversation_repository.update_conversation_title(conversation_id, title)
         
         return {
             "code": 200,
@@ -178,7 +337,7 @@ async def delete_user_conversation(request: Request):
             raise HTTPException(status_code=400, detail="缺少必要参数(user_id或conversation_id)")
         
         # 执行删除
-        deleted = ConversationModel.delete_conversation(conversation_id)
+        deleted = await conversation_repository.delete_conversation(conversation_id)
         
         if not deleted:
             raise HTTPException(status_code=404, detail="对话不存在或已被删除")
@@ -215,20 +374,22 @@ async def process_log_file(request: Request):
             raise HTTPException(status_code=400, detail="日志文件未包含有效对话")
         
         # 添加到记忆系统
-        service_manager.ai_service.load_memory(messages)
+        ai_service = service_manager.ai_service
+        ai_service.load_memory(messages)
         
-        # 同时创建新对话记录（可选）
+        # 同时创建新对话记录，归属当前角色
         title = f"导入对话 {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-        conversation_id = ConversationModel.create_conversation(
+        conversation_id = await conversation_repository.create_conversation(
             user_id=user_id,
             messages=messages,
+            character_id=ai_service.character_id,
             title=title
         )
+        # 与 /create 相同，之后每轮对话结束时只追加新消息
+        ai_service.bind_conversation(conversation_id, len(messages))
 
-        print(f"导入对话为 {dialog_datetime} 的时间成功")
-        print(f"导入的信息是 {messages}")
+        logger.info(f"导入对话为 {dialog_datetime} 的时间成功，共 {len(messages)} 条消息")
 
-        
         return {
             "success": True,
             "processed_count": len(messages),
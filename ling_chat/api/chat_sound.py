@@ -1,22 +1,55 @@
-import os
-from pathlib import Path
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+import hashlib
 
-from ling_chat.utils.runtime_path import temp_path
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+
+from ling_chat.core.TTS.audio_memory_cache import audio_memory_cache
+from ling_chat.utils.runtime_path import get_voice_path
 from ling_chat.core.logger import logger
+from ling_chat.core.service_manager import service_manager
+from ling_chat.api.frontend_routes import AudioStaticFiles
 
 router = APIRouter(prefix="/api/v1/chat/sound", tags=["Chat Sound"])
 
 @router.get("/get_voice/{voice_file}")
-async def get_specific_sound(voice_file: str):
+async def get_specific_sound(voice_file: str, request: Request):
     
-    voice_dir = Path(os.environ.get("TEMP_VOICE_DIR", temp_path / "audio"))
+    voice_dir = get_voice_path()
 
     file_path = voice_dir / voice_file
 
     logger.debug("语音寻找的路径是" + str(file_path))
-    if not file_path.exists():
+    media_type = AudioStaticFiles.AUDIO_MEDIA_TYPES.get(file_path.suffix.lower(), "application/octet-stream")
+    cached = audio_memory_cache.get(voice_file)
+    if cached is not None:
+        etag = hashlib.md5(cached).hexdigest()
+    elif file_path.exists():
+        stat = file_path.stat()
+        etag = hashlib.md5(f"{stat.st_mtime}-{stat.st_size}".encode()).hexdigest()
+    else:
         raise HTTPException(status_code=404, detail="Voice not found")
-    
-    return FileResponse(file_path)
+
+    # 文件名带uuid，内容不会变化，允许浏览器长期缓存
+    headers = {"Cache-Control": AudioStaticFiles.cache_control(), "ETag": f'"{etag}"'}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    if cached is not None:
+        return Response(content=cached, media_type=media_type, headers=headers)
+    return FileResponse(file_path, media_type=media_type, headers=headers)
+
+
+@router.get("/tts_health")
+async def get_tts_health():
+    """查看TTS服务及各适配器熔断器状态"""
+    ai_service = service_manager.ai_service
+    if not ai_service:
+        raise HTTPException(status_code=404, detail="AIService not found")
+
+    tts_provider = ai_service.voice_maker.tts_provider
+    return {
+        "code": 200,
+        "data": {
+            "tts_type": ai_service.voice_maker.tts_type,
+            **tts_provider.get_health()
+        }
+    }
@@ -1,10 +1,11 @@
 from fastapi import APIRouter
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 import os
 from pathlib import Path
 
-from ling_chat.utils.runtime_path import static_path, temp_path
+from ling_chat.core.TTS.audio_memory_cache import audio_memory_cache
+from ling_chat.utils.runtime_path import static_path, get_voice_path
 
 frontend_path = static_path / "frontend"
 
@@ -27,6 +28,36 @@ class NoCacheStaticFiles(StaticFiles):
         response.headers["Expires"] = "0"
         return response
 
+# ✅ 语音文件StaticFiles（文件名带uuid，内容不会变化，允许浏览器长期缓存）
+class AudioStaticFiles(StaticFiles):
+    AUDIO_MEDIA_TYPES = {
+        ".wav": "audio/wav",
+        ".ogg": "audio/ogg",
+        ".opus": "audio/ogg",
+        ".aac": "audio/aac",
+        ".mp3": "audio/mpeg",
+        ".flac": "audio/flac",
+    }
+
+    async def get_response(self, path: str, scope):
+        media_type = self.AUDIO_MEDIA_TYPES.get(os.path.splitext(path)[1].lower())
+        # 优先从内存缓存返回最近合成的语音，命中时不访问磁盘
+        cached = audio_memory_cache.get(path)
+        if cached is not None:
+            response = Response(content=cached, media_type=media_type or "application/octet-stream")
+        else:
+            response = await super().get_response(path, scope)
+        if media_type:
+            response.headers["Content-Type"] = media_type
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = self.cache_control()
+        return response
+
+    @staticmethod
+    def cache_control() -> str:
+        max_age = int(os.environ.get("VOICE_CACHE_MAX_AGE", 86400))
+        return f"public, max-age={max_age}, immutable"
+
 # ✅ 托管所有静态资源（保持原有路径结构）
 # 注意：这里改为返回 StaticFiles 实例，由上层 app.mount() 调用
 def get_static_files():
@@ -34,9 +65,9 @@ def get_static_files():
 
 
 def get_audio_files():
-    audio_path = Path(os.environ.get("TEMP_VOICE_DIR", temp_path / "audio"))
-    audio_path.mkdir(exist_ok=True)
-    return NoCacheStaticFiles(directory=audio_path, html=False)
+    audio_path = get_voice_path()
+    audio_path.mkdir(parents=True, exist_ok=True)
+    return AudioStaticFiles(directory=audio_path, html=False)
 
 # ✅ 保持原有HTML路由
 def get_file_response(file_path: str) -> FileResponse:
@@ -1,10 +1,25 @@
-from .tts_provider import TTS
-from .vits_adapter import VitsAdapter
-from .sbv2_adapter import SBV2Adapter
-from .gsv_adapter import GPTSoVITSAdapter
-from .bv2_adapter import BV2Adapter
-from .sbv2api_adapter import SBV2APIAdapter
-from .aivis_adapter import AIVISAdapter
-from .index_adpater import IndexTTSAdapter
-
-__all__ = ['TTS', 'VitsAdapter', 'SBV2Adapter', 'GPTSoVITSAdapter', 'BV2Adapter', 'SBV2APIAdapter', 'AIVISAdapter', 'IndexTTSAdapter']
\ No newline at end of file
+import importlib
+
+# 适配器按需导入，避免启动时加载所有TTS后端
+_LAZY_IMPORTS = {
+    'TTS': '.tts_provider',
+    'VitsAdapter': '.vits_adapter',
+    'SBV2Adapter': '.sbv2_adapter',
+    'GPTSoVITSAdapter': '.gsv_adapter',
+    'BV2Adapter': '.bv2_adapter',
+    'SBV2APIAdapter': '.sbv2api_adapter',
+    'AIVISAdapter': '.aivis_adapter',
+    'IndexTTSAdapter': '.index_adpater',
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+__all__ = ['TTS', 'VitsAdapter', 'SBV2Adapter', 'GPTSoVITSAdapter', 'BV2Adapter', 'SBV2APIAdapter', 'AIVISAdapter', 'IndexTTSAdapter']
@@ -0,0 +1,75 @@
+import os
+import threading
+from collections import OrderedDict
+
+from ling_chat.core.logger import logger
+
+
+class AudioMemoryCache:
+    """
+    最近合成语音的内存缓存（按总字节数限制的LRU环形缓冲）
+
+    /audio 路由优先从这里读取语音，命中时完全不需要访问磁盘。
+    启用 VOICE_MEMORY_ONLY 后语音只保存在内存中，不再写入磁盘。
+    """
+
+    def __init__(self):
+        self._items: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.max_bytes = -1
+        self.memory_only = False
+
+    def _load_config(self) -> None:
+        """读取配置（需在环境变量加载后调用，首次使用时自动读取）"""
+        self.max_bytes = int(float(os.environ.get("VOICE_MEMORY_CACHE_MB", 0)) * 1024 * 1024)
+        self.memory_only = os.environ.get("VOICE_MEMORY_ONLY", "false").lower() == "true"
+        if self.memory_only and self.max_bytes <= 0:
+            logger.warning("VOICE_MEMORY_ONLY需要同时设置VOICE_MEMORY_CACHE_MB，已回退为写入磁盘")
+            self.memory_only = False
+
+    @property
+    def enabled(self) -> bool:
+        if self.max_bytes < 0:
+            self._load_config()
+        return self.max_bytes > 0
+
+    def put(self, file_path: str, audio_data: bytes) -> bool:
+        """
+        缓存一个语音文件，超出容量时淘汰最久未使用的条目
+
+        :return: 是否成功放入缓存（未启用或单个文件超过容量时为False）
+        """
+        if not self.enabled or len(audio_data) > self.max_bytes:
+            return False
+        name = os.path.basename(file_path)
+        with self._lock:
+            old = self._items.pop(name, None)
+            if old is not None:
+                self.total_bytes -= len(old)
+            self._items[name] = audio_data
+            self.total_bytes += len(audio_data)
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.total_bytes -= len(evicted)
+        return True
+
+    def get(self, file_name: str) -> bytes | None:
+        """按文件名读取缓存的语音"""
+        if not self.enabled:
+            return None
+        name = os.path.basename(file_name)
+        with self._lock:
+            data = self._items.get(name)
+            if data is not None:
+                self._items.move_to_end(name)
+            return data
+
+    def exists(self, file_path: str) -> bool:
+        """语音文件是否可用（内存中或磁盘上）"""
+        if self.get(file_path) is not None:
+            return True
+        return os.path.exists(file_path)
+
+
+audio_memory_cache = AudioMemoryCache()
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from ling_chat.core.logger import logger
+
+
+class AudioTranscoder:
+    """
+    语音合成后的可选转码阶段
+
+    TTS后端大多只返回体积较大的wav，远程浏览器在慢速网络下加载很慢。
+    启用后使用ffmpeg在线程池中把音频编码为opus/aac/mp3等压缩格式，
+    通常可以把每条回复的音频体积减少到原来的十分之一左右。
+    """
+
+    # 目标格式 -> (文件后缀, ffmpeg编码参数)
+    FORMATS: dict[str, tuple[str, list[str]]] = {
+        "opus": ("ogg", ["-c:a", "libopus", "-b:a", "32k", "-f", "ogg"]),
+        "ogg": ("ogg", ["-c:a", "libopus", "-b:a", "32k", "-f", "ogg"]),
+        "aac": ("aac", ["-c:a", "aac", "-b:a", "64k", "-f", "adts"]),
+        "mp3": ("mp3", ["-c:a", "libmp3lame", "-b:a", "64k", "-f", "mp3"]),
+    }
+
+    def __init__(self):
+        self.target_format = os.environ.get("VOICE_TRANSCODE_FORMAT", "").strip().lower()
+        self.keep_original = os.environ.get("VOICE_TRANSCODE_KEEP_ORIGINAL", "false").lower() == "true"
+        self.timeout = float(os.environ.get("VOICE_TRANSCODE_TIMEOUT", 15))
+        self.ffmpeg = shutil.which(os.environ.get("FFMPEG_PATH", "ffmpeg"))
+        self._executor: ThreadPoolExecutor | None = None
+
+        self.enabled = False
+        if not self.target_format:
+            return
+        if self.target_format not in self.FORMATS:
+            logger.warning(f"不支持的语音转码格式: {self.target_format}，已禁用转码")
+            return
+        if self.ffmpeg is None:
+            logger.warning("未找到ffmpeg，语音转码功能已禁用，请安装ffmpeg或设置FFMPEG_PATH")
+            return
+
+        self.enabled = True
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get("VOICE_TRANSCODE_WORKERS", 2)),
+            thread_name_prefix="voice-transcode"
+        )
+        logger.info(f"语音转码已启用: {self.target_format} (ffmpeg: {self.ffmpeg})")
+
+    @property
+    def suffix(self) -> str:
+        """转码后文件的后缀名"""
+        return self.FORMATS[self.target_format][0]
+
+    def output_path(self, file_name: str) -> str:
+        """根据原始输出路径计算转码后文件的路径"""
+        return str(Path(file_name).with_suffix("." + self.suffix))
+
+    def _encode(self, audio_data: bytes) -> bytes:
+        """调用ffmpeg通过管道完成编码（在线程池中执行）"""
+        assert self.ffmpeg is not None
+        codec_args = self.FORMATS[self.target_format][1]
+        result = subprocess.run(
+            [self.ffmpeg, "-hide_banner", "-loglevel", "error",
+             "-i", "pipe:0", "-vn", *codec_args, "pipe:1"],
+            input=audio_data,
+            capture_output=True,
+            timeout=self.timeout,
+            check=True
+        )
+        return result.stdout
+
+    async def transcode(self, audio_data: bytes) -> bytes | None:
+        """
+        转码音频数据
+
+        :param audio_data: TTS返回的原始音频
+        :return: 转码后的音频，失败时返回None（调用方应回退到原始音频）
+        """
+        if not self.enabled:
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            encoded = await loop.run_in_executor(self._executor, self._encode, audio_data)
+        except subprocess.CalledProcessError as e:
+            logger.warning(f"语音转码失败: {e.stderr.decode(errors='ignore').strip()}")
+            return None
+        except Exception as e:
+            logger.warning(f"语音转码失败: {e!r}")
+            return None
+        if not encoded:
+            return None
+        logger.debug(f"语音转码完成: {len(audio_data)} -> {len(encoded)} 字节")
+        return encoded
@@ -5,6 +5,9 @@ from typing import Optional, AsyncGenerator
 class TTSBaseAdapter(ABC):
     """VITS API适配器基类"""
 
+    # 是否支持在generate_voice中传入情绪标签（emo参数）
+    supports_emotion: bool = False
+
     @abstractmethod
     async def generate_voice(self, text: str,) -> bytes:
         """生成语音的抽象方法"""
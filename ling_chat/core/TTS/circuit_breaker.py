@@ -0,0 +1,94 @@
+import os
+import time
+from enum import Enum
+
+
+class BreakerState(Enum):
+    CLOSED = "closed"        # 正常放行
+    OPEN = "open"            # 熔断中，直接拒绝请求
+    HALF_OPEN = "half_open"  # 冷却结束，放行一次探测请求
+
+
+class CircuitBreaker:
+    """
+    TTS适配器熔断器
+
+    连续失败达到阈值后进入OPEN状态，冷却时间结束后进入HALF_OPEN状态，
+    只放行一个探测请求：探测成功则恢复CLOSED，失败则重新进入OPEN并继续冷却。
+    """
+
+    def __init__(self, name: str,
+                 failure_threshold: int | None = None,
+                 recovery_timeout: float | None = None):
+        """
+        :param name: 熔断器名称（一般为TTS类型）
+        :param failure_threshold: 连续失败多少次后熔断，默认读取TTS_BREAKER_THRESHOLD
+        :param recovery_timeout: 熔断后多少秒进入半开探测，默认读取TTS_BREAKER_RECOVERY
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold if failure_threshold is not None \
+            else int(os.environ.get("TTS_BREAKER_THRESHOLD", 3))
+        self.recovery_timeout = recovery_timeout if recovery_timeout is not None \
+            else float(os.environ.get("TTS_BREAKER_RECOVERY", 5))
+
+        self.state = BreakerState.CLOSED
+        self.failure_count = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+        self.total_failures = 0
+        self.total_successes = 0
+        self.last_error = ""
+
+    def allow_request(self) -> bool:
+        """判断当前是否允许发出请求"""
+        if self.state == BreakerState.CLOSED:
+            return True
+
+        if self.state == BreakerState.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                return False
+            self.state = BreakerState.HALF_OPEN
+            self.probe_in_flight = False
+
+        # HALF_OPEN：同一时间只允许一个探测请求
+        if self.probe_in_flight:
+            return False
+        self.probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = BreakerState.CLOSED
+        self.failure_count = 0
+        self.probe_in_flight = False
+        self.total_successes += 1
+
+    def record_failure(self, error: str = "") -> None:
+        self.failure_count += 1
+        self.total_failures += 1
+        self.last_error = error
+        self.probe_in_flight = False
+
+        if self.state == BreakerState.HALF_OPEN or self.failure_count >= self.failure_threshold:
+            self.state = BreakerState.OPEN
+            self.opened_at = time.monotonic()
+
+    def retry_after(self) -> float:
+        """距离下一次半开探测还需要等待的秒数"""
+        if self.state != BreakerState.OPEN:
+            return 0.0
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+    def snapshot(self) -> dict[str, str | int | float]:
+        """获取熔断器当前状态，用于健康检查接口"""
+        return {
+            "name": self.name,
+            "state": self.state.value,
+            "failure_count": self.failure_count,
+            "failure_threshold": self.failure_threshold,
+            "recovery_timeout": self.recovery_timeout,
+            "retry_after": round(self.retry_after(), 2),
+            "total_successes": self.total_successes,
+            "total_failures": self.total_failures,
+            "last_error": self.last_error,
+        }
@@ -6,6 +6,8 @@ from ling_chat.core.logger import logger
 
 
 class IndexTTSAdapter(TTSBaseAdapter):
+    supports_emotion = True
+
     def __init__(self, speaker_id: int=0, model_name: str="", 
                  audio_format: str="wav", lang: str="zh"):
 
@@ -0,0 +1,169 @@
+import importlib
+import os
+from typing import Any, Awaitable, Callable, NamedTuple
+
+from ling_chat.core.TTS.base_adapter import TTSBaseAdapter
+from ling_chat.core.logger import logger
+
+
+class AdapterSpec(NamedTuple):
+    module: str         # 适配器所在模块
+    class_name: str     # 适配器类名
+    display_name: str   # 日志中显示的名称
+    # (角色卡TTS设置, 角色卡路径, 音频格式) -> 适配器构造参数；角色卡不支持该后端时抛出ValueError
+    configure: Callable[[dict[str, str], str, str], dict[str, Any]]
+    lang: str = "ja"    # 送去合成的文本语言
+    # 适配器创建后的异步准备工作（如GSV切换模型），参数同configure
+    setup: Callable[[TTSBaseAdapter, dict[str, str], str], Awaitable[None]] | None = None
+
+
+def _require(tts_settings: dict[str, str], *keys: str) -> list[str]:
+    """读取必需的TTS设置，缺少或为空时抛出ValueError"""
+    values = [tts_settings.get(key) or "" for key in keys]
+    if not all(value.strip() for value in values):
+        raise ValueError(f"角色卡缺少TTS设置: {', '.join(keys)}")
+    return values
+
+
+def _configure_sva(tts_settings: dict[str, str], character_path: str, audio_format: str) -> dict[str, Any]:
+    speaker_id, = _require(tts_settings, "sva_speaker_id")
+    return {"speaker_id": int(speaker_id), "audio_format": audio_format, "lang": "ja"}
+
+
+def _configure_sbv2(tts_settings: dict[str, str], character_path: str, audio_format: str) -> dict[str, Any]:
+    speaker_id, model_name = _require(tts_settings, "sbv2_speaker_id", "sbv2_name")
+    return {"speaker_id": int(speaker_id), "model_name": model_name, "audio_format": audio_format, "lang": "ja"}
+
+
+def _configure_bv2(tts_settings: dict[str, str], character_path: str, audio_format: str) -> dict[str, Any]:
+    speaker_id, = _require(tts_settings, "bv2_speaker_id")
+    return {"speaker_id": int(speaker_id), "audio_format": audio_format, "lang": "zh"}
+
+
+def _configure_sbv2api(tts_settings: dict[str, str], character_path: str, audio_format: str) -> dict[str, Any]:
+    model_name, speaker_id = _require(tts_settings, "sbv2api_name", "sbv2api_speaker_id")
+    return {"model_name": model_name, "speaker_id": int(speaker_id), "audio_format": audio_format}
+
+
+def _configure_aivis(tts_settings: dict[str, str], character_path: str, audio_format: str) -> dict[str, Any]:
+    model_uuid, = _require(tts_settings, "aivis_model_uuid")
+    if os.environ.get("AIVIS_API_KRY", "") == "":
+        raise ValueError("未设置AIVIS_API_KRY环境变量，请检查是否正确设置")
+    return {"model_uuid": model_uuid, "speaker_uuid": None, "audio_format": audio_format, "lang": "ja"}
+
+
+def _configure_gsv(tts_settings: dict[str, str], character_path: str, audio_format: str) -> dict[str, Any]:
+    has_voice = all((tts_settings.get(key) or "").strip() for key in ("gsv_voice_filename", "gsv_voice_text"))
+    has_models = all((tts_settings.get(key) or "").strip()
+                     for key in ("gsv_gpt_model_name", "gsv_sovits_model_name"))
+    if not (has_voice or has_models):
+        raise ValueError("角色卡缺少GPT-SoVITS的参考音频或模型设置")
+
+    # 优先使用环境变量定义的语音文件
+    if os.environ.get("GPT_SOVITS_REF_AUDIO", ""):
+        logger.warning("你正在使用环境变量中的GPT-SoVITS配置")
+        return {"ref_audio_path": os.environ.get("GPT_SOVITS_REF_AUDIO", ""),
+                "prompt_text": os.environ.get("GPT_SOVITS_PROMPT_TEXT", ""), "prompt_lang": "auto"}
+
+    ref_audio_filename = tts_settings["gsv_voice_filename"]
+    # 检查参考音频路径是否为绝对路径，如果是则发出警告
+    if os.path.isabs(ref_audio_filename):
+        logger.warning(f"角色 {character_path} 的参考音频路径为绝对路径: {ref_audio_filename}，这可能导致gsv出错")
+    ref_audio_path = os.path.join(character_path, ref_audio_filename)
+    logger.debug(f"gsv拼接后的参考音频路径: {ref_audio_path}")
+    return {"ref_audio_path": ref_audio_path, "prompt_text": tts_settings["gsv_voice_text"], "prompt_lang": "auto"}
+
+
+async def _setup_gsv(adapter: TTSBaseAdapter, tts_settings: dict[str, str], character_path: str) -> None:
+    """设置GSV模型：环境变量中的模型配置优先，否则使用角色卡 models/gsv 目录下的模型"""
+    env_gpt_model = os.environ.get("GPT_SOVITS_GPT_MODEL", "")
+    env_sovits_model = os.environ.get("GPT_SOVITS_SOVITS_MODEL", "")
+    gpt_model_name = tts_settings.get("gsv_gpt_model_name", "")
+    sovits_model_name = tts_settings.get("gsv_sovits_model_name", "")
+
+    if env_gpt_model and env_sovits_model:
+        logger.warning("你正在使用环境变量中的GSV模型配置")
+        gpt_model_path, sovits_model_path = env_gpt_model, env_sovits_model
+    elif gpt_model_name and sovits_model_name:
+        models_dir = os.path.join(character_path, "models", "gsv")
+        gpt_model_path = os.path.join(models_dir, gpt_model_name)
+        sovits_model_path = os.path.join(models_dir, sovits_model_name)
+    else:
+        return
+
+    success = await adapter.set_model(gpt_model_path, sovits_model_path)  # type: ignore[attr-defined]
+    if success:
+        logger.info(f"GSV模型设置成功: GPT={gpt_model_path}, SoVITS={sovits_model_path}")
+    else:
+        logger.error(f"GSV模型设置失败: GPT={gpt_model_path}, SoVITS={sovits_model_path}")
+
+
+def _configure_without_settings(tts_settings: dict[str, str], character_path: str,
+                                audio_format: str) -> dict[str, Any]:
+    return {}
+
+
+# TTS类型 -> 适配器，只有被配置使用的适配器才会真正导入
+TTS_ADAPTERS: dict[str, AdapterSpec] = {
+    "sva-vits": AdapterSpec("ling_chat.core.TTS.vits_adapter", "VitsAdapter", "Vits", _configure_sva),
+    "sbv2": AdapterSpec("ling_chat.core.TTS.sbv2_adapter", "SBV2Adapter", "Style-Bert-Vits2", _configure_sbv2),
+    "gsv": AdapterSpec("ling_chat.core.TTS.gsv_adapter", "GPTSoVITSAdapter", "GPT-SoVITS", _configure_gsv,
+                       setup=_setup_gsv),
+    "sva-bv2": AdapterSpec("ling_chat.core.TTS.bv2_adapter", "BV2Adapter", "Bert-Vits2", _configure_bv2),
+    "sbv2api": AdapterSpec("ling_chat.core.TTS.sbv2api_adapter", "SBV2APIAdapter", "sbv2-api", _configure_sbv2api),
+    "aivis": AdapterSpec("ling_chat.core.TTS.aivis_adapter", "AIVISAdapter", "AIVIS", _configure_aivis),
+    "indextts2": AdapterSpec("ling_chat.core.TTS.index_adpater", "IndexTTSAdapter", "IndexTTS2",
+                             _configure_without_settings, lang="zh"),
+}
+
+_loaded_classes: dict[str, type[TTSBaseAdapter]] = {}
+
+
+def register_adapter(tts_type: str, module: str, class_name: str, display_name: str = "",
+                     configure: Callable[[dict[str, str], str, str], dict[str, Any]] = _configure_without_settings,
+                     lang: str = "ja",
+                     setup: Callable[[TTSBaseAdapter, dict[str, str], str], Awaitable[None]] | None = None) -> None:
+    """
+    注册新的TTS后端
+
+    :param tts_type: TTS类型字符串（角色卡或TTS_TYPE中使用的名称）
+    :param module: 适配器所在模块的完整路径
+    :param class_name: 适配器类名
+    :param display_name: 日志中显示的名称，默认与tts_type相同
+    :param configure: 从角色卡TTS设置生成适配器构造参数，默认不需要参数
+    :param lang: 送去合成的文本语言（ja 或 zh）
+    :param setup: 适配器创建后的异步准备工作
+    """
+    TTS_ADAPTERS[tts_type] = AdapterSpec(module, class_name, display_name or tts_type, configure, lang, setup)
+    _loaded_classes.pop(tts_type, None)
+
+
+def get_adapter_spec(tts_type: str) -> AdapterSpec:
+    """
+    获取TTS类型对应的适配器信息
+
+    :raises ValueError: 未知的TTS类型
+    """
+    spec = TTS_ADAPTERS.get(tts_type)
+    if spec is None:
+        raise ValueError(f"未知的TTS类型: {tts_type}")
+    return spec
+
+
+def get_adapter_class(tts_type: str) -> type[TTSBaseAdapter]:
+    """
+    按需导入并返回TTS类型对应的适配器类
+
+    :raises ValueError: 未知的TTS类型
+    """
+    adapter_class = _loaded_classes.get(tts_type)
+    if adapter_class is None:
+        spec = get_adapter_spec(tts_type)
+        adapter_class = getattr(importlib.import_module(spec.module), spec.class_name)
+        _loaded_classes[tts_type] = adapter_class
+    return adapter_class
+
+
+def available_tts_types() -> tuple[str, ...]:
+    """获取所有已注册的TTS类型"""
+    return tuple(TTS_ADAPTERS)
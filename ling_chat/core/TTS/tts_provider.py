@@ -1,14 +1,14 @@
+import asyncio
 import os
-from pathlib import Path
-from ling_chat.core.TTS.index_adpater import IndexTTSAdapter
-from ling_chat.core.TTS.vits_adapter import VitsAdapter
-from ling_chat.core.TTS.sbv2_adapter import SBV2Adapter
-from ling_chat.core.TTS.gsv_adapter import GPTSoVITSAdapter
-from ling_chat.core.TTS.sbv2api_adapter import SBV2APIAdapter
-from ling_chat.core.TTS.bv2_adapter import BV2Adapter
-from ling_chat.core.TTS.aivis_adapter import AIVISAdapter
+import random
+from ling_chat.core.TTS.base_adapter import TTSBaseAdapter
+from ling_chat.core.TTS.registry import get_adapter_class, get_adapter_spec
+from ling_chat.core.TTS.circuit_breaker import CircuitBreaker, BreakerState
+from ling_chat.core.TTS.audio_transcoder import AudioTranscoder
+from ling_chat.core.TTS.audio_memory_cache import audio_memory_cache
 from ling_chat.core.logger import logger
-from ling_chat.utils.runtime_path import temp_path
+from ling_chat.core.TTS.voice_janitor import voice_janitor
+from ling_chat.utils.runtime_path import get_voice_path
 
 
 class TTS:
@@ -34,157 +34,122 @@ class TTS:
         self.format = os.environ.get("VOICE_FORMAT", "wav")
 
         self.audio_format = self.format
-        self.temp_dir = Path(os.environ.get("TEMP_VOICE_DIR", temp_path / "data/voice"))
+        self.temp_dir = get_voice_path()
         self.temp_dir.mkdir(parents=True, exist_ok=True)
         self.enable = True  # 初始化时启用
+
+        # 请求超时与重试设置
+        self.timeout = float(os.environ.get("TTS_TIMEOUT", 30))
+        self.max_retries = int(os.environ.get("TTS_MAX_RETRIES", 2))
+        self.retry_base_delay = float(os.environ.get("TTS_RETRY_BASE_DELAY", 0.3))
+        # 每个TTS类型一个熔断器，服务恢复后自动重新启用语音
+        self.breakers: dict[str, CircuitBreaker] = {}
+        # 可选的合成后转码阶段（需要ffmpeg）
+        self.transcoder = AudioTranscoder()
         
-        # 提前初始化适配器属性为None，之后就可用判断了（pylance如是说）
-        self.sva_adapter = None
-        self.sbv2_adapter = None
-        self.sbv2api_adapter = None
-        self.bv2_adapter = None
-        self.gsv_adapter = None
-        self.aivis_adapter = None
-        self.index_adapter = None
-
-    def init_sva_adapter(self,speaker_id: int):
-        """
-        初始化SVA适配器
-
-        :param speaker_id: 说话人ID
-        """
-        self.sva_adapter = VitsAdapter(
-            speaker_id = speaker_id,
-            audio_format = self.format,
-            lang = "ja"
-        )
-    
-    def init_sbv2_adapter(self, speaker_id: int, model_name: str, language: str="ja"):
-        """
-        初始化SBV2适配器
+        # 已初始化的适配器，TTS类型 -> 适配器实例（适配器模块按需导入）
+        self.adapters: dict[str, TTSBaseAdapter] = {}
 
-        :param speaker_id: 说话人ID
-        :param model_name: 模型名称
-        :param language: 语言选择
+    def init_adapter(self, tts_type: str, **kwargs) -> TTSBaseAdapter:
         """
-        self.sbv2_adapter = SBV2Adapter(
-            speaker_id = speaker_id,
-            model_name = model_name,
-            audio_format = self.format,
-            lang = language
-        )
+        按TTS类型导入适配器类并创建实例（参数由注册表中的 configure 从角色卡设置生成）
 
-    def init_sbv2api_adapter(self, model_name: str, speaker_id: int):
+        :param tts_type: TTS类型字符串
+        :return: 适配器实例
         """
-        初始化SBV2API适配器
+        adapter = get_adapter_class(tts_type)(**kwargs)
+        self.adapters[tts_type] = adapter
+        return adapter
 
-        :param model_name: 模型名称
-        :param speaker_id: 说话人ID
-        """
-        self.sbv2api_adapter = SBV2APIAdapter(
-            model_name = model_name,
-            speaker_id= speaker_id,
-            audio_format = self.format
-        )
-        
-    def init_bv2_adapter(self, speaker_id: int, language: str="zh"):
-        """
-        初始化BV2适配器
+    def get_adapter(self, tts_type: str) -> TTSBaseAdapter | None:
+        """获取已初始化的适配器，未初始化时返回None"""
+        return self.adapters.get(tts_type)
 
-        :param speaker_id: 说话人ID
-        :param language: 语言选择
+    def _select_adapter(self, tts_type: str) -> TTSBaseAdapter:
         """
-        self.bv2_adapter = BV2Adapter(
-            speaker_id = speaker_id,
-            audio_format = self.format,
-            lang = language
-        )
+        根据tts_type选择适配器(如果传入),为空则默认使用sbv2
 
-    def init_aivis_adapter(self, model_uuid: str, speaker_uuid: str|None = None, language: str="ja"):
+        :param tts_type: TTS类型字符串
+        :return: 对应的TTS适配器实例
+        :raises ValueError: 当指定的适配器未初始化或TTS类型未知时抛出异常
         """
-        初始化AIVIS适配器
+        adapter = self.adapters.get(tts_type or "sbv2")
+        if adapter is not None:
+            if not tts_type:
+                logger.warning("未指定tts_type,默认使用sbv2")
+            return adapter
 
-        :param model_uuid: 模型UUID
-        :param speaker_uuid: 说话人UUID（可选）
-        :param language: 语言选择（目前仅支持ja）
-        """
-        if os.environ.get("AIVIS_API_KRY", "") == "":
-            logger.warning("未设置AIVIS_API_KRY环境变量，请检查是否正确设置")
-            self.enable = False
-            return None
-        self.aivis_adapter = AIVISAdapter(
-            model_uuid=model_uuid,
-            speaker_uuid=speaker_uuid,
-            audio_format=self.format,
-            lang=language
-        )
+        if not tts_type:
+            raise ValueError("没有可用的API适配器")
+        raise ValueError(f"{get_adapter_spec(tts_type).display_name}适配器未初始化")
 
-    def init_gsv_adapter(self, ref_audio_path: str, prompt_text: str, prompt_lang: str = "auto"):
+    def get_breaker(self, tts_type: str) -> CircuitBreaker:
         """
-        初始化GSV适配器
+        获取某个TTS类型对应的熔断器，不存在时创建
 
-        :param ref_audio_path: 参考音频路径
-        :param prompt_text: 提示文本
-        :param prompt_lang: 提示语言，默认为"auto"
+        :param tts_type: TTS类型字符串，为空时视为sbv2
+        :return: 熔断器实例
         """
-        self.gsv_adapter = GPTSoVITSAdapter(
-            ref_audio_path = ref_audio_path,
-            prompt_text = prompt_text,
-            prompt_lang = prompt_lang
-        )
+        key = tts_type or "sbv2"
+        if key not in self.breakers:
+            self.breakers[key] = CircuitBreaker(key)
+        return self.breakers[key]
 
-    def init_index_adapter(self):
-        """
-        初始化IndexTTS适配器
-        """
-        self.index_adapter = IndexTTSAdapter()
+    def get_health(self) -> dict:
+        """获取TTS服务与各适配器熔断器的健康状态"""
+        return {
+            "enable": self.enable,
+            "timeout": self.timeout,
+            "max_retries": self.max_retries,
+            "breakers": [breaker.snapshot() for breaker in self.breakers.values()]
+        }
 
-    def _select_adapter(self, tts_type: str):
+    async def _request_with_retry(self, adapter, text: str, emo: str = "") -> bytes:
         """
-        根据tts_type选择适配器(如果传入),为空则自动选择
+        带超时和抖动退避重试地调用适配器生成语音
 
-        :param tts_type: TTS类型字符串
-        :return: 对应的TTS适配器实例
-        :raises ValueError: 当指定的适配器未初始化或TTS类型未知时抛出异常
-        """
-        if tts_type != "":
-            logger.debug(f"根据参数选择TTS适配器: {tts_type}")
-
-            if tts_type == 'sva-vits':
-                if self.sva_adapter is None:
-                    raise ValueError("Vits适配器未初始化")
-                return self.sva_adapter
-            elif tts_type == 'sbv2':
-                if self.sbv2_adapter is None:
-                    raise ValueError("Style-Bert-Vits2适配器未初始化")
-                return self.sbv2_adapter
-            elif tts_type == 'gsv':
-                if self.gsv_adapter is None:
-                    raise ValueError("GPT-SoVITS适配器未初始化")
-                return self.gsv_adapter
-            elif tts_type == 'sva-bv2':
-                if self.bv2_adapter is None:
-                    raise ValueError("Bert-Vits2适配器未初始化")
-                return self.bv2_adapter
-            elif tts_type == 'sbv2api':
-                if self.sbv2api_adapter is None:
-                    raise ValueError("sbv2-api适配器未初始化")
-                return self.sbv2api_adapter
-            elif tts_type == 'aivis':
-                if self.aivis_adapter is None:
-                    raise ValueError("AIVIS适配器未初始化")
-                return self.aivis_adapter
-            elif tts_type == 'indextts2':
-                if self.index_adapter is None:
-                    raise ValueError("IndexTTS2适配器未初始化")
-                return self.index_adapter
-            else:
-                raise ValueError(f"未知的TTS类型: {tts_type}")
-        elif self.sbv2_adapter is not None:
-            logger.warning("未指定tts_type,默认使用sbv2")
-            return self.sbv2_adapter
-        else:
-            raise ValueError("没有可用的API适配器")
+        :param adapter: TTS适配器实例
+        :param text: 要转换为语音的文本
+        :param emo: 情绪标签（仅IndexTTS使用）
+        :return: 音频数据
+        :raises Exception: 重试次数用尽后抛出最后一次的异常
+        """
+        last_error: Exception | None = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                if adapter.supports_emotion:
+                    request = adapter.generate_voice(text, emo)  # type: ignore[call-arg]
+                else:
+                    request = adapter.generate_voice(text)
+                return await asyncio.wait_for(request, timeout=self.timeout)
+            except Exception as e:
+                last_error = e
+                if attempt >= self.max_retries:
+                    break
+                # 指数退避 + 随机抖动，避免TTS服务重启时被同时涌入的请求打满
+                delay = self.retry_base_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.debug(f"语音生成第{attempt + 1}次失败，{delay:.2f}秒后重试: {e!r}")
+                await asyncio.sleep(delay)
+
+        assert last_error is not None
+        raise last_error
+
+    @staticmethod
+    def _write_file(file_path: str, audio_data: bytes) -> None:
+        """写入音频文件（在线程池中执行，避免阻塞事件循环）"""
+        with open(file_path, "wb") as f:
+            f.write(audio_data)
+
+    async def _save_audio(self, file_path: str, audio_data: bytes) -> None:
+        """
+        保存音频：先放入内存缓存，再异步写入磁盘
+
+        启用VOICE_MEMORY_ONLY时只保存在内存中，/audio路由直接从内存返回
+        """
+        cached = audio_memory_cache.put(file_path, audio_data)
+        if cached and audio_memory_cache.memory_only:
+            return
+        await asyncio.to_thread(self._write_file, file_path, audio_data)
 
     async def generate_voice(self, text: str, file_name: str, 
                              tts_type: str = "", lang: str ="ja", emo: str = "") -> str | None:
@@ -195,7 +160,7 @@ class TTS:
         :param file_name: 输出文件名
         :param tts_type: TTS类型，默认为空字符串表示自动选择
         :param lang: 语言，默认为"ja"
-        :return: 成功时返回输出文件路径，失败时返回None
+        :return: 成功时返回输出文件路径（启用转码时为转码后的文件），失败时返回None
         """
         if not self.enable:
             logger.warning("TTS服务未启用，跳过语音生成")
@@ -208,24 +173,45 @@ class TTS:
         try:
             # 选择适配器
             adapter = self._select_adapter(tts_type)
+        except ValueError as e:
+            logger.error(f"语音生成失败: {str(e)} 文本: \"{text}\"")
+            return None
 
+        breaker = self.get_breaker(tts_type)
+        if not breaker.allow_request():
+            logger.debug(f"TTS服务 {breaker.name} 处于熔断状态，"
+                         f"{breaker.retry_after():.1f}秒后重新探测，跳过语音生成")
+            return None
+
+        try:
             logger.debug("开始生成语音...")
-            if isinstance(adapter, IndexTTSAdapter):
-                audio_data = await adapter.generate_voice(text, emo)
-            else:
-                audio_data = await adapter.generate_voice(text)
+            audio_data = await self._request_with_retry(adapter, text, emo)
+
+            breaker.record_success()
 
             output_file = str(file_name)
-            with open(output_file, "wb") as f:
-                f.write(audio_data)
+            compact_data = None
+            if self.transcoder.enabled and self.transcoder.suffix != self.format:
+                compact_data = await self.transcoder.transcode(audio_data)
+
+            if compact_data is not None:
+                if self.transcoder.keep_original:
+                    await self._save_audio(output_file, audio_data)
+                output_file = self.transcoder.output_path(output_file)
+                audio_data = compact_data
+
+            await self._save_audio(output_file, audio_data)
+            voice_janitor.register(output_file)
 
             logger.debug(f"语音生成成功: {os.path.basename(output_file)}")
             return output_file
 
         except Exception as e:
-            logger.error(f"语音生成失败: {str(e)} 文本: \"{text}\"")
-            logger.error("TTS服务不可达，已禁用语音，重新启动程序以刷新启动服务")
-            self.enable = False
+            breaker.record_failure(repr(e))
+            logger.error(f"语音生成失败: {e!r} 文本: \"{text}\"")
+            if breaker.state == BreakerState.OPEN:
+                logger.error(f"TTS服务 {breaker.name} 不可达，已暂停语音合成，"
+                             f"将在{breaker.recovery_timeout:.0f}秒后自动探测恢复")
             return None
     
     async def generate_voice_stream(self, text: str, file_name: str, 
@@ -0,0 +1,147 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from ling_chat.core.logger import logger
+from ling_chat.utils.runtime_path import get_voice_path
+
+
+class VoiceJanitor:
+    """
+    语音缓存目录管理器
+
+    在后台定期清理语音目录：先删除超过保留时间的文件，
+    再按从旧到新的顺序删除文件直到总大小低于上限。
+    最近回复引用过的语音文件受保护，不会被清理。
+    """
+
+    AUDIO_SUFFIXES = {".wav", ".ogg", ".opus", ".aac", ".mp3", ".flac", ".silk"}
+
+    def __init__(self):
+        self.voice_dir: Path | None = None
+        self.ttl_seconds = 0.0
+        self.max_bytes = 0
+        self.sweep_interval = 0.0
+        self.protect_recent = 0
+
+        # 最近被回复引用的语音文件，按引用先后排序；register在事件循环中调用，sweep在线程中读取，需加锁
+        self.recent_files: OrderedDict[str, None] = OrderedDict()
+        self._recent_lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+
+    def _load_config(self) -> None:
+        """读取配置（需在环境变量加载后调用）"""
+        self.voice_dir = get_voice_path()
+        self.ttl_seconds = float(os.environ.get("VOICE_CACHE_TTL_HOURS", 24)) * 3600
+        self.max_bytes = int(float(os.environ.get("VOICE_CACHE_MAX_MB", 512)) * 1024 * 1024)
+        self.sweep_interval = float(os.environ.get("VOICE_CACHE_SWEEP_INTERVAL", 300))
+        self.protect_recent = int(os.environ.get("VOICE_CACHE_PROTECT_RECENT", 50))
+
+    def register(self, file_path: str) -> None:
+        """记录一个刚被回复引用的语音文件"""
+        name = os.path.basename(file_path)
+        with self._recent_lock:
+            self.recent_files[name] = None
+            self.recent_files.move_to_end(name)
+            while len(self.recent_files) > max(self.protect_recent, 0):
+                self.recent_files.popitem(last=False)
+
+    def _is_protected(self, name: str) -> bool:
+        with self._recent_lock:
+            return name in self.recent_files
+
+    def _scan(self) -> list[tuple[float, int, Path]]:
+        """扫描语音目录，返回 (修改时间, 大小, 路径) 列表"""
+        entries = []
+        assert self.voice_dir is not None
+        if not self.voice_dir.exists():
+            return entries
+        with os.scandir(self.voice_dir) as it:
+            for entry in it:
+                if not entry.is_file() or Path(entry.name).suffix.lower() not in self.AUDIO_SUFFIXES:
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, Path(entry.path)))
+        return entries
+
+    def sweep(self) -> tuple[int, int]:
+        """
+        执行一次清理
+
+        :return: (删除的文件数, 释放的字节数)
+        """
+        if self.voice_dir is None:
+            self._load_config()
+
+        entries = self._scan()
+        entries.sort(key=lambda e: e[0])  # 从旧到新
+        total_bytes = sum(size for _, size, _ in entries)
+        now = time.time()
+
+        removed_count = 0
+        removed_bytes = 0
+        for mtime, size, path in entries:
+            # 每个文件删除前再检查，扫描之后才被引用的语音同样受保护
+            if self._is_protected(path.name):
+                continue
+            expired = self.ttl_seconds > 0 and now - mtime > self.ttl_seconds
+            oversize = self.max_bytes > 0 and total_bytes > self.max_bytes
+            if not expired and not oversize:
+                # 剩下的文件都更新，且总大小已在上限内
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"清理语音缓存失败 {path.name}: {str(e)}")
+                continue
+            total_bytes -= size
+            removed_count += 1
+            removed_bytes += size
+
+        if removed_count:
+            logger.debug(f"语音缓存清理完成: 删除{removed_count}个文件，释放{removed_bytes / 1024 / 1024:.1f}MB，"
+                         f"剩余{total_bytes / 1024 / 1024:.1f}MB")
+        return removed_count, removed_bytes
+
+    async def run(self) -> None:
+        """后台清理循环"""
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"语音缓存清理出错: {e}")
+            await asyncio.sleep(self.sweep_interval)
+
+    def start(self) -> None:
+        """在当前事件循环中启动后台清理任务"""
+        self._load_config()
+        if self.sweep_interval <= 0:
+            logger.info("已根据环境变量禁用语音缓存自动清理")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(), name="VoiceJanitor")
+            logger.info(f"语音缓存目录: {self.voice_dir}，"
+                        f"上限{self.max_bytes // 1024 // 1024}MB，保留{self.ttl_seconds / 3600:g}小时")
+
+    async def stop(self) -> None:
+        """停止后台清理任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+voice_janitor = VoiceJanitor()
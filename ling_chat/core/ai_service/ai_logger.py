@@ -1,6 +1,7 @@
 import os
 from datetime import datetime
 from ling_chat.core.logger import logger, TermColors
+from ling_chat.core.TTS.audio_memory_cache import audio_memory_cache
 from ling_chat.utils.runtime_path import user_data_path
 
 
@@ -48,7 +49,7 @@ class AILogger:
             if segment['japanese_text']:
                 logger.debug(f"  日文文本: <{segment['japanese_text']}>")
             logger.debug(f"  预测情绪: {segment['predicted']} (置信度: {segment['confidence']:.2%})")
-            if os.path.exists(segment['voice_file']):
+            if audio_memory_cache.exists(segment['voice_file']):
                 logger.debug(f"  对应语音: {os.path.basename(segment['voice_file'])}")
             else:
                 if segment['japanese_text']:
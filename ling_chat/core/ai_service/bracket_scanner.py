@@ -0,0 +1,45 @@
+from typing import List
+
+
+class BracketScanner:
+    """
+    增量解析流式文本中的<...>句子
+
+    每个字符只扫描一次，未闭合的句子片段保存在内部，
+    避免每收到一个chunk就对整个缓冲区反复index()和切片。
+    """
+
+    def __init__(self, open_char: str = "<", close_char: str = ">"):
+        self.open_char = open_char
+        self.close_char = close_char
+        self._parts: List[str] = []  # 当前未闭合句子的片段
+        self._inside = False
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        输入新的文本，返回其中新完成的句子（不含括号）
+
+        :param chunk: 新到达的文本
+        :return: 完整句子列表，按出现顺序排列
+        """
+        sentences: List[str] = []
+        pos = 0
+        length = len(chunk)
+        while pos < length:
+            if not self._inside:
+                start = chunk.find(self.open_char, pos)
+                if start == -1:
+                    break
+                self._inside = True
+                pos = start + 1
+            else:
+                end = chunk.find(self.close_char, pos)
+                if end == -1:
+                    self._parts.append(chunk[pos:])
+                    break
+                self._parts.append(chunk[pos:end])
+                sentences.append("".join(self._parts))
+                self._parts = []
+                self._inside = False
+                pos = end + 1
+        return sentences
@@ -1,5 +1,4 @@
 import json
-import copy
 from typing import Dict
 import asyncio
 
@@ -15,6 +14,8 @@ from ling_chat.core.ai_service.config import AIServiceConfig
 from ling_chat.core.logger import logger
 from ling_chat.core.ai_service.message_system.message_generator import MessageGenerator
 from ling_chat.core.ai_service.script_engine.script_manager import ScriptManager
+from ling_chat.database.async_repository import conversation_repository, run_in_db_thread
+from ling_chat.database.database import checkpoint_db
 
 import os
 
@@ -28,6 +29,13 @@ class AIService:
             settings: 配置字典，包含各种设置项
         """
         self.memory = []  # 存储对话历史记录的列表
+        # 当前记忆对应的数据库对话，以及其中已经写入数据库的消息条数（之后只追加新消息）
+        self.conversation_id: int | None = None
+        self.persisted_count = 0
+        self._persisted_messages: list[Dict] = []  # 已写入部分的副本，用于发现被修改的历史
+        self._persist_lock = asyncio.Lock()
+        self._appends_since_checkpoint = 0
+        self.checkpoint_interval = int(os.environ.get("HISTORY_CHECKPOINT_INTERVAL", 20))
         self.user_id = "1"   # TODO: 多用户的时候这里可以改成按照初始化获取，或者直接从client_id中获取
 
         self.config = AIServiceConfig(clients=set(), user_id=self.user_id)
@@ -102,14 +110,14 @@ class AIService:
         self.events_scheduler.ai_name = self.ai_name
         self.events_scheduler.user_name = self.user_name
     
-    def load_memory(self, memory):     
+    def load_memory(self, memory, conversation_id: int | None = None):
         if isinstance(memory, str):
             memory = json.loads(memory)
-        self.memory = copy.deepcopy(memory)
+        # 消息字典不会被原地修改，浅拷贝列表即可
+        self.memory = list(memory)
+        self.bind_conversation(conversation_id, len(self.memory))
         
-        logger.info("记忆存档已经加载")
-        logger.info(f"内容是：{memory}")
-        logger.info(f"新的messages是：{self.memory}")
+        logger.info(f"记忆存档已经加载，共 {len(self.memory)} 条消息")
     
     def get_memory(self):
         return self.memory
@@ -121,6 +129,73 @@ class AIService:
                 "content": self.ai_prompt
             }
         ]
+        self.bind_conversation(None)
+
+    def bind_conversation(self, conversation_id: int | None, persisted_count: int = 0) -> None:
+        """
+        关联当前记忆与数据库中的对话
+        :param conversation_id: 对话ID，None表示当前记忆没有对应的存档
+        :param persisted_count: 记忆中前多少条消息已经在数据库中
+        """
+        self.conversation_id = conversation_id
+        self.persisted_count = persisted_count if conversation_id is not None else 0
+        self._persisted_messages = [msg.copy() for msg in self.memory[:self.persisted_count]]
+
+    async def persist_new_messages(self) -> int:
+        """
+        把尚未写入数据库的新消息追加到当前对话
+
+        已写入的部分被修改过时（重新生成回复、修改之前的消息），
+        从第一条不同的消息处分出新分支，只写入分叉后的消息，原分支保留在数据库中。
+        :return: 写入的消息条数
+        """
+        async with self._persist_lock:
+            if self.conversation_id is None:
+                return 0
+            messages = list(self.memory)
+            persisted = self._persisted_messages
+            # 逐条比较整个已写入部分，中间某条被修改而最后一条不变时也要分出新分支
+            prefix_intact = messages[:len(persisted)] == persisted
+
+            if prefix_intact:
+                fork_at = len(persisted)
+                new_messages = messages[fork_at:]
+                if not new_messages:
+                    return 0
+                await conversation_repository.append_messages_to_conversation(self.conversation_id, new_messages)
+            else:
+                fork_at = next((i for i, (old, new) in enumerate(zip(persisted, messages)) if old != new),
+                               min(len(persisted), len(messages)))
+                new_messages = messages[fork_at:]
+                if not new_messages:
+                    # 记忆被截短：对话末尾退回到截断处，后面的消息作为旧分支保留
+                    if not fork_at:
+                        return 0
+                    message_ids = await conversation_repository.get_conversation_message_ids(self.conversation_id)
+                    await conversation_repository.switch_branch(self.conversation_id, message_ids[fork_at - 1],
+                                                                follow_latest=False)
+                else:
+                    message_ids = await conversation_repository.get_conversation_message_ids(self.conversation_id) \
+                        if fork_at else []
+                    parent_id = message_ids[fork_at - 1] if fork_at else None
+                    logger.info(f"对话 {self.conversation_id} 的历史消息已变化，从第 {fork_at} 条消息处分出新分支")
+                    await conversation_repository.fork_conversation(self.conversation_id, parent_id, new_messages)
+
+            self._persisted_messages = persisted[:fork_at] + [msg.copy() for msg in new_messages]
+            self.persisted_count = len(messages)
+            logger.debug(f"对话 {self.conversation_id} 已保存 {len(new_messages)} 条新消息")
+
+            self._appends_since_checkpoint += 1
+            if self.checkpoint_interval > 0 and self._appends_since_checkpoint >= self.checkpoint_interval:
+                self._appends_since_checkpoint = 0
+                await run_in_db_thread(checkpoint_db)
+            return len(new_messages)
+
+    async def _persist_after_turn(self) -> None:
+        try:
+            await self.persist_new_messages()
+        except Exception as e:
+            logger.error(f"自动保存对话失败: {e}")
     
     async def start_script(self):
         await self.scripts_manager.start_script()
@@ -143,6 +218,7 @@ class AIService:
                             responses.append(response)
                         
                         logger.debug(f"消息处理完成，共生成 {len(responses)} 个响应片段")
+                        await self._persist_after_turn()
                     
                     self.is_processing = False
                     
@@ -216,6 +292,7 @@ class AIService:
                             responses.append(response)
                         
                         logger.debug(f"全局消息处理完成，共生成 {len(responses)} 个响应片段")
+                        await self._persist_after_turn()
                     
                     self.is_processing = False
                     
@@ -0,0 +1,201 @@
+import hashlib
+import os
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from ling_chat.core.logger import logger
+from ling_chat.utils.runtime_path import third_party_path
+
+
+class EmbeddingEngine:
+    """
+    进程内的ONNX文本向量化引擎（仅CPU）
+
+    加载导出为ONNX的 all-MiniLM-L6-v2 模型，取代需要单独运行的 torch + Flask 向量化服务。
+    模型目录需包含 model.onnx 和 tokenizer.json（可通过 --install rag 下载）。
+    - 动态批处理：多个线程同时请求向量时，后台线程在短时间窗口内把它们合并为一次推理
+    - LRU缓存：以文本哈希为键缓存向量，按 float16 / int8 压缩存储以节省内存
+    模型在第一次使用时加载。
+    """
+
+    def __init__(self, model_path: Optional[Path] = None):
+        self.model_path = Path(model_path or os.environ.get("EMBEDDING_MODEL_PATH", "")
+                               or third_party_path / "embedding_model_minilm").resolve()
+        self.batch_size = max(1, int(os.environ.get("EMBEDDING_BATCH_SIZE", 32)))
+        self.batch_wait = float(os.environ.get("EMBEDDING_BATCH_WAIT_MS", 5)) / 1000
+        self.max_length = int(os.environ.get("EMBEDDING_MAX_LENGTH", 256))
+        self.threads = int(os.environ.get("EMBEDDING_THREADS", 0))
+        self.cache_size = int(os.environ.get("EMBEDDING_CACHE_SIZE", 4096))
+        self.cache_dtype = os.environ.get("EMBEDDING_CACHE_DTYPE", "float16").lower()
+        if self.cache_dtype not in ("float32", "float16", "int8"):
+            logger.warning(f"未知的EMBEDDING_CACHE_DTYPE: {self.cache_dtype}，使用float16")
+            self.cache_dtype = "float16"
+
+        self.session = None
+        self.tokenizer = None
+        self.input_names: List[str] = []
+        self.dimension = 0
+
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self._cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._requests: queue.Queue[Tuple[str, str, Future]] = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+    @property
+    def available(self) -> bool:
+        """模型是否可用（首次访问时加载模型）"""
+        self._ensure_loaded()
+        return self.session is not None
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            try:
+                import onnxruntime as ort
+                from tokenizers import Tokenizer
+
+                model_file = self.model_path / "model.onnx"
+                tokenizer_file = self.model_path / "tokenizer.json"
+                for file in (model_file, tokenizer_file):
+                    if not file.exists():
+                        raise FileNotFoundError(f"向量模型文件不存在: {file}，请先运行 --install rag")
+
+                options = ort.SessionOptions()
+                if self.threads > 0:
+                    options.intra_op_num_threads = self.threads
+                self.session = ort.InferenceSession(str(model_file), options, providers=['CPUExecutionProvider'])
+                self.input_names = [item.name for item in self.session.get_inputs()]
+
+                self.tokenizer = Tokenizer.from_file(str(tokenizer_file))
+                self.tokenizer.enable_truncation(max_length=self.max_length)
+                self.tokenizer.enable_padding()
+
+                self.dimension = self._infer(["warmup"]).shape[1]  # 预热
+                self._worker = threading.Thread(target=self._batch_loop, name="embedding-batcher", daemon=True)
+                self._worker.start()
+                logger.info(f"向量模型初始化完毕: {self.model_path.name} | 维度 {self.dimension}")
+            except Exception as e:
+                logger.error(f"向量模型加载失败: {e}")
+                self.session = None
+                self.tokenizer = None
+            finally:
+                self._loaded = True
+
+    def _infer(self, texts: List[str]) -> np.ndarray:
+        """一次推理：分词 -> ONNX -> 平均池化 -> L2归一化"""
+        assert self.session is not None and self.tokenizer is not None
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.zeros_like(input_ids)
+
+        hidden_states = self.session.run(None, inputs)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden_states * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def _batch_loop(self) -> None:
+        """后台批处理线程：取到第一个请求后，在等待窗口内尽量凑满一批"""
+        while True:
+            batch = [self._requests.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._requests.get(timeout=self.batch_wait))
+            except queue.Empty:
+                pass
+
+            # 同一批中相同的文本只推理一次
+            unique: OrderedDict[str, str] = OrderedDict()
+            for key, text, _ in batch:
+                unique.setdefault(key, text)
+            try:
+                vectors = dict(zip(unique.keys(), self._infer(list(unique.values()))))
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            for key, vector in vectors.items():
+                self._cache_put(key, vector)
+            for key, _, future in batch:
+                future.set_result(vectors[key])
+
+    @staticmethod
+    def _text_key(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _compress(self, vector: np.ndarray) -> np.ndarray:
+        if self.cache_dtype == "int8":
+            # 向量已归一化，各分量在[-1, 1]之间
+            return np.round(vector * 127).astype(np.int8)
+        return vector.astype(self.cache_dtype)
+
+    def _decompress(self, stored: np.ndarray) -> np.ndarray:
+        vector = stored.astype(np.float32)
+        if stored.dtype == np.int8:
+            vector /= np.linalg.norm(vector) or 1.0
+        return vector
+
+    def _cache_put(self, key: str, vector: np.ndarray) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = self._compress(vector)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_get(self, key: str) -> Optional[np.ndarray]:
+        with self._cache_lock:
+            stored = self._cache.get(key)
+            if stored is None:
+                return None
+            self._cache.move_to_end(key)
+        return self._decompress(stored)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        获取文本的向量（线程安全，会阻塞直到结果可用）
+
+        :param texts: 文本列表
+        :return: 形状为 (len(texts), dimension) 的float32数组
+        """
+        if not self.available:
+            raise RuntimeError("向量模型不可用")
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        results: List[Optional[np.ndarray]] = []
+        pending: List[Tuple[int, Future]] = []
+        for i, text in enumerate(texts):
+            key = self._text_key(text)
+            vector = self._cache_get(key)
+            results.append(vector)
+            if vector is None:
+                future: Future = Future()
+                self._requests.put((key, text, future))
+                pending.append((i, future))
+        for i, future in pending:
+            results[i] = future.result()
+        return np.stack(results)
+
+    def cache_info(self) -> dict:
+        with self._cache_lock:
+            return {"entries": len(self._cache), "capacity": self.cache_size, "dtype": self.cache_dtype,
+                    "bytes": sum(vector.nbytes for vector in self._cache.values())}
+
+
+embedding_engine = EmbeddingEngine()
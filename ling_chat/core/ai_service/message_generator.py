@@ -7,6 +7,7 @@ import time
 from ling_chat.core.ai_service.ai_logger import logger
 from ling_chat.core.ai_service.message_processor import MessageProcessor
 from ling_chat.core.ai_service.voice_maker import VoiceMaker
+from ling_chat.core.TTS.audio_memory_cache import audio_memory_cache
 from ling_chat.core.llm_providers.manager import LLMManager
 from ling_chat.core.ai_service.translator import Translator
 from ling_chat.core.ai_service.rag_manager import RAGManager
@@ -138,6 +139,7 @@ class MessageGenerator:
             # 2. 如果启用了RAG系统，保存本次会话到RAG历史记录
             if self.use_rag and self.rag_manager:
                 self.rag_manager.rag_append_sys_message(current_context, rag_messages, processed_user_message)
+                await self.rag_manager.rag_append_retrieved_messages(current_context, rag_messages, processed_user_message)
 
         # 用于累积完整的响应
         accumulated_response = ""
@@ -371,7 +373,7 @@ class MessageGenerator:
             "message": seg['following_text'],
             "japaneseMessage": seg['japanese_text'],
             "motionText": seg['motion_text'],
-            "audioFile": os.path.basename(seg['voice_file']) if os.path.exists(seg['voice_file']) else None,
+            "audioFile": os.path.basename(seg['voice_file']) if audio_memory_cache.exists(seg['voice_file']) else None,
             "originalMessage": user_message,
             "isFinal": is_final
         }
@@ -385,7 +387,7 @@ class MessageGenerator:
             "originalTag": seg['original_tag'],
             "message": seg['following_text'],
             "motionText": seg['motion_text'],
-            "audioFile": os.path.basename(seg['voice_file']) if os.path.exists(seg['voice_file']) else None,
+            "audioFile": os.path.basename(seg['voice_file']) if audio_memory_cache.exists(seg['voice_file']) else None,
             "originalMessage": user_message,
             "isMultiPart": total_parts > 1,
             "partIndex": idx,
@@ -55,10 +55,10 @@ class MessageGenerator:
             logger.warning("句子中没有出现中日或情感，AI回复格式错误")
             return
         else:
-            # 翻译句子 TODO 假如翻译句子用的是比较贵的AI，这里不应该每个句子都单独飞过去翻译
+            # 翻译句子（同一时间窗口内的句子会合并为一次翻译请求）
             start_time = time.perf_counter()
             if sentence_segments[0].get("japanese_text") == "":
-                await self.translator.translate_ai_response(sentence_segments)
+                await self.translator.translate_segments(sentence_segments)
             else:
                 await self.voice_maker.generate_voice_files(sentence_segments)
             end_time = time.perf_counter()
@@ -82,6 +82,7 @@ class MessageGenerator:
             current_context = self.memory.copy()
             if self.use_rag and self.rag_manager:
                 self.rag_manager.rag_append_sys_message(current_context, rag_messages, processed_user_message)
+                await self.rag_manager.rag_append_retrieved_messages(current_context, rag_messages, processed_user_message)
 
             if logger.should_print_context():
                 self.ai_logger.print_debug_message(current_context, rag_messages, self.memory) 
@@ -83,9 +83,13 @@ class SentenceConsumer:
         
         start_time = time.perf_counter()
         if sentence_segments[0].get("japanese_text") == "":
-            await self.translator.translate_ai_response(sentence_segments)
+            await self.translator.translate_segments(sentence_segments)
         else:
-            await self.voice_maker.generate_voice_files(sentence_segments)
+            # 主模型直接给出的日语同样记入翻译缓存
+            await asyncio.gather(
+                self.voice_maker.generate_voice_files(sentence_segments),
+                self.translator.remember_segments(sentence_segments)
+            )
         end_time = time.perf_counter()
 
         sentence_segments[0]['character'] = self.character
@@ -1,5 +1,7 @@
+import asyncio
 import os
-from typing import List, Dict
+from collections import OrderedDict
+from typing import Any, List, Dict, Optional
 from ling_chat.core.logger import logger
 
 class RAGManager:
@@ -9,8 +11,17 @@ class RAGManager:
         env_mem = os.environ.get("USE_MEMORY_SYSTEM", "True").lower() == "true"
         
         self.enabled = env_rag or env_mem
+        # 向量检索记忆只在 USE_RAG 时启用
+        self.use_vector_memory = env_rag
         
-        self.memory_systems_cache = {}
+        # 常驻内存的角色数量上限，超出时按最近最少使用淘汰（保存后卸载，再次切换时重新加载）
+        self.max_resident_characters = max(1, int(os.environ.get("MEMORY_MAX_RESIDENT_CHARACTERS", 8)))
+        self.memory_systems_cache: OrderedDict[int, Any] = OrderedDict()
+        self.vector_memory_cache: OrderedDict[int, Any] = OrderedDict()
+        # 已淘汰但还在保存中的记忆库，保存完成前再次切换回来时直接复用，避免从磁盘读到旧状态
+        self._evicting: Dict[int, Any] = {}
+        self._eviction_tasks: set[asyncio.Task] = set()
+        self.active_vector_memory = None
         self.active_memory_system = None 
         self.character_id = 0
         
@@ -29,7 +40,14 @@ class RAGManager:
         if not self.enabled:
             return False
 
+        if self.use_vector_memory:
+            self._switch_vector_memory(character_id)
+
+        if character_id not in self.memory_systems_cache and character_id in self._evicting:
+            self.memory_systems_cache[character_id] = self._evicting.pop(character_id)
+
         if character_id in self.memory_systems_cache:
+            self.memory_systems_cache.move_to_end(character_id)
             self.active_memory_system = self.memory_systems_cache[character_id]
             logger.info(f"Memory: 切换至角色 ID {character_id}")
             return True
@@ -42,6 +60,7 @@ class RAGManager:
             if new_system.initialize():
                 self.memory_systems_cache[character_id] = new_system
                 self.active_memory_system = new_system
+                self._evict_memory_systems()
                 return True
             return False
         except ImportError:
@@ -51,6 +70,59 @@ class RAGManager:
             logger.error(f"Memory 初始化失败: {e}", exc_info=True)
             return False
 
+    def _switch_vector_memory(self, character_id: int) -> None:
+        """切换角色的向量检索记忆"""
+        vector_memory = self.vector_memory_cache.get(character_id)
+        if vector_memory is None:
+            from ling_chat.core.ai_service.vector_memory import VectorMemory
+            vector_memory = VectorMemory(character_id)
+            self.vector_memory_cache[character_id] = vector_memory
+        self.vector_memory_cache.move_to_end(character_id)
+        while len(self.vector_memory_cache) > self.max_resident_characters:
+            self.vector_memory_cache.popitem(last=False)
+        self.active_vector_memory = vector_memory if vector_memory.enabled else None
+
+    def _evict_memory_systems(self) -> None:
+        """
+        淘汰最近最少使用的记忆库，淘汰前保存到磁盘
+
+        正在后台总结的记忆库保持常驻（跳过它淘汰下一个），否则再次切换回来时会从磁盘加载出旧状态，
+        两个实例的保存互相覆盖；全部都在总结时暂时超出上限
+        """
+        overflow = len(self.memory_systems_cache) - self.max_resident_characters
+        if overflow <= 0:
+            return
+        candidates = [character_id for character_id, memory_system in self.memory_systems_cache.items()
+                      if not memory_system.is_updating and memory_system is not self.active_memory_system]
+        for character_id in candidates[:overflow]:
+            self._save_evicted(character_id, self.memory_systems_cache.pop(character_id))
+
+    def _save_evicted(self, character_id: int, memory_system: Any) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 不在事件循环中，直接同步保存
+            try:
+                memory_system.save_memory()
+                logger.info(f"Memory: 已保存并卸载角色 ID {character_id} 的记忆库")
+            except Exception as e:
+                logger.error(f"Memory: 卸载角色 ID {character_id} 时保存失败: {e}")
+            return
+        self._evicting[character_id] = memory_system
+        task = loop.create_task(self._save_evicted_async(character_id, memory_system))
+        self._eviction_tasks.add(task)
+        task.add_done_callback(self._eviction_tasks.discard)
+
+    async def _save_evicted_async(self, character_id: int, memory_system: Any) -> None:
+        try:
+            await memory_system.save_memory_async()
+            logger.info(f"Memory: 已保存并卸载角色 ID {character_id} 的记忆库")
+        except Exception as e:
+            logger.error(f"Memory: 卸载角色 ID {character_id} 时保存失败: {e}")
+        finally:
+            if self._evicting.get(character_id) is memory_system:
+                del self._evicting[character_id]
+
     def rag_append_sys_message(self, current_context: List[Dict], rag_messages: List[Dict], user_input: str) -> None:
         """
         上下文组装核心逻辑 - 修正版
@@ -107,11 +179,38 @@ class RAGManager:
         except Exception as e:
             logger.error(f"Memory 处理流程出错: {e}", exc_info=True)
 
-    def force_save_memory(self):
-        pass
-        
-    def save_messages_to_rag(self, messages):
-        pass
+    async def force_save_memory(self) -> None:
+        """
+        立即保存所有常驻内存的记忆库，并等待淘汰中的记忆库保存完成（应用退出时调用）
+        正在后台总结的记忆库除外，总结完成后会自行保存
+        """
+        if self._eviction_tasks:
+            await asyncio.gather(*self._eviction_tasks, return_exceptions=True)
+        for memory_system in list(self.memory_systems_cache.values()):
+            if not memory_system.is_updating:
+                await memory_system.save_memory_async()
+
+    def save_messages_to_rag(self, messages: List[Dict]) -> None:
+        """把新增的对话提交到向量记忆后台索引"""
+        if self.active_vector_memory:
+            self.active_vector_memory.index_messages_background(messages)
 
-    def prepare_messages(self, user_input):
-        return []
\ No newline at end of file
+    async def prepare_messages(self, user_input: str, current_context: Optional[List[Dict]] = None) -> List[Dict]:
+        """检索与用户输入相关的历史对话，返回要注入上下文的系统消息"""
+        if not self.active_vector_memory:
+            return []
+        documents = await self.active_vector_memory.retrieve(user_input, current_context or [])
+        if not documents:
+            return []
+        return [self.active_vector_memory.build_message(documents)]
+
+    async def rag_append_retrieved_messages(self, current_context: List[Dict], rag_messages: List[Dict], user_input: str) -> None:
+        """把向量检索结果插入到开头的系统消息之后（在 rag_append_sys_message 之后调用）"""
+        retrieved = await self.prepare_messages(user_input, current_context)
+        if not retrieved:
+            return
+        rag_messages.extend(retrieved)
+        insert_at = 0
+        while insert_at < len(current_context) and current_context[insert_at]["role"] == "system":
+            insert_at += 1
+        current_context[insert_at:insert_at] = retrieved
\ No newline at end of file
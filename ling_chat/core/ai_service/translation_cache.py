@@ -0,0 +1,171 @@
+import difflib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Iterable, Tuple
+
+from ling_chat.core.logger import logger
+from ling_chat.utils.runtime_path import user_data_path
+
+
+class TranslationCache:
+    """
+    持久化的翻译记忆缓存
+
+    以规范化后的中文原文和目标语言为键保存翻译结果，角色反复出现的台词、
+    剧本中的固定台词可以直接命中缓存，无需再次调用翻译模型。
+    可选的近似匹配会在长度相近的已缓存句子中查找相似度足够高的结果。
+    """
+
+    def __init__(self, db_path: str | Path | None = None, target_lang: str = "ja"):
+        """
+        :param db_path: 缓存数据库路径，默认为用户数据目录下的translation_cache.db
+        :param target_lang: 目标语言
+        """
+        self.db_path = Path(db_path) if db_path else user_data_path / "translation_cache.db"
+        self.target_lang = target_lang
+        self.enabled = os.environ.get("TRANSLATION_CACHE", "true").lower() == "true"
+        # 近似匹配的最低相似度，0为只使用精确匹配
+        self.fuzzy_threshold = float(os.environ.get("TRANSLATION_CACHE_FUZZY", 0))
+        self.fuzzy_candidates = int(os.environ.get("TRANSLATION_CACHE_FUZZY_CANDIDATES", 200))
+
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """首次使用时打开数据库并建表"""
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS translation_cache (
+                source TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (source, target_lang)
+            )
+            """)
+            conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_translation_cache_length
+            ON translation_cache (target_lang, length)
+            """)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """规范化原文：NFKC统一全半角，合并空白"""
+        text = unicodedata.normalize("NFKC", text)
+        return re.sub(r"\s+", " ", text).strip()
+
+    def lookup(self, text: str) -> str | None:
+        """
+        查找缓存的翻译（会访问数据库，在事件循环中请通过线程池调用）
+
+        :param text: 中文原文
+        :return: 缓存的翻译，未命中时返回None
+        """
+        if not self.enabled:
+            return None
+        source = self.normalize(text)
+        if not source:
+            return None
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT translation, source FROM translation_cache WHERE source = ? AND target_lang = ?",
+                    (source, self.target_lang)
+                ).fetchone()
+                if row is None and self.fuzzy_threshold > 0:
+                    row = self._fuzzy_lookup(conn, source)
+                if row is None:
+                    return None
+                conn.execute(
+                    "UPDATE translation_cache SET hits = hits + 1 WHERE source = ? AND target_lang = ?",
+                    (row[1], self.target_lang)
+                )
+                conn.commit()
+                return row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"读取翻译缓存失败: {e}")
+            return None
+
+    def _fuzzy_lookup(self, conn: sqlite3.Connection, source: str) -> Tuple[str, str] | None:
+        """在长度相近的缓存句子中查找最相似的一条"""
+        length = len(source)
+        min_length = int(length * self.fuzzy_threshold)
+        max_length = int(length / self.fuzzy_threshold) + 1
+        candidates = conn.execute(
+            """
+            SELECT translation, source FROM translation_cache
+            WHERE target_lang = ? AND length BETWEEN ? AND ?
+            ORDER BY hits DESC LIMIT ?
+            """,
+            (self.target_lang, min_length, max_length, self.fuzzy_candidates)
+        ).fetchall()
+
+        best: Tuple[str, str] | None = None
+        best_ratio = self.fuzzy_threshold
+        matcher = difflib.SequenceMatcher(autojunk=False)
+        matcher.set_seq2(source)
+        for translation, candidate in candidates:
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() < best_ratio or matcher.quick_ratio() < best_ratio:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = (translation, candidate), ratio
+        if best is not None:
+            logger.debug(f"翻译缓存近似命中({best_ratio:.2f}): {best[1]}")
+        return best
+
+    def store_many(self, pairs: Iterable[Tuple[str, str]]) -> None:
+        """
+        保存多条翻译（会访问数据库，在事件循环中请通过线程池调用）
+
+        :param pairs: (中文原文, 翻译) 列表
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        rows = []
+        for text, translation in pairs:
+            source = self.normalize(text)
+            if source and translation and translation.strip():
+                rows.append((source, self.target_lang, translation.strip(), len(source), now))
+        if not rows:
+            return
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.executemany(
+                    """
+                    INSERT INTO translation_cache (source, target_lang, translation, length, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(source, target_lang) DO UPDATE SET
+                        translation = excluded.translation,
+                        updated_at = excluded.updated_at
+                    """,
+                    rows
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"写入翻译缓存失败: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
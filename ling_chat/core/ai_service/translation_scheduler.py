@@ -0,0 +1,148 @@
+import asyncio
+import os
+import re
+from typing import Callable, Dict, List, Tuple
+
+from ling_chat.core.ai_service.bracket_scanner import BracketScanner
+from ling_chat.core.llm_providers.manager import LLMManager
+from ling_chat.core.logger import logger
+
+# 合并翻译时每句译文开头的编号，如 <1:こんにちは>
+SEGMENT_INDEX_PATTERN = re.compile(r"^\s*(\d+)\s*[:：]\s*(.*)$", re.DOTALL)
+
+
+class TranslationScheduler:
+    """
+    批量翻译调度器
+
+    多个消费者几乎同时提交的句子会在一个很短的时间窗口内合并为一次翻译请求
+    （<句子1><句子2>...），翻译结果以流式方式按顺序逐句返回给等待中的消费者，
+    从而把一条回复的多次翻译调用合并为一次。
+    """
+
+    def __init__(self, translator_llm: LLMManager, system_messages: List[Dict]):
+        """
+        :param translator_llm: 翻译模型
+        :param system_messages: 翻译使用的系统提示词
+        """
+        self.translator_llm = translator_llm
+        self.system_messages = system_messages
+        self.window = float(os.environ.get("TRANSLATE_BATCH_WINDOW", 80)) / 1000
+        self.max_batch = max(1, int(os.environ.get("TRANSLATE_BATCH_MAX", 8)))
+        self.stream = os.environ.get("TRANSLATE_STREAM", "true").lower() == "true"
+        self.timeout = float(os.environ.get("TRANSLATE_TIMEOUT", 20))
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._running: set[asyncio.Task] = set()
+
+    async def translate(self, text: str) -> str | None:
+        """
+        提交一句中文，等待其日语翻译
+
+        :param text: 中文句子（不含<>）
+        :return: 日语翻译，翻译失败或结果缺失时返回None
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        """把当前等待中的句子作为一批发送"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._run_batch(batch), name="TranslateBatch")
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """
+        发送一次翻译请求，把每句结果交给对应的等待者
+
+        多句合并时按 <1:句子><2:句子> 编号，结果按编号对应；模型没有保留编号时，
+        只有句子数与请求完全一致才按顺序对应，否则逐句重新翻译，避免错位的译文被合成语音并写入缓存
+        """
+        numbered = len(batch) > 1
+        send_messages = self.system_messages.copy()
+        if numbered:
+            content = "".join(f"<{i}:{text}>" for i, (text, _) in enumerate(batch, 1))
+        else:
+            content = f"<{batch[0][0]}>"
+        send_messages.append({"role": "user", "content": content})
+        logger.debug(f"合并翻译{len(batch)}个句子")
+
+        scanner = BracketScanner()
+        unnumbered: List[str] = []
+
+        def deliver(text: str) -> None:
+            """解析新到达的翻译文本，带编号的句子立即交给对应的等待者"""
+            for sentence in scanner.feed(text):
+                match = SEGMENT_INDEX_PATTERN.match(sentence) if numbered else None
+                if match and 1 <= int(match.group(1)) <= len(batch):
+                    future = batch[int(match.group(1)) - 1][1]
+                    if not future.done():
+                        future.set_result(match.group(2).strip())
+                else:
+                    unnumbered.append(sentence)
+
+        completed = False
+        try:
+            if self.stream:
+                await asyncio.wait_for(self._consume_stream(send_messages, deliver), timeout=self.timeout)
+            else:
+                response = await asyncio.wait_for(
+                    self.translator_llm.process_message_async(send_messages), timeout=self.timeout
+                )
+                deliver(response or "")
+            completed = True
+        except asyncio.TimeoutError:
+            logger.warning(f"批量翻译超时（{self.timeout:g}秒）")
+        except Exception as e:
+            logger.error(f"批量翻译失败: {e!r}")
+
+        pending = [(text, future) for text, future in batch if not future.done()]
+        if completed and pending:
+            if len(pending) == len(batch) and len(unnumbered) == len(batch):
+                # 模型去掉了编号，但句子数一致
+                for (_, future), sentence in zip(batch, unnumbered):
+                    future.set_result(sentence)
+                pending = []
+            elif numbered:
+                logger.warning(f"批量翻译结果与请求的{len(batch)}个句子对不上，逐句重新翻译{len(pending)}个句子")
+                await asyncio.gather(*(self._translate_single(text, future) for text, future in pending))
+                pending = [(text, future) for text, future in pending if not future.done()]
+
+        if pending:
+            logger.warning(f"翻译结果缺少{len(pending)}个句子，这些句子将不生成语音")
+        for _, future in pending:
+            if not future.done():
+                future.set_result(None)
+
+    async def _translate_single(self, text: str, future: asyncio.Future) -> None:
+        """单独翻译一句，结果必须恰好是一个<...>句子"""
+        send_messages = self.system_messages.copy()
+        send_messages.append({"role": "user", "content": f"<{text}>"})
+        try:
+            response = await asyncio.wait_for(
+                self.translator_llm.process_message_async(send_messages), timeout=self.timeout
+            )
+        except Exception as e:
+            logger.warning(f"逐句翻译失败: {e!r}")
+            return
+        sentences = BracketScanner().feed(response or "")
+        if len(sentences) == 1 and not future.done():
+            future.set_result(sentences[0])
+
+    async def _consume_stream(self, send_messages: List[Dict], deliver: Callable[[str], None]) -> None:
+        async for chunk in self.translator_llm.process_message_stream(send_messages):
+            deliver(chunk)
@@ -1,8 +1,12 @@
+import asyncio
 import os
 
 from typing import List, Dict
 from ling_chat.core.logger import logger
 from ling_chat.core.llm_providers.manager import LLMManager
+from ling_chat.core.ai_service.translation_scheduler import TranslationScheduler
+from ling_chat.core.ai_service.translation_cache import TranslationCache
+from ling_chat.core.ai_service.bracket_scanner import BracketScanner
 
 
 class Translator:
@@ -19,11 +23,18 @@ class Translator:
             <你好呀莱姆，今天过的怎么样呀？><哎？有点不高兴吗？没关系~>
             那么你的回复内容为：
             <はいはい、レムちゃん、今日はどうだった？><えっ？なんだかご機嫌ななめ？大丈夫だよ～>
+            如果原文的句子带有编号，译文的每句必须保留相同的编号，不要合并或拆分句子，比如：
+            <1:你好呀莱姆，今天过的怎么样呀？><2:哎？有点不高兴吗？没关系~>
+            那么你的回复内容为：
+            <1:はいはい、レムちゃん、今日はどうだった？><2:えっ？なんだかご機嫌ななめ？大丈夫だよ～>
             """
             }]
         self.voice_maker = voice_maker
 
         self.enable_translate:bool = os.environ.get("ENABLE_TRANSLATE", "True").lower() == "true"
+        self.scheduler = TranslationScheduler(self.translator_llm, self.messages)
+        self.cache = TranslationCache()
+        self.timeout = float(os.environ.get("TRANSLATE_TIMEOUT", 20))
 
     def get_all_chinese_part(self, results: List[Dict]) -> str:
         result = ""
@@ -31,11 +42,64 @@ class Translator:
             result += "<" + i["following_text"] + ">"
         return result
 
+    async def remember_segments(self, segments: List[Dict]) -> None:
+        """把已有日语的片段（翻译结果或主模型直接输出的<...>）写入翻译缓存"""
+        pairs = [(seg["following_text"], seg["japanese_text"])
+                 for seg in segments if seg.get("following_text") and seg.get("japanese_text")]
+        if pairs and self.cache.enabled:
+            await asyncio.to_thread(self.cache.store_many, pairs)
+
+    async def _translate_text(self, text: str) -> tuple[str | None, bool]:
+        """
+        先查翻译缓存，未命中时提交给批量翻译调度器
+
+        :return: (日语翻译, 是否为翻译模型新给出的结果)
+        """
+        if self.cache.enabled:
+            cached = await asyncio.to_thread(self.cache.lookup, text)
+            if cached:
+                logger.debug(f"翻译缓存命中: {text}")
+                return cached, False
+        return await self.scheduler.translate(text), True
+
+    async def translate_segments(self, segments: List[Dict]) -> None:
+        """
+        翻译单句回复的各个片段并合成语音
+
+        优先使用翻译缓存，同一时间窗口内各消费者提交的未命中句子会被合并为一次翻译请求
+        """
+        translate_segments = [seg for seg in segments if seg.get("following_text")]
+        if not translate_segments:
+            logger.warning("AI回复没有中文，跳过日语翻译")
+            return
+
+        translations = await asyncio.gather(
+            *(self._translate_text(seg["following_text"]) for seg in translate_segments)
+        )
+        fresh_segments = []
+        for seg, (japanese_text, from_model) in zip(translate_segments, translations):
+            if japanese_text:
+                seg["japanese_text"] = japanese_text
+                if from_model:
+                    fresh_segments.append(seg)
+
+        # 只缓存翻译模型新给出的结果：近似命中的译文对应的是另一句原文，不能记为这句的翻译
+        await asyncio.gather(
+            self.voice_maker.generate_voice_files(segments),
+            self.remember_segments(fresh_segments)
+        )
+
     async def translate_ai_response(self, results: List[Dict], script: bool = True):
         """将中文翻译成日文并合成语音"""
         if not self.enable_translate and not script:
             return
 
+        if os.environ.get("TRANSLATE_STREAM", "true") != "true" or script:
+            # 非流式处理（包括剧本台词）：与单句回复相同，先查翻译缓存，未命中的句子合并为一次翻译请求，
+            # 超时或失败的句子跳过语音，不阻塞其他消息
+            await self.translate_segments(results)
+            return
+
         full_chinese_response:str = self.get_all_chinese_part(results)
 
         # 第二步：用中文回答作为输入，流式翻译成日语
@@ -46,66 +110,31 @@ class Translator:
         send_messages = self.messages.copy()
         send_messages.append({"role":"user","content":full_chinese_response})
 
-        if os.environ.get("TRANSLATE_STREAM", "true") == "true" and not script:
-
-            # 流式处理
-            buffer = ""
-            current_segment_index = 0
-
-            japanese_stream = self.translator_llm.process_message_stream(send_messages)
+        # 流式处理：解析出的句子放入队列，由语音任务并行合成，翻译不再等待语音
+        voice_queue: asyncio.Queue[Dict | None] = asyncio.Queue()
+        voice_task = asyncio.create_task(self._voice_worker(voice_queue))
+        scanner = BracketScanner()
+        current_segment_index = 0
 
-            async for chunk in japanese_stream:
+        try:
+            async for chunk in self.translator_llm.process_message_stream(send_messages):
                 print(chunk, end="", flush=True)
-                buffer += chunk
                 # 检测完整句子
-                while "<" in buffer and ">" in buffer:
-                    start = buffer.index("<")
-                    end = buffer.index(">") + 1
-                    if start < end:
-                        sentence = buffer[start:end]
-                        buffer = buffer[end:]
-
-                        # 去除标记符号
-                        clean_sentence = sentence[1:-1]
-
-                        # 找到对应的segment并更新
-                        if current_segment_index < len(results):
-                            results[current_segment_index]["japanese_text"] = clean_sentence
-
-                            # 实时生成语音
-                            await self.voice_maker.generate_voice_files(
-                                [results[current_segment_index]]
-                            )
-                            logger.info("开始生成下一条语音...")
-
-                            current_segment_index += 1
-        else:
-            # 非流式处理 - 等待完整响应
-            japanese_response = self.translator_llm.process_message(send_messages)
-            logger.info(f"完整日语翻译结果: {japanese_response}")
-
-            # 解析完整响应并提取句子
-            buffer = japanese_response
-            current_segment_index = 0
-
-            # 处理完整响应中的所有句子
-            while "<" in buffer and ">" in buffer and current_segment_index < len(results):
-                start = buffer.index("<")
-                end = buffer.index(">") + 1
-                if start < end:
-                    sentence = buffer[start:end]
-                    buffer = buffer[end:]
-
-                    # 去除标记符号
-                    clean_sentence = sentence[1:-1]
-
+                for sentence in scanner.feed(chunk):
                     # 找到对应的segment并更新
-                    results[current_segment_index]["japanese_text"] = clean_sentence
-
-                    # 生成语音
-                    await self.voice_maker.generate_voice_files(
-                        [results[current_segment_index]]
-                    )
-                    logger.info(f"生成语音完成: {clean_sentence}")
-
-                    current_segment_index += 1
\ No newline at end of file
+                    if current_segment_index < len(results):
+                        results[current_segment_index]["japanese_text"] = sentence
+                        voice_queue.put_nowait(results[current_segment_index])
+                        current_segment_index += 1
+        finally:
+            voice_queue.put_nowait(None)
+            await voice_task
+
+    async def _voice_worker(self, voice_queue: "asyncio.Queue[Dict | None]") -> None:
+        """从队列中取出已翻译的片段，立即开始合成语音（多个片段并行）"""
+        tasks = []
+        while (seg := await voice_queue.get()) is not None:
+            tasks.append(asyncio.create_task(self.voice_maker.generate_voice_files([seg])))
+            logger.info("开始生成下一条语音...")
+        if tasks:
+            await asyncio.gather(*tasks)
@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from chromadb.api.types import EmbeddingFunction
+
+from ling_chat.core.ai_service.embedding_engine import EmbeddingEngine, embedding_engine
+from ling_chat.core.logger import logger
+from ling_chat.utils.runtime_path import user_data_path
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_chroma_client():
+    """获取共享的chroma持久化客户端（首次使用时创建）"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            import chromadb
+            from chromadb.config import Settings
+            path = os.environ.get("CHROMA_DB_PATH", "") or str(user_data_path / "chroma_db_store")
+            _client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+        return _client
+
+
+class EngineEmbeddingFunction(EmbeddingFunction):
+    """把进程内的 EmbeddingEngine 包装为chroma的向量化函数"""
+
+    def __init__(self, engine: EmbeddingEngine | None = None):
+        self.engine = engine or embedding_engine
+
+    def __call__(self, input):
+        return list(self.engine.encode(list(input)))
+
+    @staticmethod
+    def name() -> str:
+        return "lingchat-onnx-minilm"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "EngineEmbeddingFunction":
+        return EngineEmbeddingFunction()
+
+
+class VectorMemory:
+    """
+    角色的向量检索记忆
+
+    每个角色一个持久化的chroma集合，以"一问一答"为单位增量索引历史对话，
+    回复前按当前用户输入检索最相关的若干段过去的对话。
+    索引在后台线程中进行；检索有延迟预算，超时直接放弃，不拖慢回复。
+    """
+
+    _index_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-index")
+    _query_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rag-query")
+
+    def __init__(self, character_id: int, embedding_function: Any = None, client: Any = None):
+        """
+        :param character_id: 角色ID
+        :param embedding_function: chroma兼容的向量化函数，默认使用进程内的 EmbeddingEngine
+        :param client: chroma客户端，默认使用共享的持久化客户端
+        """
+        self.character_id = character_id
+        self.top_k = int(os.environ.get("RAG_RETRIEVAL_COUNT", 3))
+        self.candidate_multiplier = max(1, int(os.environ.get("RAG_CANDIDATE_MULTIPLIER", 3)))
+        self.latency_budget = float(os.environ.get("RAG_LATENCY_BUDGET_MS", 30)) / 1000
+        self.prompt_prefix = os.environ.get("RAG_PROMPT_PREFIX", "--- 以下是根据你的历史记忆检索到的相关对话片段 ---")
+        self.prompt_suffix = os.environ.get("RAG_PROMPT_SUFFIX", "--- 以上是历史记忆检索到的内容 ---")
+
+        # 已经提交索引的消息数量，只处理之后新增的消息
+        self.indexed_upto = 0
+        self.count = 0
+        self.collection = None
+        try:
+            client = client or get_chroma_client()
+            embedding_function = embedding_function or EngineEmbeddingFunction()
+            self.collection = client.get_or_create_collection(
+                name=f"char_{character_id}_memory",
+                embedding_function=embedding_function,
+                metadata={"hnsw:space": "cosine"}
+            )
+            self.count = self.collection.count()
+            # 在后台加载并预热向量模型，避免第一次检索因加载模型超出延迟预算
+            self._query_executor.submit(self._warmup, embedding_function)
+            logger.info(f"向量记忆已就绪 | 角色ID: {character_id} | 已索引 {self.count} 段对话")
+        except Exception as e:
+            logger.error(f"向量记忆初始化失败，将不使用向量检索: {e}")
+            self.collection = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.collection is not None
+
+    @staticmethod
+    def _content_key(content: str) -> str:
+        return hashlib.sha1(content.strip().encode("utf-8")).hexdigest()
+
+    def _warmup(self, embedding_function: Any) -> None:
+        try:
+            embedding_function(["warmup"])
+        except Exception as e:
+            logger.error(f"向量模型不可用，角色 {self.character_id} 将不使用向量检索: {e}")
+            self.collection = None
+
+    @staticmethod
+    def _is_dialogue(msg: Dict) -> bool:
+        content = msg.get("content", "")
+        return bool(content) and not content.startswith("{系统")
+
+    def _collect_exchanges(self, messages: List[Dict], start: int) -> List[Tuple[str, str, Dict]]:
+        """从start开始把相邻的用户消息和AI回复组成 (id, 文档, 元数据)"""
+        exchanges = []
+        for i in range(max(start, 0), len(messages) - 1):
+            user_msg, ai_msg = messages[i], messages[i + 1]
+            if user_msg.get("role") != "user" or ai_msg.get("role") != "assistant":
+                continue
+            if not (self._is_dialogue(user_msg) and self._is_dialogue(ai_msg)):
+                continue
+            user_key = self._content_key(user_msg["content"])
+            ai_key = self._content_key(ai_msg["content"])
+            document = f"User: {user_msg['content']}\nAI: {ai_msg['content']}"
+            exchanges.append((f"{user_key[:16]}{ai_key[:16]}", document,
+                              {"user_key": user_key, "ai_key": ai_key}))
+        return exchanges
+
+    def index_messages(self, messages: List[Dict], start: int = 0) -> int:
+        """
+        索引新的对话（同步，在后台线程中执行）
+
+        :return: 新增的对话段数
+        """
+        collection = self.collection
+        if collection is None:
+            return 0
+        exchanges = self._collect_exchanges(messages, start)
+        if not exchanges:
+            return 0
+        ids = [item[0] for item in exchanges]
+        existing = set(collection.get(ids=ids, include=[])["ids"])
+        new_items = [item for item in exchanges if item[0] not in existing]
+        if new_items:
+            collection.add(
+                ids=[item[0] for item in new_items],
+                documents=[item[1] for item in new_items],
+                metadatas=[item[2] for item in new_items]
+            )
+            self.count = collection.count()
+            logger.debug(f"向量记忆新增 {len(new_items)} 段对话，共 {self.count} 段")
+        return len(new_items)
+
+    def index_messages_background(self, messages: List[Dict]) -> None:
+        """把上次索引之后新增的消息提交到后台索引"""
+        if self.collection is None:
+            return
+        if len(messages) < self.indexed_upto:
+            # 切换了对话或历史被重置，重新扫描（已索引的对话会按ID去重）
+            self.indexed_upto = 0
+        # 从上次位置的前一条开始，保证跨越边界的一问一答也能配对
+        start = max(self.indexed_upto - 1, 0)
+        self.indexed_upto = len(messages)
+        future = self._index_executor.submit(self.index_messages, list(messages), start)
+        future.add_done_callback(self._log_index_error)
+
+    @staticmethod
+    def _log_index_error(future) -> None:
+        if future.exception() is not None:
+            logger.warning(f"向量记忆索引失败: {future.exception()}")
+
+    def _query(self, text: str, exclude_keys: set[str]) -> List[str]:
+        """检索最相关的对话，跳过仍在上下文中的消息"""
+        collection = self.collection
+        if collection is None:
+            return []
+        n_results = min(self.top_k * self.candidate_multiplier + len(exclude_keys), self.count)
+        if n_results <= 0:
+            return []
+        results = collection.query(
+            query_texts=[text], n_results=n_results, include=["documents", "metadatas"]
+        )
+        documents = results.get("documents") or [[]]
+        metadatas = results.get("metadatas") or [[]]
+        selected = []
+        for document, metadata in zip(documents[0], metadatas[0]):
+            if metadata and (metadata.get("user_key") in exclude_keys or metadata.get("ai_key") in exclude_keys):
+                continue
+            selected.append(document)
+            if len(selected) >= self.top_k:
+                break
+        return selected
+
+    async def retrieve(self, text: str, context: List[Dict]) -> List[str]:
+        """
+        在延迟预算内检索与text相关的历史对话
+
+        :param text: 当前用户输入
+        :param context: 当前要发送给模型的上下文（其中的消息不会被重复检索）
+        :return: 检索到的对话文本，超时或出错时为空列表
+        """
+        if self.collection is None or self.count == 0 or not text.strip():
+            return []
+        exclude_keys = {self._content_key(msg["content"]) for msg in context if msg.get("content")}
+        future = self._query_executor.submit(self._query, text, exclude_keys)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.latency_budget)
+        except asyncio.TimeoutError:
+            logger.debug(f"向量检索超出延迟预算({self.latency_budget * 1000:.0f}ms)，本轮跳过")
+        except Exception as e:
+            logger.warning(f"向量检索失败: {e}")
+        return []
+
+    def build_message(self, documents: List[str]) -> Dict:
+        """把检索结果包装为注入上下文的系统消息"""
+        body = "\n\n".join(documents)
+        return {"role": "system", "content": f"{self.prompt_prefix}\n{body}\n{self.prompt_suffix}"}
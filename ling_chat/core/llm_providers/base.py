@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Dict, List, AsyncGenerator
 
@@ -15,6 +16,13 @@ class BaseLLMProvider(ABC):
         """生成模型响应"""
         pass
 
+    async def generate_response_async(self, messages: List[Dict]) -> str:
+        """
+        异步生成模型响应的默认实现
+        在线程池中调用同步的generate_response，避免阻塞事件循环；有异步客户端的提供者可以重写此方法
+        """
+        return await asyncio.to_thread(self.generate_response, messages)
+
     @abstractmethod
     async def generate_stream_response(self, messages: List[Dict]) -> AsyncGenerator[str, None]:
         """生成模型流式响应"""
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, AsyncGenerator
+
+import numpy as np
+
+from ling_chat.core.ai_service.bracket_scanner import BracketScanner
+from ling_chat.core.llm_providers.base import BaseLLMProvider
+from ling_chat.core.logger import logger
+from ling_chat.utils.runtime_path import third_party_path
+
+
+class LocalTranslateProvider(BaseLLMProvider):
+    """
+    本地离线翻译提供者（ONNX Runtime，仅CPU）
+
+    加载导出为ONNX的seq2seq翻译模型（中文->日语），无需联网即可翻译。
+    模型目录需包含:
+        encoder_model.onnx  编码器，输入 input_ids / attention_mask
+        decoder_model.onnx  解码器，输入 input_ids / encoder_hidden_states / encoder_attention_mask，输出 logits
+        tokenizer.json      HuggingFace tokenizers格式的分词器
+        config.json         包含 decoder_start_token_id / eos_token_id / pad_token_id
+                            （可选 forced_bos_token_id，用于NLLB等需要指定目标语言的模型）
+    推理在单独的线程中执行，模型在启动时加载并预热，避免第一次翻译时的额外延迟。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.model_path = Path(os.environ.get("LOCAL_TRANSLATE_MODEL_PATH", "")
+                               or third_party_path / "translate_model_zh_ja").resolve()
+        self.batch_size = max(1, int(os.environ.get("LOCAL_TRANSLATE_BATCH_SIZE", 16)))
+        self.max_length = int(os.environ.get("LOCAL_TRANSLATE_MAX_LENGTH", 128))
+        self.threads = int(os.environ.get("LOCAL_TRANSLATE_THREADS", 0))
+
+        self.encoder = None
+        self.decoder = None
+        self.tokenizer = None
+        self.decoder_start_token_id = 0
+        self.eos_token_id = 0
+        self.pad_token_id = 0
+        self.forced_bos_token_id: int | None = None
+
+        # ONNX推理为CPU密集型任务，单线程执行器保证同一时间只有一个批次在推理
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-translate")
+        self.initialize_client()
+
+    def initialize_client(self):
+        """加载ONNX会话和分词器，并进行一次预热推理"""
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+
+            encoder_file = self.model_path / "encoder_model.onnx"
+            decoder_file = self.model_path / "decoder_model.onnx"
+            tokenizer_file = self.model_path / "tokenizer.json"
+            config_file = self.model_path / "config.json"
+            for file in (encoder_file, decoder_file, tokenizer_file, config_file):
+                if not file.exists():
+                    raise FileNotFoundError(f"本地翻译模型文件不存在: {file}")
+
+            with open(config_file, "r", encoding="utf-8") as f:
+                config = json.load(f)
+            self.decoder_start_token_id = int(config["decoder_start_token_id"])
+            self.eos_token_id = int(config["eos_token_id"])
+            self.pad_token_id = int(config.get("pad_token_id", self.eos_token_id))
+            if config.get("forced_bos_token_id") is not None:
+                self.forced_bos_token_id = int(config["forced_bos_token_id"])
+
+            options = ort.SessionOptions()
+            if self.threads > 0:
+                options.intra_op_num_threads = self.threads
+            providers = ['CPUExecutionProvider']
+            self.encoder = ort.InferenceSession(str(encoder_file), options, providers=providers)
+            self.decoder = ort.InferenceSession(str(decoder_file), options, providers=providers)
+            self.tokenizer = Tokenizer.from_file(str(tokenizer_file))
+
+            self.translate_batch(["你好"])  # 预热
+            logger.info(f"本地翻译模型初始化完毕: {self.model_path.name}")
+        except Exception as e:
+            logger.error(f"本地翻译模型加载失败: {e}")
+            self.encoder = None
+            self.decoder = None
+            self.tokenizer = None
+
+    def _encode_texts(self, texts: List[str]) -> tuple[np.ndarray, np.ndarray]:
+        """分词并填充为同一长度"""
+        assert self.tokenizer is not None
+        encodings = [self.tokenizer.encode(text).ids[:self.max_length] for text in texts]
+        width = max(len(ids) for ids in encodings)
+        input_ids = np.full((len(texts), width), self.pad_token_id, dtype=np.int64)
+        attention_mask = np.zeros((len(texts), width), dtype=np.int64)
+        for i, ids in enumerate(encodings):
+            input_ids[i, :len(ids)] = ids
+            attention_mask[i, :len(ids)] = 1
+        return input_ids, attention_mask
+
+    def _greedy_decode(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> List[List[int]]:
+        """批量贪心解码，返回每个句子生成的token（不含起始和结束标记）"""
+        assert self.encoder is not None and self.decoder is not None
+        encoder_hidden_states = self.encoder.run(
+            None, {"input_ids": input_ids, "attention_mask": attention_mask}
+        )[0]
+
+        batch = input_ids.shape[0]
+        decoder_ids = np.full((batch, 1), self.decoder_start_token_id, dtype=np.int64)
+        if self.forced_bos_token_id is not None:
+            decoder_ids = np.concatenate(
+                [decoder_ids, np.full((batch, 1), self.forced_bos_token_id, dtype=np.int64)], axis=1
+            )
+        prefix_length = decoder_ids.shape[1]
+        finished = np.zeros(batch, dtype=bool)
+
+        for _ in range(self.max_length):
+            logits = self.decoder.run(None, {
+                "input_ids": decoder_ids,
+                "encoder_hidden_states": encoder_hidden_states,
+                "encoder_attention_mask": attention_mask,
+            })[0]
+            next_tokens = logits[:, -1, :].argmax(axis=-1).astype(np.int64)
+            next_tokens[finished] = self.pad_token_id
+            decoder_ids = np.concatenate([decoder_ids, next_tokens[:, None]], axis=1)
+            finished |= next_tokens == self.eos_token_id
+            if finished.all():
+                break
+
+        outputs = []
+        for row in decoder_ids[:, prefix_length:]:
+            tokens = []
+            for token in row.tolist():
+                if token == self.eos_token_id:
+                    break
+                tokens.append(token)
+            outputs.append(tokens)
+        return outputs
+
+    def translate_batch(self, texts: List[str]) -> List[str]:
+        """按批次翻译多个句子（同步，耗时较长，请在线程池中调用）"""
+        assert self.tokenizer is not None
+        results: List[str] = []
+        for start in range(0, len(texts), self.batch_size):
+            chunk = texts[start:start + self.batch_size]
+            input_ids, attention_mask = self._encode_texts(chunk)
+            for tokens in self._greedy_decode(input_ids, attention_mask):
+                results.append(self.tokenizer.decode(tokens, skip_special_tokens=True).strip())
+        return results
+
+    @staticmethod
+    def _split_sentences(messages: List[Dict]) -> List[str]:
+        """取最后一条用户消息，按<...>拆分为待翻译的句子"""
+        content = ""
+        for msg in reversed(messages):
+            if msg.get("role") == "user":
+                content = msg.get("content", "")
+                break
+        sentences = BracketScanner().feed(content)
+        if not sentences and content.strip():
+            sentences = [content.strip()]
+        return sentences
+
+    def generate_response(self, messages: List[Dict]) -> str:
+        """翻译最后一条用户消息，保持<...>格式"""
+        if self.encoder is None or self.tokenizer is None:
+            error_message = "本地翻译模型未初始化，请检查LOCAL_TRANSLATE_MODEL_PATH"
+            logger.error(error_message)
+            return error_message
+
+        sentences = self._split_sentences(messages)
+        if not sentences:
+            return ""
+        translations = self.translate_batch(sentences)
+        # 译文中的<>会破坏句子边界，去掉
+        return "".join(f"<{text.replace('<', '').replace('>', '')}>" for text in translations)
+
+    async def generate_response_async(self, messages: List[Dict]) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.generate_response, messages)
+
+    async def generate_stream_response(self, messages: List[Dict]) -> AsyncGenerator[str, None]:
+        """本地模型一次性完成整批翻译，再按句子依次返回"""
+        response = await self.generate_response_async(messages)
+        sentences = BracketScanner().feed(response)
+        if not sentences:
+            yield response
+            return
+        for sentence in sentences:
+            yield f"<{sentence}>"
@@ -49,6 +49,9 @@ class LLMManager:
     def process_message(self, messages: List[Dict]):
         return self.provider.generate_response(messages)
 
+    async def process_message_async(self, messages: List[Dict]) -> str:
+        return await self.provider.generate_response_async(messages)
+
     async def process_message_stream(self, messages: List[Dict]):
         async for chunk in self.provider.generate_stream_response(messages):
             yield chunk
@@ -13,7 +13,7 @@ class LLMProviderFactory:
         """
         创建指定类型的大模型提供者
         
-        :param provider_type: 提供者类型 (webllm, ollama, lmstudio, gemini, qwen)
+        :param provider_type: 提供者类型 (webllm, ollama, lmstudio, gemini, qwen-translate, local-translate)
         :param config: 配置字典
         :return: 大模型提供者实例
         """
@@ -35,6 +35,11 @@ class LLMProviderFactory:
             elif provider_type == "qwen-translate":
                 logger.info("创建Qwen翻译服务提供商")
                 return QwenTranslateProvider()
+            elif provider_type == "local-translate":
+                logger.info("创建本地离线翻译服务提供商")
+                # 仅在使用时导入，避免未使用本地翻译时加载分词器
+                from ling_chat.core.llm_providers.local_translate import LocalTranslateProvider
+                return LocalTranslateProvider()
             else:
                 raise ValueError(f"暂未支持的提供商: {provider_type}")
         except Exception as e:
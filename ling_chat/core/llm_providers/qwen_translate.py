@@ -1,5 +1,5 @@
 import os
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from .base import BaseLLMProvider
 from typing import Dict, List, AsyncGenerator
 from ling_chat.core.logger import logger
@@ -8,6 +8,7 @@ class QwenTranslateProvider(BaseLLMProvider):
     def __init__(self):
         super().__init__()
         self.client = None
+        self.async_client = None
         self.model_type = None
         self.initialize_client()
     
@@ -20,28 +21,26 @@ class QwenTranslateProvider(BaseLLMProvider):
             error_message = "没有配置TRANSLATE_API_KEY，请检查配置"
             logger.warning(error_message)
             self.client = None
+            self.async_client = None
             return
         
         self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.async_client = AsyncOpenAI(api_key=api_key, base_url=base_url)
         self.model_type = os.environ.get("QWEN_MODEL_TYPE", "qwen-mt-plus")
 
         logger.info("Qwen翻译模型初始化完毕！")
     
-    def generate_response(self, messages: List[Dict]) -> str:
-        """生成Qwen模型响应"""
-        if self.client is None or self.model_type is None:
-            error_message = "Qwen翻译模型未初始化，请检查配置"
-            logger.error(error_message)
-            return error_message
-            
-        # 只提取最后助手的回答
-        filtered_messages = []
+    @staticmethod
+    def _filter_messages(messages: List[Dict]) -> List[Dict]:
+        """只提取最后一条用户消息（待翻译内容）"""
         for msg in reversed(messages):
             if msg.get("role") == "user":
-                filtered_messages = [msg]
-                break
+                return [msg]
+        return []
 
-        translation_options = {
+    @staticmethod
+    def _translation_options() -> Dict:
+        return {
             "source_lang": "auto",
             "target_lang": "ja",
             "domains": "You are a 2D character dialogue translator, free translation is allowed to ensure fluency, naturalness, and vividness. Your translation format should be identical to the original text, with no extra content added.",
@@ -57,6 +56,16 @@ class QwenTranslateProvider(BaseLLMProvider):
                     ]
         }
 
+    def generate_response(self, messages: List[Dict]) -> str:
+        """生成Qwen模型响应"""
+        if self.client is None or self.model_type is None:
+            error_message = "Qwen翻译模型未初始化，请检查配置"
+            logger.error(error_message)
+            return error_message
+            
+        filtered_messages = self._filter_messages(messages)
+        translation_options = self._translation_options()
+
         try:
             logger.debug(f"正在对Qwen翻译模型发送请求: {self.model_type}")
             response = self.client.chat.completions.create(
@@ -73,44 +82,48 @@ class QwenTranslateProvider(BaseLLMProvider):
             logger.error(f"Qwen翻译模型请求失败: {str(e)}")
             raise
     
+    async def generate_response_async(self, messages: List[Dict]) -> str:
+        """使用异步客户端生成Qwen模型响应，不阻塞事件循环"""
+        if self.async_client is None or self.model_type is None:
+            error_message = "Qwen翻译模型未初始化，请检查配置"
+            logger.error(error_message)
+            return error_message
+
+        try:
+            logger.debug(f"正在对Qwen翻译模型发送异步请求: {self.model_type}")
+            response = await self.async_client.chat.completions.create(
+                model=str(self.model_type),
+                messages=self._filter_messages(messages),  # type: ignore
+                stream=False,
+                extra_body={
+                    "translation_options": self._translation_options()
+                }
+            )
+            return response.choices[0].message.content or ""
+
+        except Exception as e:
+            logger.error(f"Qwen翻译模型请求失败: {str(e)}")
+            raise
+    
     async def generate_stream_response(self, messages: List[Dict]) -> AsyncGenerator[str, None]:
         """
         生成流式响应
         :param messages: 消息列表
         :return: 返回一个生成器，每次迭代返回一个chunk
         """
-        if self.client is None or self.model_type is None:
+        if self.async_client is None or self.model_type is None:
             error_message = "Qwen翻译模型未初始化，请检查配置"
             logger.error(error_message)
             yield error_message
             return
         
-        # 只提取最后助手的回答
-        filtered_messages = []
-        for msg in reversed(messages):
-            if msg.get("role") == "user":
-                filtered_messages = [msg]
-                break
-
-        translation_options = {
-            "source_lang": "auto",
-            "target_lang": "ja",
-            "domains": "You are a 2D character dialogue translator, free translation is allowed to ensure fluency, naturalness, and vividness. Your translation format should be identical to the original text, with no extra content added.",
-            "terms": [
-                {
-                    "source": "<",
-                    "target": "<"
-                },
-                {
-                    "source": ">",
-                    "target": ">"
-                }
-                    ]
-        }
+        filtered_messages = self._filter_messages(messages)
+        translation_options = self._translation_options()
 
         try:
             logger.debug(f"正在对Qwen翻译模型发送流式请求: {self.model_type}")
-            stream = self.client.chat.completions.create(
+            # 使用异步客户端，逐块等待时不阻塞事件循环，也能被 wait_for 超时取消
+            stream = await self.async_client.chat.completions.create(
                 model=str(self.model_type),
                 messages=filtered_messages,  # type: ignore
                 stream=True,
@@ -121,8 +134,8 @@ class QwenTranslateProvider(BaseLLMProvider):
             
             # 跟踪已发送的内容
             sent_content = ""
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content is not None:
                     new_content = chunk.choices[0].delta.content
                     # 计算需要发送的新内容（去除已经发送的部分）
                     delta_content = new_content[len(sent_content):]
@@ -1,13 +1,21 @@
 import os
+import re
 import json
 import asyncio
 import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict
 
 from ling_chat.core.logger import logger, TermColors
 from ling_chat.utils.runtime_path import user_data_path
 from ling_chat.core.llm_providers.manager import LLMManager
 
+# 记忆库文件格式版本（1: 带缩进的旧格式，无version字段）
+MEMORY_FORMAT_VERSION = 2
+
+
 class MemorySystem:
     '''
     多维结构化记忆库系统 (Structured Memory Bank) - 修正版
@@ -18,6 +26,21 @@ class MemorySystem:
     3. 提供给 RAGManager 准确的切片位置，保证未总结的消息永远保留在 Context 中。
     '''
 
+    # 所有角色共享的记忆更新线程池（有界），避免后台总结占满默认线程池
+    # 第一次使用时才创建，保证 .env 中的 MEMORY_UPDATE_WORKERS 已经加载
+    _executor: ThreadPoolExecutor | None = None
+    _executor_lock = threading.Lock()
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        with cls._executor_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(os.environ.get("MEMORY_UPDATE_WORKERS", 1) or 1)),
+                    thread_name_prefix="memory-update"
+                )
+            return cls._executor
+
     def __init__(self, config, character_id: int):
         self.character_id = character_id if character_id is not None else 0
         self.config = config
@@ -29,6 +52,8 @@ class MemorySystem:
         
         self.is_updating = False
         self.last_processed_idx = 0
+        self._update_task: asyncio.Task | None = None
+        self._save_lock = threading.Lock()
         
         # 记忆数据结构，可以改
         self.memory_data = {
@@ -105,30 +130,76 @@ class MemorySystem:
             )
         }
 
+        # 一次请求同时更新四个部分，只需上传一次对话日志
+        section_rules = "\n".join(
+            f"【{key}】\n{prompt[len(base_role):].strip()}\n" for key, prompt in self.section_prompts.items()
+        )
+        self.structured_prompt = (
+            f"{base_role}\n"
+            "本次需要同时更新记忆档案的四个部分，各部分的要求如下：\n\n"
+            f"{section_rules}\n"
+            "【输出格式】：只输出一个JSON对象，不要包含代码块标记或其他任何文字，"
+            "键必须为 short_term、long_term、user_info、promises，值为对应部分更新后的文本。\n"
+        )
+
     def _load_memory(self):
-        """加载 JSON 记忆文件"""
+        """加载 JSON 记忆文件（兼容没有version字段的旧格式）"""
         if self.memory_file.exists():
             try:
                 with open(self.memory_file, "r", encoding="utf-8") as f:
                     data = json.load(f)
-                    self.memory_data.update(data.get("data", {}))
-                    self.last_processed_idx = data.get("meta", {}).get("last_processed_idx", 0)
-                    logger.info(f"记忆库已加载，历史归档指针位置: {self.last_processed_idx}")
+                version = data.get("version", 1)
+                if version > MEMORY_FORMAT_VERSION:
+                    logger.warning(f"记忆库文件版本({version})高于当前支持的版本({MEMORY_FORMAT_VERSION})，将尝试按当前格式读取")
+                self.memory_data.update(data.get("data", {}))
+                self.last_processed_idx = data.get("meta", {}).get("last_processed_idx", 0)
+                logger.info(f"记忆库已加载，历史归档指针位置: {self.last_processed_idx}")
             except Exception as e:
                 logger.error(f"记忆库加载失败: {e}")
 
+    def _build_save_content(self) -> str:
+        """序列化当前记忆（紧凑格式）"""
+        save_content = {
+            "version": MEMORY_FORMAT_VERSION,
+            "meta": {
+                "last_processed_idx": self.last_processed_idx,
+                "updated_at": time.strftime("%Y-%m-%d %H:%M:%S")
+            },
+            "data": self.memory_data
+        }
+        return json.dumps(save_content, ensure_ascii=False, separators=(",", ":"))
+
+    def _write_atomic(self, content: str) -> None:
+        """先写入同目录下的临时文件，再用os.replace原子替换，写入中途崩溃不会损坏原文件"""
+        with self._save_lock:
+            self.memory_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.memory_dir, prefix=f".{self.memory_file.name}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.memory_file)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+
     def save_memory(self):
-        """持久化保存"""
+        """持久化保存（同步，在事件循环中请使用save_memory_async）"""
+        try:
+            self._write_atomic(self._build_save_content())
+            logger.info("记忆库已保存到磁盘。")
+        except Exception as e:
+            logger.error(f"记忆库保存失败: {e}")
+
+    async def save_memory_async(self):
+        """在事件循环中序列化当前快照，写盘放到线程中执行"""
         try:
-            save_content = {
-                "meta": {
-                    "last_processed_idx": self.last_processed_idx,
-                    "updated_at": time.strftime("%Y-%m-%d %H:%M:%S")
-                },
-                "data": self.memory_data
-            }
-            with open(self.memory_file, "w", encoding="utf-8") as f:
-                json.dump(save_content, f, ensure_ascii=False, indent=2)
+            content = self._build_save_content()
+            await asyncio.to_thread(self._write_atomic, content)
             logger.info("记忆库已保存到磁盘。")
         except Exception as e:
             logger.error(f"记忆库保存失败: {e}")
@@ -166,18 +237,68 @@ class MemorySystem:
         
         target_idx = len(history_messages)
         
-        chat_text = ""
+        lines = []
         for msg in new_msgs:
             role = "User" if msg['role'] == 'user' else "AI"
             content = msg.get('content', '')
             if not content.startswith("{系统"):
-                chat_text += f"{role}: {content}\n"
+                lines.append(f"{role}: {content}\n")
+        chat_text = "".join(lines)
 
         if not chat_text.strip():
             self.is_updating = False
             return
 
-        asyncio.create_task(self._run_update_pipeline(chat_text, target_idx))
+        self._update_task = asyncio.create_task(self._run_update_pipeline(chat_text, target_idx))
+
+    async def _call_llm(self, prompt: str) -> str:
+        """在记忆专用线程池中调用模型"""
+        loop = asyncio.get_running_loop()
+        messages = [{"role": "user", "content": prompt}]
+        response = await loop.run_in_executor(self._get_executor(), self.llm.process_message, messages)
+        return (response or "").strip()
+
+    @staticmethod
+    def _parse_sections(response: str) -> Dict[str, str]:
+        """从模型输出中解析JSON，只保留非空的字符串字段"""
+        match = re.search(r"\{.*\}", response, re.S)
+        if not match:
+            return {}
+        try:
+            data = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return {key: value.strip() for key, value in data.items()
+                if isinstance(value, str) and value.strip()}
+
+    async def _update_all_sections(self, chat_text: str) -> Dict[str, str]:
+        """一次结构化请求更新全部四个部分"""
+        old_memory = json.dumps(self.memory_data, ensure_ascii=False)
+        full_prompt = (
+            f"{self.structured_prompt}\n\n"
+            f"【旧内容】：\n{old_memory}\n\n"
+            f"【新增对话】：\n{chat_text}\n\n"
+            f"【新内容】(只输出JSON)："
+        )
+        try:
+            return self._parse_sections(await self._call_llm(full_prompt))
+        except Exception as e:
+            logger.warning(f"Memory: 结构化更新请求失败，将逐项更新: {e}")
+            return {}
+
+    async def _update_section(self, section_key: str, chat_text: str) -> str:
+        """单独更新某一部分（结构化输出缺少该部分时的回退）"""
+        old_content = self.memory_data.get(section_key, "")
+        full_prompt = (
+            f"{self.section_prompts[section_key]}\n\n"
+            f"【旧内容】：\n{old_content}\n\n"
+            f"【新增对话】：\n{chat_text}\n\n"
+            f"【新内容】(直接输出结果，不要废话)："
+        )
+        cleaned = await self._call_llm(full_prompt)
+        return cleaned if cleaned else old_content
 
     async def _run_update_pipeline(self, chat_text: str, new_total_idx: int):
         """
@@ -187,45 +308,24 @@ class MemorySystem:
         try:
             logger.info(f"Memory: 开始处理记忆压缩 (范围: {self.last_processed_idx} -> {new_total_idx})...")
             start_time = time.time()
-            loop = asyncio.get_running_loop()
-
-            async def update_section(section_key: str):
-                old_content = self.memory_data.get(section_key, "")
-                prompt_req = self.section_prompts[section_key]
-                
-                full_prompt = (
-                    f"{prompt_req}\n\n"
-                    f"【旧内容】：\n{old_content}\n\n"
-                    f"【新增对话】：\n{chat_text}\n\n"
-                    f"【新内容】(直接输出结果，不要废话)："
-                )
-                
-                messages = [{"role": "user", "content": full_prompt}]
-                response = await loop.run_in_executor(None, self.llm.process_message, messages)
-                
-                cleaned = response.strip()
-                if not cleaned: 
-                    return section_key, old_content 
-                return section_key, cleaned
-
-            tasks = [
-                update_section("short_term"),
-                update_section("long_term"),
-                update_section("user_info"),
-                update_section("promises")
-            ]
-            
-            results = await asyncio.gather(*tasks)
-            
-            for key, new_val in results:
-                self.memory_data[key] = new_val
+
+            updates = await self._update_all_sections(chat_text)
+
+            missing = [key for key in self.section_prompts if key not in updates]
+            if missing:
+                logger.warning(f"Memory: 结构化输出缺少 {missing}，逐项补充更新")
+                results = await asyncio.gather(*(self._update_section(key, chat_text) for key in missing))
+                updates.update(zip(missing, results))
+
+            for key in self.section_prompts:
+                self.memory_data[key] = updates[key]
 
             self.last_processed_idx = new_total_idx
-            self.save_memory()
+            await self.save_memory_async()
             
             logger.info_color(f"Memory: 记忆库更新完成! 指针已移动至 {self.last_processed_idx}，耗时 {time.time() - start_time:.2f}s", TermColors.GREEN)
 
         except Exception as e:
             logger.error(f"Memory 更新流水线严重错误: {e}", exc_info=True)
         finally:
-            self.is_updating = False
\ No newline at end of file
+            self.is_updating = False
@@ -3,6 +3,8 @@ from .responses import *
 from typing import Dict
 import os
 
+from ling_chat.core.TTS.audio_memory_cache import audio_memory_cache
+
 class ResponseFactory:
     @staticmethod
     def create_reply(seg: Dict, user_message: str, is_final: bool) -> ReplyResponse:
@@ -12,7 +14,7 @@ class ResponseFactory:
             originalTag=seg['original_tag'],
             message=seg['following_text'],
             motionText=seg['motion_text'],
-            audioFile=os.path.basename(seg['voice_file']) if os.path.exists(seg['voice_file']) else None,
+            audioFile=os.path.basename(seg['voice_file']) if audio_memory_cache.exists(seg['voice_file']) else None,
             originalMessage=user_message,
             isFinal=is_final
         )
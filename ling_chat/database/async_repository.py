@@ -0,0 +1,52 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from ling_chat.database.character_model import CharacterModel
+from ling_chat.database.conversation_model import ConversationModel
+from ling_chat.database.user_model import UserModel, UserConversationModel
+
+T = TypeVar("T")
+
+# 数据库线程池：每个线程持有自己的复用连接（见 database.get_db_connection）
+_db_executor = ThreadPoolExecutor(max_workers=max(1, int(os.environ.get("DB_WORKERS", 4))),
+                                  thread_name_prefix="db")
+
+
+async def run_in_db_thread(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在数据库线程池中执行阻塞的数据库操作，不阻塞事件循环"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, functools.partial(func, *args, **kwargs))
+
+
+class AsyncRepository:
+    """
+    模型类的异步包装
+
+    提供与被包装模型相同的方法，调用时返回协程，实际操作在数据库线程池中执行，例如：
+        messages = await conversation_repository.get_conversation_messages(conversation_id=1)
+    """
+
+    def __init__(self, model: type):
+        self._model = model
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        method = getattr(self._model, name)
+        if not callable(method):
+            return method
+
+        @functools.wraps(method)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return await run_in_db_thread(method, *args, **kwargs)
+
+        # 缓存包装后的方法，避免每次访问都重新创建
+        setattr(self, name, wrapper)
+        return wrapper
+
+
+conversation_repository = AsyncRepository(ConversationModel)
+character_repository = AsyncRepository(CharacterModel)
+user_repository = AsyncRepository(UserModel)
+user_conversation_repository = AsyncRepository(UserConversationModel)
@@ -1,7 +1,10 @@
 from typing import List, Dict, Optional
+import hashlib
 import os
+import sqlite3
 from pathlib import Path
 import shutil
+from ling_chat.core.logger import logger
 from ling_chat.utils.function import Function
 from ling_chat.database.database import get_db_connection
 from ling_chat.utils.runtime_path import static_path
@@ -110,9 +113,6 @@ class CharacterModel:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        # 启用外键支持
-        cursor.execute("PRAGMA foreign_keys = ON")
-
         try:
             # 先检查角色是否存在
             cursor.execute("SELECT id FROM characters WHERE id = ?", (character_id,))
@@ -138,7 +138,8 @@ class CharacterModel:
         功能:
         1. 创建数据库中不存在的新角色
         2. 更新已有角色的标题
-        3. 删除数据库中资源路径不存在的角色
+        3. 删除数据库中资源路径不存在、且没有对话或用户引用的角色
+        settings.txt 的修改时间和上次同步时相同的角色直接跳过，所有修改在一个事务中完成
         """
         new_character_ids = []
         characters_dir = str(game_data_path / 'characters')
@@ -152,60 +153,94 @@ class CharacterModel:
                 # copy game_data_template_path to characters_dir
                 shutil.copytree(game_data_template_path, characters_dir, dirs_exist_ok=True)
 
-        # 获取数据库中所有角色及其资源路径
-        all_db_characters = CharacterModel.get_all_characters()
-        db_characters_map = {char['resource_path']: char for char in all_db_characters}
-        db_resource_paths = set(db_characters_map.keys())
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        try:
+            # 获取数据库中所有角色及其资源路径、上次同步时settings.txt的修改时间和哈希
+            cursor.execute("SELECT id, title, resource_path, settings_mtime, settings_hash FROM characters")
+            db_characters_map = {row['resource_path']: dict(row) for row in cursor.fetchall()}
 
-        # 收集实际存在的角色资源路径
-        existing_resource_paths = set()
+            # 收集实际存在的角色资源路径
+            existing_resource_paths = set()
 
-        for character_name in os.listdir(characters_dir):
-            character_path = os.path.join(characters_dir, character_name)
-            if not os.path.isdir(character_path) or character_name == 'avatar':
-                continue
+            for entry in os.scandir(characters_dir):
+                character_name = entry.name
+                if not entry.is_dir() or character_name == 'avatar':
+                    continue
 
-            settings_path = os.path.join(character_path, 'settings.txt')
-            if not os.path.exists(settings_path):
-                continue
+                settings_path = os.path.join(entry.path, 'settings.txt')
+                try:
+                    settings_mtime = os.stat(settings_path).st_mtime_ns
+                except FileNotFoundError:
+                    continue
 
-            try:
-                settings = Function.parse_enhanced_txt(settings_path)
                 resource_path = os.path.join(characters_dir, character_name)
                 existing_resource_paths.add(resource_path)
-
-                # 从settings中获取title，如果没有则使用角色名
-                title = settings.get('title', character_name)
-
-                # 检查角色是否已存在
                 existing_char = db_characters_map.get(resource_path)
-                if not existing_char:
-                    # 创建新角色
-                    char_id = CharacterModel.create_character(
-                        title=title,
-                        resource_path=resource_path
-                    )
-                    if char_id:
-                        new_character_ids.append(char_id)
-                else:
-                    # 更新现有角色的标题
-                    if existing_char['title'] != title:
-                        CharacterModel.update_character_title(
-                            existing_char['id'],
-                            title
+
+                # settings.txt 没有修改过，跳过
+                if existing_char and existing_char['settings_mtime'] == settings_mtime:
+                    continue
+
+                try:
+                    with open(settings_path, 'rb') as f:
+                        settings_hash = hashlib.sha1(f.read()).hexdigest()
+
+                    if existing_char and existing_char['settings_hash'] == settings_hash:
+                        # 只是修改时间变了，内容没变
+                        cursor.execute("UPDATE characters SET settings_mtime = ? WHERE id = ?",
+                                       (settings_mtime, existing_char['id']))
+                        continue
+
+                    settings = Function.parse_enhanced_txt(settings_path)
+                    # 从settings中获取title，如果没有则使用角色名
+                    title = settings.get('title', character_name)
+
+                    if not existing_char:
+                        # 创建新角色
+                        cursor.execute(
+                            "INSERT INTO characters (title, resource_path, settings_mtime, settings_hash) "
+                            "VALUES (?, ?, ?, ?)",
+                            (title, resource_path, settings_mtime, settings_hash)
+                        )
+                        new_character_ids.append(cursor.lastrowid)
+                    else:
+                        # 更新现有角色的标题和变更检测信息
+                        cursor.execute(
+                            "UPDATE characters SET title = ?, settings_mtime = ?, settings_hash = ? WHERE id = ?",
+                            (title, settings_mtime, settings_hash, existing_char['id'])
                         )
-            except Exception as e:
-                print(f"处理角色 {character_name} 时出错: {str(e)}")
-                continue
-
-        # 找出需要删除的角色(数据库中存在但文件系统中不存在的资源路径)
-        paths_to_delete = db_resource_paths - existing_resource_paths
-        for path in paths_to_delete:
-            character = db_characters_map[path]
-            try:
-                CharacterModel.delete_character(character['id'])
-                print(f"已删除不存在的角色: {character['title']} (ID: {character['id']})")
-            except Exception as e:
-                print(f"删除角色 {character['title']} 时出错: {str(e)}")
-
-        return new_character_ids
\ No newline at end of file
+                except Exception as e:
+                    print(f"处理角色 {character_name} 时出错: {str(e)}")
+                    continue
+
+            # 找出需要删除的角色(数据库中存在但文件系统中不存在的资源路径)
+            paths_to_delete = set(db_characters_map) - existing_resource_paths
+            for path in paths_to_delete:
+                character = db_characters_map[path]
+                # 外键开启时删除角色会级联删除它的全部对话，仍被对话或用户引用的角色只保留记录
+                cursor.execute(
+                    "SELECT EXISTS(SELECT 1 FROM conversations WHERE character = ?) "
+                    "OR EXISTS(SELECT 1 FROM users WHERE last_chat_character = ?)",
+                    (character['id'], character['id'])
+                )
+                if cursor.fetchone()[0]:
+                    logger.warning(f"角色目录已不存在，但仍有对话或用户引用，保留角色: "
+                                   f"{character['title']} (ID: {character['id']})")
+                    continue
+                try:
+                    cursor.execute("DELETE FROM characters WHERE id = ?", (character['id'],))
+                    print(f"已删除不存在的角色: {character['title']} (ID: {character['id']})")
+                except sqlite3.Error as e:
+                    # 失败的语句单独回滚，不影响本次同步的其他修改
+                    print(f"删除角色 {character['title']} 时出错: {str(e)}")
+
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+        return new_character_ids
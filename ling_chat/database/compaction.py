@@ -0,0 +1,175 @@
+import asyncio
+import os
+import threading
+
+from ling_chat.core.logger import logger
+from ling_chat.database import database
+from ling_chat.database.database import CONTENT_PLAIN, compress_content, get_db_connection
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class MessageCompactor:
+    """
+    聊天记录整理
+
+    定期把较早的消息内容压缩存储（每个对话最近的若干条保持不压缩，加载对话时不需要解压），
+    然后以增量方式回收空闲页，让数据库文件随之变小。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.keep_recent = 0
+        self.min_bytes = 0
+        self.codec = "zlib"
+        self.interval = 0.0
+        self.batch_size = 500
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()  # 整理进行中时持有，退出时等待它结束再关闭数据库连接
+        self._task: asyncio.Task | None = None
+
+    def _load_config(self) -> None:
+        """读取配置（需在环境变量加载后调用）"""
+        self.enabled = os.environ.get("DB_COMPACTION_ENABLED", "false").lower() == "true"
+        self.keep_recent = int(os.environ.get("DB_COMPACTION_KEEP_RECENT", 200))
+        self.min_bytes = int(os.environ.get("DB_COMPACTION_MIN_BYTES", 256))
+        self.codec = os.environ.get("DB_COMPACTION_CODEC", "zlib").lower()
+        self.interval = float(os.environ.get("DB_COMPACTION_INTERVAL_HOURS", 24)) * 3600
+
+    @staticmethod
+    def database_size() -> int:
+        """数据库文件大小（包括WAL文件）"""
+        return sum(os.path.getsize(path) for path in (database.DB_NAME, database.DB_NAME + "-wal")
+                   if os.path.exists(path))
+
+    def compact(self) -> dict:
+        """
+        执行一次整理
+
+        :return: 压缩的消息数，以及整理前后的数据库文件大小（字节）
+        """
+        with self._lock:
+            return self._compact()
+
+    def _compact(self) -> dict:
+        conn = get_db_connection()
+        size_before = self.database_size()
+
+        # 每个对话按ID倒序编号，排在最近 keep_recent 条之后且足够长的消息才压缩
+        message_ids = [row[0] for row in conn.execute(
+            """
+            SELECT id FROM (
+                SELECT id, content,
+                       ROW_NUMBER() OVER (PARTITION BY owned_conversation ORDER BY id DESC) AS recent_rank
+                FROM messages WHERE compressed = ?
+            )
+            WHERE recent_rank > ? AND length(CAST(content AS BLOB)) >= ?
+            """,
+            (CONTENT_PLAIN, self.keep_recent, self.min_bytes)
+        )]
+
+        compressed_count = 0
+        for start in range(0, len(message_ids), self.batch_size):
+            if self._stop.is_set():
+                break
+            batch = message_ids[start:start + self.batch_size]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT id, content FROM messages WHERE id IN ({placeholders}) AND compressed = ?",
+                batch + [CONTENT_PLAIN]
+            ).fetchall()
+            updates = []
+            for row in rows:
+                data, flag = compress_content(row["content"], self.codec)
+                # 压缩后没有变小的保持原样
+                if len(data) < len(row["content"].encode("utf-8")):
+                    updates.append((data, flag, row["id"]))
+            # 分批提交，避免长时间占用写锁
+            try:
+                conn.executemany("UPDATE messages SET content = ?, compressed = ? WHERE id = ?", updates)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            compressed_count += len(updates)
+
+        if not self._stop.is_set():
+            self._reclaim_space(conn)
+        conn.close()
+
+        result = {"compressed": compressed_count, "size_before": size_before, "size_after": self.database_size()}
+        logger.info(f"聊天记录整理完成: 压缩{compressed_count}条消息，数据库 "
+                    f"{size_before / 1024 / 1024:.1f}MB -> {result['size_after'] / 1024 / 1024:.1f}MB")
+        return result
+
+    @staticmethod
+    def _reclaim_space(conn) -> None:
+        """回收空闲页并把WAL合并回数据库文件"""
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+            conn.execute("PRAGMA incremental_vacuum")
+        else:
+            # 完整VACUUM会长时间占用连接和写锁，不在服务期间执行，留到下次启动时转换
+            logger.info("数据库尚未转换为增量回收模式，本次跳过空间回收，将在下次启动时转换")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    @staticmethod
+    def convert_auto_vacuum() -> bool:
+        """
+        把旧数据库转换为增量回收模式（需要完整VACUUM一次，只在开始服务前调用）
+
+        :return: 是否执行了转换
+        """
+        conn = get_db_connection()
+        try:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+                return False
+            logger.info("正在把数据库转换为增量回收模式，首次需要完整整理一次...")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            logger.info("数据库已转换为增量回收模式")
+            return True
+        finally:
+            conn.close()
+
+    async def run(self) -> None:
+        """后台整理循环"""
+        while True:
+            try:
+                await asyncio.to_thread(self.compact)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"聊天记录整理出错: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """在当前事件循环中启动后台整理任务（旧数据库在此先转换为增量回收模式，应在开始服务前调用）"""
+        self._load_config()
+        if not self.enabled or self.interval <= 0:
+            return
+        self.convert_auto_vacuum()
+        if self._task is None or self._task.done():
+            self._stop.clear()
+            self._task = asyncio.create_task(self.run(), name="MessageCompactor")
+            logger.info(f"已启用聊天记录整理，每个对话最近{self.keep_recent}条消息不压缩")
+
+    async def stop(self) -> None:
+        """停止后台整理任务（正在进行的整理会在当前批次结束后停止）"""
+        if self._task is not None:
+            self._stop.set()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            # 取消任务不会中断线程中正在执行的整理，等它在当前批次后退出
+            await asyncio.to_thread(self._wait_idle)
+
+    def _wait_idle(self) -> None:
+        with self._lock:
+            pass
+
+
+message_compactor = MessageCompactor()
@@ -1,8 +1,25 @@
-from typing import List, Dict, Optional
-import json
+from typing import List, Dict, Optional, TypedDict
 from ling_chat.database.database import get_db_connection, Role
 
 
+class ChatMessage(TypedDict):
+    role: str
+    content: str
+
+
+class MessageRecord(TypedDict):
+    id: int
+    role: str
+    content: str
+    created_at: str
+
+
+class MessagePage(TypedDict):
+    messages: List[MessageRecord]
+    next_before_id: Optional[int]
+
+
+
 class ConversationModel:
     @staticmethod
     def create_conversation(user_id: int, messages: List[Dict[str, str]], character_id: int, title: Optional[str] = None) -> int:
@@ -22,11 +39,6 @@ class ConversationModel:
             title = (first_user_msg["content"][:20] + "...") if first_user_msg else "New Conversation"
 
         conn = get_db_connection()
-        # 优化设置（仅用于批量导入）
-        conn.execute("PRAGMA synchronous = OFF")
-        conn.execute("PRAGMA journal_mode = MEMORY")
-        conn.execute("PRAGMA cache_size = 100000")
-        
         cursor = conn.cursor()
         
         try:
@@ -37,44 +49,9 @@ class ConversationModel:
             )
             conversation_id = cursor.lastrowid
             
-            # 2. 批量插入消息（分批次防止SQL过长）
-            BATCH_SIZE = 500  # 每次插入500条
-            msg_ids = []
-            
-            for i in range(0, len(messages), BATCH_SIZE):
-                batch = messages[i:i+BATCH_SIZE]
-                placeholders = ",".join(["(?,?,?)"]*len(batch))
-                params = []
-                for msg in batch:
-                    params.extend([msg["role"], msg["content"], conversation_id])
-                
-                cursor.execute(
-                    f"INSERT INTO messages (role, content, owned_conversation) VALUES {placeholders}",
-                    params
-                )
-                
-                # 获取这批消息的ID（假设是连续分配的）
-                first_id = cursor.lastrowid - len(batch) + 1
-                msg_ids.extend(range(first_id, first_id + len(batch)))
-            
-            # 3. 批量插入关系（同样分批次）
-            relations = [(msg_ids[i], msg_ids[i+1]) for i in range(len(msg_ids)-1)]
-            for i in range(0, len(relations), BATCH_SIZE):
-                batch = relations[i:i+BATCH_SIZE]
-                placeholders = ",".join(["(?,?)"]*len(batch))
-                params = [item for pair in batch for item in pair]
-                
-                cursor.execute(
-                    f"INSERT INTO message_relations (parent_id, child_id) VALUES {placeholders}",
-                    params
-                )
-            
-            # 4. 更新最后消息
-            cursor.execute(
-                "UPDATE conversations SET last_message_id=?, updated_at=datetime('now') WHERE id=?",
-                (msg_ids[-1], conversation_id)
-            )
-            
+            # 2. 插入消息、父子关系并更新最后消息
+            ConversationModel._insert_chain(cursor, conversation_id, None, messages)
+
             conn.commit()
             return conversation_id
         
@@ -82,15 +59,43 @@ class ConversationModel:
             conn.rollback()
             raise e
         finally:
-            # 恢复默认设置
-            conn.execute("PRAGMA synchronous = NORMAL")
-            conn.execute("PRAGMA journal_mode = DELETE")
             conn.close()
 
     @staticmethod
-    def append_messages_to_conversation(conversation_id: int, messages: List[Dict[str, str]]) -> None:
+    def _insert_chain(cursor, conversation_id: int, parent_id: Optional[int],
+                      messages: List[Dict[str, str]]) -> List[int]:
+        """在同一事务中插入一串消息，第一条接在parent_id之后（None表示作为新的根消息），返回新消息ID"""
+        cursor.executemany(
+            "INSERT INTO messages (role, content, owned_conversation) VALUES (?, ?, ?)",
+            [(msg["role"], msg["content"], conversation_id) for msg in messages]
+        )
+
+        # 同一事务内写锁未释放，ID单调递增，该对话最新的N条即为刚插入的消息
+        cursor.execute(
+            "SELECT id FROM messages WHERE owned_conversation = ? ORDER BY id DESC LIMIT ?",
+            (conversation_id, len(messages))
+        )
+        msg_ids = [r["id"] for r in cursor.fetchall()][::-1]
+
+        chain = ([parent_id] if parent_id else []) + msg_ids
+        cursor.executemany(
+            "INSERT INTO message_relations (parent_id, child_id) VALUES (?, ?)",
+            list(zip(chain, chain[1:]))
+        )
+
+        # 新插入的最后一条成为对话当前分支的末尾
+        cursor.execute(
+            "UPDATE conversations SET last_message_id = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (msg_ids[-1], conversation_id)
+        )
+        return msg_ids
+
+    @staticmethod
+    def append_messages_to_conversation(conversation_id: int, messages: List[Dict[str, str]]) -> List[int]:
         """
         向已有对话中追加新消息（自动建立父子关系、更新最后消息 ID）
+        只写入新增的消息，耗时与追加的条数成正比，与对话长度无关
+        :return: 新消息的ID列表
         """
         if not messages:
             raise ValueError("追加的消息列表不能为空")
@@ -104,39 +109,135 @@ class ConversationModel:
             row = cursor.fetchone()
             if not row:
                 raise ValueError(f"对话 ID {conversation_id} 不存在")
-            prev_msg_id = row["last_message_id"]
 
-            last_msg_id = None
+            msg_ids = ConversationModel._insert_chain(cursor, conversation_id, row["last_message_id"], messages)
+            conn.commit()
+            return msg_ids
 
-            for msg in messages:
-                role = msg["role"]
-                content = msg["content"]
+        except Exception as e:
+            conn.rollback()
+            raise e
 
-                # 插入消息
-                cursor.execute(
-                    "INSERT INTO messages (role, content, owned_conversation) VALUES (?, ?, ?)",
-                    (role, content, conversation_id)
-                )
-                current_msg_id = cursor.lastrowid
+        finally:
+            conn.close()
 
-                # 建立父子关系（如果不是第一条追加）
-                if prev_msg_id:
-                    cursor.execute(
-                        "INSERT INTO message_relations (parent_id, child_id) VALUES (?, ?)",
-                        (prev_msg_id, current_msg_id)
-                    )
+    @staticmethod
+    def fork_conversation(conversation_id: int, parent_id: Optional[int], messages: List[Dict[str, str]]) -> List[int]:
+        """
+        从某条消息分出新的分支，并切换到新分支
+        只插入新消息和一条父子关系，原有分支保持不变。例如：
+            重新生成回复：parent_id 为用户消息，messages 为新的回复
+            修改之前的消息：parent_id 为被修改消息的父消息，messages 为修改后的消息
+        :param parent_id: 分支点，None表示从对话开头分出
+        :return: 新消息的ID列表
+        """
+        if not messages:
+            raise ValueError("分支的消息列表不能为空")
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        try:
+            if parent_id is not None:
+                cursor.execute("SELECT owned_conversation FROM messages WHERE id = ?", (parent_id,))
+                row = cursor.fetchone()
+                if not row or row["owned_conversation"] != conversation_id:
+                    raise ValueError(f"消息 ID {parent_id} 不属于对话 {conversation_id}")
+            else:
+                cursor.execute("SELECT id FROM conversations WHERE id = ?", (conversation_id,))
+                if not cursor.fetchone():
+                    raise ValueError(f"对话 ID {conversation_id} 不存在")
+
+            msg_ids = ConversationModel._insert_chain(cursor, conversation_id, parent_id, messages)
+            conn.commit()
+            return msg_ids
+
+        except Exception as e:
+            conn.rollback()
+            raise e
+
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get_message_children(message_id: int) -> List[MessageRecord]:
+        """获取一条消息的所有直接子消息（即从这里分出的各个分支），按创建顺序排列"""
+        conn = get_db_connection()
+        try:
+            cursor = conn.execute(
+                """
+                SELECT m.id, m.role, lc_content(m.content, m.compressed) AS content, m.created_at
+                FROM message_relations r JOIN messages m ON m.id = r.child_id
+                WHERE r.parent_id = ?
+                ORDER BY m.id
+                """,
+                (message_id,)
+            )
+            return [{"id": row["id"], "role": row["role"], "content": row["content"],
+                     "created_at": row["created_at"]} for row in cursor]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get_branch_leaves(conversation_id: int) -> List[MessageRecord]:
+        """获取对话中每个分支的末尾消息（没有子消息的消息），最新的在前"""
+        conn = get_db_connection()
+        try:
+            cursor = conn.execute(
+                """
+                SELECT m.id, m.role, lc_content(m.content, m.compressed) AS content, m.created_at
+                FROM messages m
+                WHERE m.owned_conversation = ?
+                  AND NOT EXISTS (SELECT 1 FROM message_relations r WHERE r.parent_id = m.id)
+                ORDER BY m.id DESC
+                """,
+                (conversation_id,)
+            )
+            return [{"id": row["id"], "role": row["role"], "content": row["content"],
+                     "created_at": row["created_at"]} for row in cursor]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def switch_branch(conversation_id: int, message_id: int, follow_latest: bool = True) -> int:
+        """
+        切换到包含指定消息的分支
+        从该消息向下沿最新的子消息走到末尾，并把它设为对话的最后消息
+        :param follow_latest: 为False时直接以该消息作为对话的最后消息
+        :return: 切换后的最后消息ID
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
 
-                prev_msg_id = current_msg_id
-                last_msg_id = current_msg_id
+        try:
+            cursor.execute("SELECT owned_conversation FROM messages WHERE id = ?", (message_id,))
+            row = cursor.fetchone()
+            if not row or row["owned_conversation"] != conversation_id:
+                raise ValueError(f"消息 ID {message_id} 不属于对话 {conversation_id}")
+
+            leaf_id = message_id
+            if follow_latest:
+                # 子消息总是晚于父消息创建，沿途的最大ID即为最新的末尾
+                cursor.execute(
+                    """
+                    WITH RECURSIVE down(id) AS (
+                        SELECT ?
+                        UNION ALL
+                        SELECT (SELECT MAX(r.child_id) FROM message_relations r WHERE r.parent_id = down.id)
+                        FROM down WHERE down.id IS NOT NULL
+                    )
+                    SELECT MAX(id) AS leaf_id FROM down
+                    """,
+                    (message_id,)
+                )
+                leaf_id = cursor.fetchone()["leaf_id"]
 
-            # 更新对话最后消息 ID 和更新时间
             cursor.execute(
                 "UPDATE conversations SET last_message_id = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-                (last_msg_id, conversation_id)
+                (leaf_id, conversation_id)
             )
-
             conn.commit()
-            print(f"成功向对话 {conversation_id} 追加了 {len(messages)} 条消息。")
+            return leaf_id
 
         except Exception as e:
             conn.rollback()
@@ -144,6 +245,27 @@ class ConversationModel:
 
         finally:
             conn.close()
+
+    @staticmethod
+    def get_conversation_message_ids(conversation_id: int) -> List[int]:
+        """获取对话当前分支上从头到尾的消息ID"""
+        conn = get_db_connection()
+        try:
+            cursor = conn.execute(
+                """
+                WITH RECURSIVE chain(id, depth) AS (
+                    SELECT last_message_id, 0 FROM conversations WHERE id = ?
+                    UNION ALL
+                    SELECT r.parent_id, chain.depth + 1
+                    FROM message_relations r JOIN chain ON r.child_id = chain.id
+                )
+                SELECT id FROM chain WHERE id IS NOT NULL ORDER BY depth DESC
+                """,
+                (conversation_id,)
+            )
+            return [row["id"] for row in cursor]
+        finally:
+            conn.close()
     
     @staticmethod
     def change_conversation_messages(conversation_id: int, messages: List[Dict[str, str]]) -> None:
@@ -156,11 +278,6 @@ class ConversationModel:
             raise ValueError("消息列表不能为空")
 
         conn = get_db_connection()
-        # 优化设置（仅用于批量操作）
-        conn.execute("PRAGMA synchronous = OFF")
-        conn.execute("PRAGMA journal_mode = MEMORY")
-        conn.execute("PRAGMA cache_size = 100000")
-        
         cursor = conn.cursor()
         
         try:
@@ -172,44 +289,9 @@ class ConversationModel:
             # 2. 删除原有消息和关系（外键约束应该会自动删除关系）
             cursor.execute("DELETE FROM messages WHERE owned_conversation = ?", (conversation_id,))
             
-            # 3. 批量插入新消息（分批次防止SQL过长）
-            BATCH_SIZE = 500  # 每次插入500条
-            msg_ids = []
-            
-            for i in range(0, len(messages), BATCH_SIZE):
-                batch = messages[i:i+BATCH_SIZE]
-                placeholders = ",".join(["(?,?,?)"]*len(batch))
-                params = []
-                for msg in batch:
-                    params.extend([msg["role"], msg["content"], conversation_id])
-                
-                cursor.execute(
-                    f"INSERT INTO messages (role, content, owned_conversation) VALUES {placeholders}",
-                    params
-                )
-                
-                # 获取这批消息的ID（假设是连续分配的）
-                first_id = cursor.lastrowid - len(batch) + 1
-                msg_ids.extend(range(first_id, first_id + len(batch)))
-            
-            # 4. 批量插入新关系
-            relations = [(msg_ids[i], msg_ids[i+1]) for i in range(len(msg_ids)-1)]
-            for i in range(0, len(relations), BATCH_SIZE):
-                batch = relations[i:i+BATCH_SIZE]
-                placeholders = ",".join(["(?,?)"]*len(batch))
-                params = [item for pair in batch for item in pair]
-                
-                cursor.execute(
-                    f"INSERT INTO message_relations (parent_id, child_id) VALUES {placeholders}",
-                    params
-                )
-            
-            # 5. 更新最后消息和修改时间
-            cursor.execute(
-                "UPDATE conversations SET last_message_id = ?, updated_at = datetime('now') WHERE id = ?",
-                (msg_ids[-1], conversation_id)
-            )
-            
+            # 3. 插入新消息、父子关系并更新最后消息
+            ConversationModel._insert_chain(cursor, conversation_id, None, messages)
+
             conn.commit()
             print(f"成功替换对话 {conversation_id} 的消息，共 {len(messages)} 条")
 
@@ -217,65 +299,85 @@ class ConversationModel:
             conn.rollback()
             raise e
         finally:
-            # 恢复默认设置
-            conn.execute("PRAGMA synchronous = NORMAL")
-            conn.execute("PRAGMA journal_mode = DELETE")
             conn.close()
 
     
     @staticmethod
-    def get_conversation_messages(conversation_id: int) -> str:
+    def get_conversation_messages(conversation_id: int) -> List[ChatMessage]:
         """
-        高效获取对话的完整消息链：从最后一条消息向上追溯所有父节点，构建顺序列表。
-        一次性查询所有涉及的消息与关系，避免多次数据库调用。
+        获取对话的完整消息链：用递归CTE从最后一条消息沿 message_relations 向上追溯，
+        由数据库直接返回从头到尾排好序的消息列表。
         """
         conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # 获取最后一条消息 ID
-        cursor.execute(
-            "SELECT last_message_id FROM conversations WHERE id = ?",
-            (conversation_id,)
-        )
-        result = cursor.fetchone()
-        if not result or not result["last_message_id"]:
+        try:
+            # depth为距最后一条消息的距离，按depth倒序即为从头到尾的顺序
+            cursor = conn.execute(
+                """
+                WITH RECURSIVE chain(id, depth) AS (
+                    SELECT last_message_id, 0 FROM conversations WHERE id = ?
+                    UNION ALL
+                    SELECT r.parent_id, chain.depth + 1
+                    FROM message_relations r JOIN chain ON r.child_id = chain.id
+                )
+                SELECT m.role, lc_content(m.content, m.compressed) AS content
+                FROM chain JOIN messages m ON m.id = chain.id
+                ORDER BY chain.depth DESC
+                """,
+                (conversation_id,)
+            )
+            return [{"role": row["role"], "content": row["content"]} for row in cursor]
+        finally:
             conn.close()
-            print("该对话没有消息。")
-            return "[]"
-        
-        last_msg_id = result["last_message_id"]
-
-        # 获取当前对话中所有消息
-        cursor.execute(
-            "SELECT id, role, content FROM messages WHERE owned_conversation = ?",
-            (conversation_id,)
-        )
-        all_messages = {row["id"]: {"role": row["role"], "content": row["content"]} for row in cursor.fetchall()}
-
-        # 获取所有 message_relations 映射 child -> parent
-        cursor.execute(
-            "SELECT parent_id, child_id FROM message_relations "
-            "WHERE child_id IN (SELECT id FROM messages WHERE owned_conversation = ?)",
-            (conversation_id,)
-        )
-        child_to_parent = {row["child_id"]: row["parent_id"] for row in cursor.fetchall()}
 
-        conn.close()
-
-        # 从最后一条消息向上回溯链条
-        message_chain = []
-        current_id = last_msg_id
-        while current_id:
-            msg = all_messages.get(current_id)
-            if msg:
-                message_chain.append(msg)
-            current_id = child_to_parent.get(current_id)
-
-        message_chain.reverse()  # 转换为从头到尾顺序
+    @staticmethod
+    def get_conversation_messages_page(conversation_id: int, before_id: Optional[int] = None,
+                                       limit: int = 50) -> MessagePage:
+        """
+        分页获取对话消息（供前端历史记录视图按需加载）
+        :param before_id: 从这条消息的上一条开始向前取，None表示从最后一条开始
+        :param limit: 每页条数
+        :return: 按时间顺序排列的一页消息，以及加载更早一页时使用的 next_before_id（没有更多时为None）
+        """
+        conn = get_db_connection()
+        try:
+            if before_id is None:
+                start_sql = "SELECT last_message_id, 0 FROM conversations WHERE id = ?"
+                start_params: tuple = (conversation_id,)
+            else:
+                start_sql = ("SELECT r.parent_id, 0 FROM message_relations r "
+                             "JOIN messages m ON m.id = r.child_id "
+                             "WHERE r.child_id = ? AND m.owned_conversation = ?")
+                start_params = (before_id, conversation_id)
 
-        json_output = json.dumps(message_chain, ensure_ascii=False, indent=2)
+            # 多取一条用于判断是否还有更早的消息
+            cursor = conn.execute(
+                f"""
+                WITH RECURSIVE chain(id, depth) AS (
+                    {start_sql}
+                    UNION ALL
+                    SELECT r.parent_id, chain.depth + 1
+                    FROM message_relations r JOIN chain ON r.child_id = chain.id
+                    WHERE chain.depth < ?
+                )
+                SELECT m.id, m.role, lc_content(m.content, m.compressed) AS content, m.created_at
+                FROM chain JOIN messages m ON m.id = chain.id
+                ORDER BY chain.depth DESC
+                """,
+                start_params + (limit,)
+            )
+            rows: List[MessageRecord] = [
+                {"id": row["id"], "role": row["role"], "content": row["content"], "created_at": row["created_at"]}
+                for row in cursor
+            ]
+        finally:
+            conn.close()
 
-        return json_output
+        has_more = len(rows) > limit
+        messages = rows[1:] if has_more else rows
+        return {
+            "messages": messages,
+            "next_before_id": messages[0]["id"] if has_more and messages else None
+        }
 
     @staticmethod
     def update_conversation_title(conversation_id: int, title: str) -> None:
@@ -317,7 +419,6 @@ class ConversationModel:
         """
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute("PRAGMA foreign_keys = ON")  # 必须对每个连接都开启
         
         try:
             # 由于外键约束，删除对话会自动删除关联的消息和关系
@@ -1,13 +1,40 @@
 import sqlite3
 import os  # 添加os模块用于路径操作
+import threading
+import time
+import weakref
+import zlib
 from enum import Enum
 
+from ling_chat.core.logger import logger
 from ling_chat.utils.runtime_path import user_data_path
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 # 修改数据库路径到data目录
 DATA_DIR = user_data_path
 DB_NAME = os.path.join(DATA_DIR, "chat_system.db")  # 使用os.path.join确保跨平台兼容性
 
+# 每个连接打开时执行一次的设置：WAL模式下读写互不阻塞，NORMAL同步在WAL下依然不会损坏数据库
+CONNECTION_PRAGMAS = (
+    "PRAGMA auto_vacuum = INCREMENTAL",  # 只对新建的数据库立即生效，旧数据库在第一次整理时转换
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",  # 约16MB页缓存
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",
+)
+BUSY_TIMEOUT_SECONDS = 5.0
+FTS_AVAILABLE = False  # 由 init_db 检测SQLite是否支持FTS5 trigram
+
+# messages.compressed 的取值：content 的存储方式
+CONTENT_PLAIN = 0
+CONTENT_ZLIB = 1
+CONTENT_ZSTD = 2
+
 
 class Role(Enum):
     SYSTEM = "system"
@@ -15,17 +42,177 @@ class Role(Enum):
     ASSISTANT = "assistant"
 
 
-def init_db():
+def compress_content(content: str, codec: str = "zlib") -> tuple[bytes, int]:
+    """压缩消息内容，返回 (压缩后的数据, compressed标记)；codec为zstd但未安装 zstandard 时使用zlib"""
+    data = content.encode("utf-8")
+    if codec == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compress(data), CONTENT_ZSTD
+    return zlib.compress(data, 6), CONTENT_ZLIB
+
+
+def decompress_content(content, compressed: int) -> str:
+    """还原消息内容（注册为SQL函数 lc_content(content, compressed)）"""
+    if not compressed:
+        return content
+    if compressed == CONTENT_ZLIB:
+        return zlib.decompress(content).decode("utf-8")
+    if compressed == CONTENT_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("消息使用zstd压缩，需要安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(content).decode("utf-8")
+    raise ValueError(f"未知的消息压缩方式: {compressed}")
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    线程内复用的数据库连接
+
+    各模型方法仍按"获取连接 -> 查询 -> close()"的方式使用，
+    但 close() 只会回滚未提交的事务，连接本身留给同一线程的下一次调用。
+    """
+
+    pool_closed = False
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def close_pooled(self):
+        """真正关闭连接"""
+        self.pool_closed = True
+        super().close()
+
+
+_local = threading.local()
+_connections: "weakref.WeakSet[PooledConnection]" = weakref.WeakSet()
+_connections_lock = threading.Lock()
+
+
+def _open_connection() -> PooledConnection:
     # 确保data目录存在
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
 
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    # 连接只在创建它的线程中使用，关闭判断放宽是为了退出时能统一关闭
+    conn = sqlite3.connect(DB_NAME, timeout=BUSY_TIMEOUT_SECONDS, factory=PooledConnection,
+                           check_same_thread=False)
+    conn.row_factory = sqlite3.Row  # 允许以字典方式访问结果
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    # 读取消息内容时统一通过 lc_content 解压（只在查询中使用，表结构和触发器不依赖它）
+    conn.create_function("lc_content", 2, decompress_content, deterministic=True)
+    with _connections_lock:
+        _connections.add(conn)
+    return conn
+
+
+def get_db_connection() -> PooledConnection:
+    """获取当前线程的数据库连接（首次调用时打开，之后复用）"""
+    conn = getattr(_local, "conn", None)
+    if conn is None or conn.pool_closed or _local.db_name != DB_NAME:
+        conn = _open_connection()
+        _local.conn = conn
+        _local.db_name = DB_NAME
+    return conn
+
 
-    # 启用外键支持
-    cursor.execute("PRAGMA foreign_keys = ON")
+def checkpoint_db() -> None:
+    """把WAL中的内容合并回数据库文件，避免WAL文件持续增长（不等待正在进行的读操作）"""
+    get_db_connection().execute("PRAGMA wal_checkpoint(PASSIVE)")
 
+
+def close_db_connections() -> None:
+    """关闭所有线程的数据库连接（应用退出时调用）"""
+    with _connections_lock:
+        connections = list(_connections)
+        _connections.clear()
+    for conn in connections:
+        conn.close_pooled()
+
+
+def init_db():
+    """初始化数据库：执行所有未执行的结构迁移"""
+    global FTS_AVAILABLE
+    conn = get_db_connection()
+    run_migrations(conn)
+    FTS_AVAILABLE = _ensure_message_fts(conn)
+    conn.close()
+
+
+def _ensure_message_fts(conn: sqlite3.Connection) -> bool:
+    """
+    检查消息全文索引是否存在，不存在时尝试补建
+    （全文索引迁移在SQLite未编译FTS5时会跳过，之后换成支持FTS5的SQLite也能用上索引）
+
+    返回全文索引是否可用，不可用时搜索退回到LIKE查询
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'").fetchone():
+        return True
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'").fetchone():
+            conn.rollback()
+            return True
+        _create_message_fts(conn.cursor())
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        conn.rollback()
+        logger.warning(f"当前SQLite不支持FTS5 trigram，聊天记录搜索将使用LIKE查询: {e}")
+        return False
+    logger.info("已为聊天记录建立全文索引")
+    return True
+
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """
+    按版本号顺序执行未执行的迁移，每个迁移及其版本记录在同一个事务中提交
+
+    返回本次执行的迁移数量
+    """
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    conn.commit()
+    current = conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+    applied = 0
+    for version, name, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+        start = time.perf_counter()
+        # IMMEDIATE 事务在开始时就拿到写锁，同时启动的其他进程会等待而不是重复执行
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone():
+                conn.rollback()
+                continue
+            migrate(conn.cursor())
+            conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"数据库迁移 {version}_{name} 失败: {e}")
+            raise
+        applied += 1
+        logger.info(f"数据库迁移 {version}_{name} 完成，耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+    return applied
+
+
+def _ensure_columns(cursor: sqlite3.Cursor, table: str, columns: dict[str, str]) -> None:
+    """为已有的表补充缺少的列"""
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    for name, column_type in columns.items():
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
+
+# 以下迁移需要兼容引入版本表之前、由 CREATE TABLE IF NOT EXISTS 建好的旧数据库，因此都写成可重复执行的形式
+
+def _migration_initial_schema(cursor: sqlite3.Cursor) -> None:
     # 创建用户表
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS users (
@@ -91,18 +278,160 @@ def init_db():
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_message_relations_parent ON message_relations(parent_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_message_relations_child ON message_relations(child_id)")
 
-    conn.commit()
-    conn.close()
 
+def _migration_message_search(cursor: sqlite3.Cursor) -> None:
+    """
+    创建消息全文索引（FTS5 外部内容表，trigram分词以支持中日文），由触发器与 messages 保持同步
+    SQLite未编译FTS5时跳过，搜索会退回到LIKE查询
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'")
+    existed = cursor.fetchone() is not None
+    try:
+        cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+            content, content='messages', content_rowid='id', tokenize='trigram'
+        )
+        """)
+    except sqlite3.OperationalError as e:
+        # 版本照常记录，之后换成支持FTS5的SQLite时由 init_db 补建索引
+        logger.warning(f"当前SQLite不支持FTS5 trigram，聊天记录搜索将使用LIKE查询: {e}")
+        return
 
-def get_db_connection():
-    # 确保data目录存在
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """)
+    if not existed:
+        # 为已有的消息建立索引
+        cursor.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
 
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row  # 允许以字典方式访问结果
-    return conn
+
+def _migration_character_settings_tracking(cursor: sqlite3.Cursor) -> None:
+    # 角色同步用于判断 settings.txt 是否变化
+    _ensure_columns(cursor, "characters", {"settings_mtime": "INTEGER", "settings_hash": "TEXT"})
+
+
+def _migration_history_indexes(cursor: sqlite3.Cursor) -> None:
+    # 对话列表按 updated_at 倒序分页，不再需要临时排序
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_conversation_user_updated "
+                   "ON conversations(owned_user, updated_at)")
+    # 按对话取最新的消息ID（追加消息、分页加载）只需扫描索引
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_message_conversation_id ON messages(owned_conversation, id)")
+    # 单列索引是上面两个索引的前缀，已经多余
+    cursor.execute("DROP INDEX IF EXISTS idx_conversation_user")
+    cursor.execute("DROP INDEX IF EXISTS idx_message_conversation")
+
+
+def _migration_message_compression(cursor: sqlite3.Cursor) -> None:
+    """
+    消息内容支持压缩存储：compressed 标记内容的压缩方式，读取时通过 lc_content() 还原
+    全文索引改为以解压后的视图为外部内容表，触发器同样索引解压后的文本
+    """
+    _ensure_columns(cursor, "messages", {"compressed": "INTEGER NOT NULL DEFAULT 0"})
+    cursor.execute("""
+    CREATE VIEW IF NOT EXISTS messages_plain AS
+    SELECT id, lc_content(content, compressed) AS content FROM messages
+    """)
+
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'")
+    if cursor.fetchone() is None:
+        return
+    for trigger in ("messages_fts_insert", "messages_fts_delete", "messages_fts_update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("DROP TABLE messages_fts")
+    cursor.execute("""
+    CREATE VIRTUAL TABLE messages_fts USING fts5(
+        content, content='messages_plain', content_rowid='id', tokenize='trigram'
+    )
+    """)
+    cursor.execute("""
+    CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, lc_content(new.content, new.compressed));
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content)
+        VALUES ('delete', old.id, lc_content(old.content, old.compressed));
+    END
+    """)
+    # 压缩不改变文本，不需要重新索引
+    cursor.execute("""
+    CREATE TRIGGER messages_fts_update AFTER UPDATE OF content ON messages
+    WHEN lc_content(old.content, old.compressed) IS NOT lc_content(new.content, new.compressed) BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content)
+        VALUES ('delete', old.id, lc_content(old.content, old.compressed));
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, lc_content(new.content, new.compressed));
+    END
+    """)
+    cursor.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+
+
+
+def _create_message_fts(cursor: sqlite3.Cursor) -> None:
+    """
+    创建独立保存文本的消息全文索引（FTS5 trigram）
+
+    触发器只使用SQLite内置功能，不依赖应用注册的 lc_content()，sqlite3命令行、数据库浏览器等工具也能正常增删改消息。
+    索引在消息写入时记录明文（应用写入的消息都不压缩），之后整理压缩消息不会改变文本，索引保持不变。
+    """
+    cursor.execute("""
+    CREATE VIRTUAL TABLE messages_fts USING fts5(content, tokenize='trigram')
+    """)
+    cursor.execute("""
+    CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages WHEN new.compressed = 0 BEGIN
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN
+        DELETE FROM messages_fts WHERE rowid = old.id;
+    END
+    """)
+    # 压缩（compressed 变为非0）不改变文本，不需要重新索引
+    cursor.execute("""
+    CREATE TRIGGER messages_fts_update AFTER UPDATE OF content ON messages WHEN new.compressed = 0 BEGIN
+        DELETE FROM messages_fts WHERE rowid = old.id;
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """)
+    # 为已有的消息建立索引（迁移在应用的连接中执行，可以使用 lc_content 解压已压缩的消息）
+    cursor.execute("INSERT INTO messages_fts(rowid, content) "
+                   "SELECT id, lc_content(content, compressed) FROM messages")
+
+
+def _migration_message_search_standalone(cursor: sqlite3.Cursor) -> None:
+    """全文索引改为独立保存文本，触发器不再依赖 lc_content()，外部工具打开数据库后也能修改消息"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'")
+    if cursor.fetchone() is None:
+        return
+    for trigger in ("messages_fts_insert", "messages_fts_delete", "messages_fts_update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("DROP TABLE messages_fts")
+    cursor.execute("DROP VIEW IF EXISTS messages_plain")
+    _create_message_fts(cursor)
+
+# 数据库结构迁移：(版本号, 名称, 迁移函数)，只能在末尾追加，不能修改已发布的迁移
+MIGRATIONS = [
+    (1, "initial_schema", _migration_initial_schema),
+    (2, "message_search", _migration_message_search),
+    (3, "character_settings_tracking", _migration_character_settings_tracking),
+    (4, "history_indexes", _migration_history_indexes),
+    (5, "message_compression", _migration_message_compression),
+    (6, "message_search_standalone", _migration_message_search_standalone),
+]
 
 
 def main():
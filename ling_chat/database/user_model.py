@@ -1,6 +1,16 @@
+import html
+
+from ling_chat.database import database
 from ling_chat.database.database import get_db_connection
 from typing import Optional, Dict
 
+# trigram分词至少需要3个字符，更短的关键词使用LIKE查询
+FTS_MIN_QUERY_LENGTH = 3
+SNIPPET_CONTEXT_CHARS = 24
+# FTS摘要中标记关键词的控制字符，转义消息内容之后再替换成 <mark></mark>
+MARK_START = "\x02"
+MARK_END = "\x03"
+
 
 class UserModel:
     @staticmethod
@@ -20,8 +30,10 @@ class UserModel:
         # 暂时懒得加盐了，测试一下看看对不对
         hashed_password = password
 
+        # 默认角色取现有的第一个角色（外键约束下不能引用不存在的角色，没有角色时为NULL）
         cursor.execute(
-            "INSERT INTO users (username, password) VALUES (?, ?)",
+            "INSERT INTO users (username, password, last_chat_character) "
+            "VALUES (?, ?, (SELECT MIN(id) FROM characters))",
             (username, hashed_password)
         )
         user_id = cursor.lastrowid
@@ -110,4 +122,76 @@ class UserConversationModel:
         return {
             "conversations": [dict(row) for row in conversations],
             "total": total
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def search_messages(user_id: int, query: str, page: int = 1, page_size: int = 20) -> Dict:
+        """
+        在用户的所有对话中搜索消息（不包括角色设定等系统消息），按时间倒序分页
+        返回 dict：results 为匹配的消息（snippet 为HTML转义后的内容，命中的关键词用 <mark></mark> 标出），total 为总数
+        """
+        query = query.strip()
+        if not query:
+            return {"results": [], "total": 0}
+        offset = (page - 1) * page_size
+        use_fts = database.FTS_AVAILABLE and len(query) >= FTS_MIN_QUERY_LENGTH
+        conn = get_db_connection()
+        try:
+            if use_fts:
+                # 整体作为一个短语匹配，避免关键词中的符号被当作FTS语法
+                match = '"' + query.replace('"', '""') + '"'
+                base_sql = """
+                    FROM messages_fts
+                    JOIN messages m ON m.id = messages_fts.rowid
+                    JOIN conversations c ON c.id = m.owned_conversation
+                    WHERE messages_fts MATCH ? AND c.owned_user = ? AND m.role != 'system'
+                """
+                params: tuple = (match, user_id)
+                snippet_sql = f"snippet(messages_fts, 0, '{MARK_START}', '{MARK_END}', '…', 16)"
+                # 按FTS的rowid排序可以直接倒序遍历索引，只为返回的这一页生成摘要
+                order_sql = "messages_fts.rowid DESC"
+            else:
+                pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                base_sql = """
+                    FROM messages m
+                    JOIN conversations c ON c.id = m.owned_conversation
+                    WHERE lc_content(m.content, m.compressed) LIKE ? ESCAPE '\\' AND c.owned_user = ?
+                      AND m.role != 'system'
+                """
+                params = (pattern, user_id)
+                snippet_sql = "lc_content(m.content, m.compressed)"
+                order_sql = "m.id DESC"
+
+            total = conn.execute(f"SELECT COUNT(*) {base_sql}", params).fetchone()[0]
+            rows = conn.execute(
+                f"""
+                SELECT m.id AS message_id, m.owned_conversation AS conversation_id, c.title AS conversation_title,
+                       m.role, m.created_at, {snippet_sql} AS snippet
+                {base_sql}
+                ORDER BY {order_sql} LIMIT ? OFFSET ?
+                """,
+                params + (page_size, offset)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        results = [dict(row) for row in rows]
+        for result in results:
+            if use_fts:
+                result["snippet"] = html.escape(result["snippet"]) \
+                    .replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+            else:
+                result["snippet"] = UserConversationModel._make_snippet(result["snippet"], query)
+        return {"results": results, "total": total}
+
+    @staticmethod
+    def _make_snippet(content: str, query: str) -> str:
+        """截取关键词附近的内容并标出关键词（LIKE查询时使用），内容经过HTML转义"""
+        index = content.lower().find(query.lower())
+        if index < 0:
+            return html.escape(content[:SNIPPET_CONTEXT_CHARS * 2])
+        start = max(0, index - SNIPPET_CONTEXT_CHARS)
+        end = min(len(content), index + len(query) + SNIPPET_CONTEXT_CHARS)
+        return ("…" if start > 0 else "") + html.escape(content[start:index]) + "<mark>" + \
+            html.escape(content[index:index + len(query)]) + "</mark>" + \
+            html.escape(content[index + len(query):end]) + ("…" if end < len(content) else "")
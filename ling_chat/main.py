@@ -50,7 +50,7 @@ def handle_install(install_modules_list: Collection[str], use_mirror=False):
         elif module == "18emo":
             install_third_party.install_18emo(third_party_path / "emotion_model_18emo")
         elif module == "rag":
-            install_third_party.install_rag_model(use_mirror=use_mirror)
+            install_third_party.install_rag_model(third_party_path / "embedding_model_minilm", use_mirror=use_mirror)
         else:
             logger.error(f"未知的安装模块: {module}")
 
@@ -144,12 +144,17 @@ def install_18emo(emo_path: Path, url: str = ""):
     url = url or "https://www.modelscope.cn/models/lingchat-research-studio/LingChat-emotion-model-18emo/resolve/master/model.safetensors"
     download_file(url, emo_path / "model.safetensors")
 
-def install_rag_model(use_mirror=False):
+def install_rag_model(model_path: Path, use_mirror=False):
     """
-    安装RAG系统所需的模型
+    安装RAG系统所需的向量模型（all-MiniLM-L6-v2 的ONNX导出版本）
     """
-    # download_embedding_model(use_mirror=use_mirror)
-    pass
+    host = "https://hf-mirror.com" if use_mirror else "https://huggingface.co"
+    base_url = f"{host}/sentence-transformers/all-MiniLM-L6-v2/resolve/main"
+    model_path.mkdir(parents=True, exist_ok=True)
+    for remote_name, local_name in (("onnx/model.onnx", "model.onnx"), ("tokenizer.json", "tokenizer.json")):
+        if (model_path / local_name).exists():
+            continue
+        download_file(f"{base_url}/{remote_name}", model_path / local_name)
 
 
 def main():
@@ -169,7 +174,7 @@ def main():
     install_18emo(emo_path)
 
     # 安装RAG模型
-    install_rag_model()
+    install_rag_model(Path("third_party/embedding_model_minilm"))
 
 
 if __name__ == "__main__":
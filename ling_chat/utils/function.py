@@ -1,12 +1,16 @@
+import ast
+import copy
 import re
 import os
+import threading
 import yaml
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import List, Dict
 from pathlib import Path
 import py7zr
 import zipfile
-from ling_chat.utils.runtime_path import temp_path
+from ling_chat.utils.runtime_path import get_voice_path
 from ling_chat.core.logger import logger
 
 class Function:
@@ -14,6 +18,11 @@ class Function:
     HIDE_NONE_FIELDS = [
         'ai_name', 'ai_subtitle', 'user_name', 'user_subtitle', 'thinking_message',
     ]
+    # settings.txt 解析结果缓存：绝对路径 -> ((修改时间, 文件大小), 解析结果)
+    SETTINGS_CACHE_SIZE = 128
+    _settings_cache: "OrderedDict[str, tuple]" = OrderedDict()
+    _settings_cache_lock = threading.Lock()
+
     @staticmethod
     def detect_language(text):
         """
@@ -127,6 +136,7 @@ class Function:
     def parse_enhanced_txt(file_path):
         """
         解析settings.txt，包含里面的全部信息并且附带文件路径。
+        解析结果按文件的修改时间和大小缓存，文件没有变化时直接返回缓存的副本。
 
         Args:
             file_path (str): settings.txt的文件路径。
@@ -134,9 +144,36 @@ class Function:
         Returns:
             settings :(dict) 返回角色的所有信息。
         """
+        cache_key = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with Function._settings_cache_lock:
+            cached = Function._settings_cache.get(cache_key)
+            if cached is not None and cached[0] == signature:
+                Function._settings_cache.move_to_end(cache_key)
+                settings = cached[1]
+            else:
+                settings = None
+
+        if settings is None:
+            with open(file_path, 'r', encoding='utf-8') as file:
+                settings = Function._parse_enhanced_content(file.read())
+            with Function._settings_cache_lock:
+                Function._settings_cache[cache_key] = (signature, settings)
+                Function._settings_cache.move_to_end(cache_key)
+                while len(Function._settings_cache) > Function.SETTINGS_CACHE_SIZE:
+                    Function._settings_cache.popitem(last=False)
+
+        # 返回副本，调用方修改结果不会影响缓存
+        settings = copy.deepcopy(settings)
+        settings['resource_path'] = os.path.dirname(file_path)
+        return settings
+
+    @staticmethod
+    def _parse_enhanced_content(content: str) -> dict:
+        """解析settings.txt的文本内容"""
         settings = {}
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
 
         single_line_pattern = re.compile(r'^(\w+)\s*=(.*?)\s*$', re.MULTILINE)
         multi_line_pattern = re.compile(r'^(\w+)\s*=\s*"""(.*?)"""\s*$', re.MULTILINE | re.DOTALL)
@@ -154,9 +191,9 @@ class Function:
             value = match.group(2).strip()
             if key not in settings:  # 避免被多行字符串覆盖
                 try:
-                    # 使用eval将字符串转换为字典
-                    settings[key] = eval(value)
-                except:
+                    # 只解析字面量，不执行settings.txt中的代码
+                    settings[key] = ast.literal_eval(value)
+                except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
                     # 如果解析失败，保留原始字符串
                     settings[key] = value
 
@@ -172,9 +209,6 @@ class Function:
                     value = None
                 settings[key] = value
 
-        dir_path = os.path.dirname(file_path)
-        settings['resource_path'] = dir_path
-
         return settings
 
     @staticmethod
@@ -411,10 +445,15 @@ class Function:
         """
         清理所有临时文件
         """
-        temp_dir = Path(os.environ.get("TEMP_VOICE_DIR", temp_path / "data/voice"))
-        self.format = os.environ.get("VOICE_FORMAT", "wav")
-        
-        for file in temp_dir.glob(f"*.{self.format}"):
+        from ling_chat.core.TTS.voice_janitor import VoiceJanitor
+
+        temp_dir = get_voice_path()
+        if not temp_dir.exists():
+            return
+
+        for file in temp_dir.iterdir():
+            if not file.is_file() or file.suffix.lower() not in VoiceJanitor.AUDIO_SUFFIXES:
+                continue
             try:
                 file.unlink()
             except Exception as e:
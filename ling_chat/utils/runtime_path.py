@@ -1,5 +1,6 @@
 from pathlib import Path
 from platformdirs import user_data_dir
+import os
 import sys
 import tempfile
 
@@ -34,6 +35,17 @@ def get_user_data_path() -> Path:
             return Path(user_data_dir(appname=APP_NAME, appauthor=APP_AUTHOR))
     return get_package_root() / "data"  # 开发环境使用 package 根目录下的 data 文件夹
 
+def get_voice_path() -> Path:
+    """
+    获取语音缓存目录（在环境变量加载后调用）
+
+    默认使用用户数据目录下的固定目录，而不是每次启动新建的临时目录，
+    这样重启程序后已合成的语音仍然可以复用。
+    Returns:
+        Path: 语音缓存目录的 Path 对象
+    """
+    return Path(os.environ.get("TEMP_VOICE_DIR", "") or get_user_data_path() / "temp_voice")
+
 # 应用信息（用于构建平台特定路径）
 APP_NAME = "ling_chat"
 APP_AUTHOR = "ling_chat"  # Windows 用于 AppData\Roaming\MyCompany\MyApp
@@ -51,6 +63,7 @@ __all__ = [
     "third_party_path",
     "user_data_path",
     "temp_path",
+    "get_voice_path",
     "APP_NAME",
     "APP_AUTHOR"
 ]
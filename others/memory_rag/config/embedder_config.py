@@ -14,6 +14,7 @@ class EmbedderConfig(BaseModel):
         provider = values.data.get("provider")
         if provider in [
             "qwen",
+            "onnx",
             "openai",
             "ollama",
             "huggingface",
@@ -0,0 +1,42 @@
+from typing import List, Union
+
+from ling_chat.core.ai_service.embedding_engine import EmbeddingEngine, embedding_engine
+
+
+class OnnxLocalEmbedding:
+    """本地 ONNX MiniLM 的 Embedding 实现（与 RAGManager 共用同一个进程内引擎）"""
+
+    def __init__(self, config=None):
+        """
+        初始化本地 Embedding
+        :param config: 配置字典，可选 model_path 指定模型目录（默认使用 EMBEDDING_MODEL_PATH）
+        """
+        self.config = config or {}
+        model_path = self.config.get("model_path")
+        self.engine = EmbeddingEngine(model_path) if model_path else embedding_engine
+        if not self.engine.available:
+            raise RuntimeError(f"本地向量模型不可用: {self.engine.model_path}，请先运行 --install rag")
+
+    def embed(self, text: Union[str, List[str]]) -> List[List[float]]:
+        """
+        获取文本的向量表示
+        :param text: 单个文本字符串或文本列表
+        :return: 向量列表
+        """
+        if isinstance(text, str):
+            return self.engine.encode([text])[0].tolist()
+        return self.engine.encode(list(text)).tolist()
+
+    def encode(self, text: Union[str, List[str]]) -> List[List[float]]:
+        """
+        兼容 sentence_transformers 的 encode 方法
+        """
+        if isinstance(text, str):
+            return [self.embed(text)]
+        return self.embed(text)
+
+    def get_embedding_dim(self) -> int:
+        """
+        获取向量维度
+        """
+        return self.engine.dimension
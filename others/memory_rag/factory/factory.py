@@ -57,6 +57,7 @@ class LlmFactory:
 class EmbedderFactory:
     provider_to_class = {
         "qwen": "core.memory_rag.embeddings.qwen.QwenEmbedding",
+        "onnx": "core.memory_rag.embeddings.onnx_local.OnnxLocalEmbedding",
         # "openai": "mem0.embeddings.openai.OpenAIEmbedding",
         # "ollama": "mem0.embeddings.ollama.OllamaEmbedding",
         # "huggingface": "mem0.embeddings.huggingface.HuggingFaceEmbedding",
@@ -85,7 +86,7 @@ class EmbedderFactory:
                 embedding_class = load_class(class_type)
                 return embedding_class(config)
             else:
-                raise ValueError(f"Unsupported Embedder provider: {provider_name}，当前支持 'qwen' 和 'sentence_transformers'。")
+                raise ValueError(f"Unsupported Embedder provider: {provider_name}，当前支持 'qwen' 和 'onnx'。")
         
 class VectorStoreFactory:
     provider_to_class = {
@@ -0,0 +1,82 @@
+"""
+加载大对话时的事件循环延迟测试
+
+模拟 /api/v1/chat/history/load：在事件循环中加载一个10000条消息的对话，
+同时用一个每10ms唤醒一次的心跳任务代表websocket连接，统计心跳的延迟。
+分别对比直接调用同步的 ConversationModel 与通过 conversation_repository 在线程池中执行。
+
+用法: python -m tests.bench_history_load
+"""
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from unittest.mock import patch
+
+from ling_chat.database import database
+from ling_chat.database.async_repository import conversation_repository
+from ling_chat.database.conversation_model import ConversationModel
+
+MESSAGE_COUNT = 10000
+ROUNDS = 5
+HEARTBEAT_INTERVAL = 0.01
+
+
+async def heartbeat(lags: list, stop: asyncio.Event) -> None:
+    """按固定间隔唤醒，记录实际唤醒时间比预期晚了多少"""
+    while not stop.is_set():
+        expected = time.perf_counter() + HEARTBEAT_INTERVAL
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append((time.perf_counter() - expected) * 1000)
+
+
+async def measure(load, conversation_id: int) -> tuple[float, float, float]:
+    """返回 (加载耗时ms, 心跳延迟中位数ms, 心跳延迟最大值ms)"""
+    lags: list = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    await asyncio.sleep(HEARTBEAT_INTERVAL * 3)
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        await load(conversation_id)
+    elapsed = (time.perf_counter() - start) * 1000 / ROUNDS
+
+    stop.set()
+    await beat
+    return elapsed, statistics.median(lags), max(lags)
+
+
+async def load_sync(conversation_id: int) -> None:
+    ConversationModel.get_conversation_messages(conversation_id)
+
+
+async def load_async(conversation_id: int) -> None:
+    await conversation_repository.get_conversation_messages(conversation_id)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as test_dir, \
+            patch.multiple(database, DATA_DIR=test_dir, DB_NAME=os.path.join(test_dir, "bench.db")):
+        database.init_db()
+        conn = database.get_db_connection()
+        conn.execute("INSERT INTO characters (title) VALUES ('bench')")
+        conn.execute("INSERT INTO users (username, password) VALUES ('bench', 'bench')")
+        conn.commit()
+
+        messages = [{"role": "user" if i % 2 == 0 else "assistant",
+                     "content": f"第{i}条消息，" + "今天天气不错，我们一起去散步吧。" * 5}
+                    for i in range(MESSAGE_COUNT)]
+        conversation_id = ConversationModel.create_conversation(1, messages, 1, "bench")
+
+        print(f"加载 {MESSAGE_COUNT} 条消息的对话，每种方式 {ROUNDS} 次")
+        print(f"{'方式':>16} | {'加载耗时ms':>10} | {'心跳延迟中位/最大ms':>20}")
+        for name, load in (("同步直接调用", load_sync), ("线程池异步调用", load_async)):
+            elapsed, median_lag, max_lag = asyncio.run(measure(load, conversation_id))
+            print(f"{name:>14} | {elapsed:>12.1f} | {median_lag:>10.2f} / {max_lag:.2f}")
+        database.close_db_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+记忆库保存延迟基准测试
+
+对比旧的 indent=2 直接覆盖写入与新的紧凑格式原子写入，
+在不同大小的 long_term 历史下的保存耗时、文件体积，
+以及 save_memory_async 实际占用事件循环的时间（仅序列化，写盘在线程中执行）。
+
+用法: python -m tests.bench_memory_save
+"""
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+from ling_chat.core.memory import MemorySystem
+
+ROUNDS = 20
+SIZES_KB = [16, 256, 1024, 4096]
+
+
+def legacy_save(memory: MemorySystem) -> None:
+    """旧实现：indent=2 直接覆盖写入"""
+    save_content = {
+        "meta": {
+            "last_processed_idx": memory.last_processed_idx,
+            "updated_at": time.strftime("%Y-%m-%d %H:%M:%S")
+        },
+        "data": memory.memory_data
+    }
+    with open(memory.memory_file, "w", encoding="utf-8") as f:
+        json.dump(save_content, f, ensure_ascii=False, indent=2)
+
+
+def measure(func, memory: MemorySystem) -> tuple[float, float]:
+    """返回 (中位数毫秒, 最大毫秒)"""
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func(memory)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as test_dir, \
+            patch("ling_chat.core.memory.LLMManager", MagicMock()):
+        memory = MemorySystem({}, 0)
+        memory.memory_dir = Path(test_dir)
+        memory.memory_file = memory.memory_dir / "bench.json"
+
+        print(f"{'long_term':>10} | {'旧实现(中位/最大ms)':>20} | {'新实现(中位/最大ms)':>20} | "
+              f"{'事件循环占用ms':>12} | {'文件体积 旧/新':>16}")
+        for size_kb in SIZES_KB:
+            entry = "第{}天：用户和AI一起去了公园，聊了很多关于未来的计划。\n"
+            lines = []
+            while sum(len(line) for line in lines) * 3 < size_kb * 1024:
+                lines.append(entry.format(len(lines)))
+            memory.memory_data["long_term"] = "".join(lines)
+
+            legacy_median, legacy_max = measure(legacy_save, memory)
+            legacy_size = memory.memory_file.stat().st_size
+            new_median, new_max = measure(MemorySystem.save_memory, memory)
+            new_size = memory.memory_file.stat().st_size
+            loop_median, _ = measure(MemorySystem._build_save_content, memory)
+
+            print(f"{size_kb:>8}KB | {legacy_median:>9.2f} / {legacy_max:<8.2f} | "
+                  f"{new_median:>9.2f} / {new_max:<8.2f} | {loop_median:>12.2f} | "
+                  f"{legacy_size // 1024:>6}KB / {new_size // 1024}KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from ling_chat.api import chat_sound
+from ling_chat.core.TTS.audio_memory_cache import AudioMemoryCache
+
+
+class TestAudioMemoryCache(unittest.TestCase):
+    def _make_cache(self, **env) -> AudioMemoryCache:
+        cache = AudioMemoryCache()
+        with patch.dict(os.environ, env):
+            cache._load_config()
+        return cache
+
+    def test_disabled_by_default(self):
+        """测试未配置容量时不缓存"""
+        cache = self._make_cache(VOICE_MEMORY_CACHE_MB="0")
+        self.assertFalse(cache.put("/tmp/a.wav", b"RIFF"))
+        self.assertIsNone(cache.get("a.wav"))
+
+    def test_evicts_least_recently_used(self):
+        """测试超出容量时淘汰最久未使用的语音"""
+        cache = self._make_cache(VOICE_MEMORY_CACHE_MB=str(10 / 1024 / 1024))
+        cache.put("/voice/a.wav", b"a" * 4)
+        cache.put("/voice/b.wav", b"b" * 4)
+        self.assertEqual(cache.get("a.wav"), b"a" * 4)  # a变为最近使用
+        cache.put("/voice/c.wav", b"c" * 4)
+        self.assertIsNone(cache.get("b.wav"))
+        self.assertIsNotNone(cache.get("a.wav"))
+        self.assertLessEqual(cache.total_bytes, cache.max_bytes)
+
+    def test_memory_only_requires_capacity(self):
+        """测试未设置容量时仅内存模式回退为写入磁盘"""
+        cache = self._make_cache(VOICE_MEMORY_CACHE_MB="0", VOICE_MEMORY_ONLY="true")
+        self.assertFalse(cache.memory_only)
+
+
+
+class TestVoiceRouteCaching(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        (Path(self.test_dir.name) / "voice-1.wav").write_bytes(b"RIFF" + b"\0" * 64)
+        self.patcher = patch.object(chat_sound, "get_voice_path", return_value=Path(self.test_dir.name))
+        self.patcher.start()
+        app = FastAPI()
+        app.include_router(chat_sound.router)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.test_dir.cleanup()
+
+    def test_get_voice_sets_cache_headers(self):
+        """测试前端实际使用的语音接口返回长期缓存头，并支持ETag协商"""
+        with patch.dict(os.environ, {"VOICE_CACHE_MAX_AGE": "600"}):
+            response = self.client.get("/api/v1/chat/sound/get_voice/voice-1.wav")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.headers["cache-control"], "public, max-age=600, immutable")
+            self.assertEqual(response.headers["content-type"], "audio/wav")
+
+            revalidated = self.client.get("/api/v1/chat/sound/get_voice/voice-1.wav",
+                                          headers={"If-None-Match": response.headers["etag"]})
+            self.assertEqual(revalidated.status_code, 304)
+
+            cache = AudioMemoryCache()
+            cache.max_bytes = 1024
+            cache.put("voice-2.wav", b"RIFF")
+            with patch.object(chat_sound, "audio_memory_cache", cache):
+                cached = self.client.get("/api/v1/chat/sound/get_voice/voice-2.wav")
+            self.assertEqual(cached.content, b"RIFF")
+            self.assertEqual(cached.headers["cache-control"], "public, max-age=600, immutable")
+            self.assertIn("etag", cached.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
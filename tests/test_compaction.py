@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from ling_chat.database import database
+from ling_chat.database.compaction import MessageCompactor
+from ling_chat.database.conversation_model import ConversationModel
+from ling_chat.database.user_model import UserModel, UserConversationModel
+
+
+class TestMessageCompactor(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.patcher = patch.multiple(database, DATA_DIR=self.test_dir.name,
+                                      DB_NAME=os.path.join(self.test_dir.name, "test.db"))
+        self.patcher.start()
+        database.init_db()
+
+        conn = database.get_db_connection()
+        conn.execute("INSERT INTO characters (title) VALUES ('c')")
+        conn.commit()
+        UserModel.create_user("u", "p")
+        self.messages = [{"role": "user" if i % 2 == 0 else "assistant",
+                          "content": f"第{i}条消息，" + "今天天气不错，我们一起去散步吧。" * 20}
+                         for i in range(20)]
+        self.conversation_id = ConversationModel.create_conversation(1, self.messages, 1)
+
+        self.compactor = MessageCompactor()
+        self.compactor.keep_recent = 4
+        self.compactor.min_bytes = 64
+
+    def tearDown(self):
+        database.close_db_connections()
+        self.patcher.stop()
+        self.test_dir.cleanup()
+
+    def test_compact_keeps_recent_and_content(self):
+        """测试较早的消息被压缩、最近的保持原样，读取与搜索结果不变"""
+        result = self.compactor.compact()
+        self.assertEqual(result["compressed"], 16)
+        self.assertLess(result["size_after"], result["size_before"])
+
+        conn = database.get_db_connection()
+        flags = [row[0] for row in conn.execute("SELECT compressed FROM messages ORDER BY id")]
+        self.assertEqual(flags, [database.CONTENT_ZLIB] * 16 + [database.CONTENT_PLAIN] * 4)
+        self.assertEqual(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+        self.assertEqual(ConversationModel.get_conversation_messages(self.conversation_id), self.messages)
+
+        found = UserConversationModel.search_messages(1, "第3条消息")
+        self.assertEqual(found["total"], 1)
+        self.assertIn("<mark>第3条消息</mark>", found["results"][0]["snippet"])
+
+        # 再次整理没有需要压缩的消息
+        self.assertEqual(self.compactor.compact()["compressed"], 0)
+
+    def test_delete_compressed_conversation(self):
+        """测试删除含压缩消息的对话时全文索引同步删除"""
+        self.compactor.compact()
+        self.assertTrue(ConversationModel.delete_conversation(self.conversation_id))
+        self.assertEqual(UserConversationModel.search_messages(1, "散步吧")["total"], 0)
+
+
+    def test_external_connection_can_modify_messages(self):
+        """测试没有注册 lc_content 的连接（sqlite3命令行、其他工具）也能增删改消息，全文索引保持同步"""
+        self.compactor.compact()
+        conn = sqlite3.connect(database.DB_NAME)
+        try:
+            conn.execute("INSERT INTO messages (role, content, owned_conversation) VALUES ('user', '外部工具写入的消息', ?)",
+                         (self.conversation_id,))
+            conn.execute("UPDATE messages SET content = '修改后的第19条' WHERE id = (SELECT MAX(id) - 1 FROM messages)")
+            conn.execute("DELETE FROM messages WHERE id = (SELECT MIN(id) FROM messages)")
+            conn.commit()
+        finally:
+            conn.close()
+
+        self.assertEqual(UserConversationModel.search_messages(1, "外部工具")["total"], 1)
+        self.assertEqual(UserConversationModel.search_messages(1, "修改后的")["total"], 1)
+        self.assertEqual(UserConversationModel.search_messages(1, "第0条消息")["total"], 0)
+        # 已压缩消息的索引不受影响
+        self.assertEqual(UserConversationModel.search_messages(1, "第3条消息")["total"], 1)
+
+    def test_full_vacuum_only_at_startup(self):
+        """测试旧数据库在后台整理时不执行完整VACUUM，启动时再转换为增量回收模式"""
+        conn = database.get_db_connection()
+        conn.execute("PRAGMA auto_vacuum = NONE")
+        conn.execute("VACUUM")
+        self.assertEqual(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 0)
+
+        self.compactor.compact()
+        self.assertEqual(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 0)
+
+        self.assertTrue(self.compactor.convert_auto_vacuum())
+        self.assertEqual(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+        self.assertFalse(self.compactor.convert_auto_vacuum())
+        self.assertEqual(ConversationModel.get_conversation_messages(self.conversation_id), self.messages)
+
+if __name__ == '__main__':
+    unittest.main()
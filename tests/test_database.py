@@ -0,0 +1,287 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from ling_chat.api import chat_history
+from ling_chat.core.ai_service.core import AIService
+from ling_chat.core.service_manager import service_manager
+from ling_chat.database import database
+from ling_chat.database.character_model import CharacterModel
+from ling_chat.database.conversation_model import ConversationModel
+from ling_chat.database.user_model import UserModel, UserConversationModel
+
+
+class TestDatabaseConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.patcher = patch.multiple(database, DATA_DIR=self.test_dir.name,
+                                      DB_NAME=os.path.join(self.test_dir.name, "test.db"))
+        self.patcher.start()
+        database.init_db()
+
+    def tearDown(self):
+        database.close_db_connections()
+        self.patcher.stop()
+        self.test_dir.cleanup()
+
+    def test_connection_reused_per_thread(self):
+        """测试同一线程复用连接，close()不会真正关闭，不同线程使用不同连接"""
+        conn = database.get_db_connection()
+        conn.close()
+        self.assertIs(database.get_db_connection(), conn)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(conn.execute("PRAGMA foreign_keys").fetchone()[0], 1)
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(database.get_db_connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], conn)
+
+    def test_conversation_roundtrip(self):
+        """测试对话的创建、替换与删除（外键级联删除消息关系）"""
+        conn = database.get_db_connection()
+        conn.execute("INSERT INTO characters (title) VALUES ('c')")
+        conn.commit()
+        UserModel.create_user("u", "p")
+
+        messages = [{"role": "user", "content": "你好"}, {"role": "assistant", "content": "你好呀"}]
+        conversation_id = ConversationModel.create_conversation(1, messages, 1)
+        ConversationModel.change_conversation_messages(conversation_id, messages + messages)
+        self.assertEqual(len(ConversationModel.get_conversation_messages(conversation_id)), 4)
+
+        self.assertTrue(ConversationModel.delete_conversation(conversation_id))
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM message_relations").fetchone()[0], 0)
+
+    def test_append_messages_links_chain(self):
+        """测试批量追加的消息接在原有消息之后"""
+        conn = database.get_db_connection()
+        conn.execute("INSERT INTO characters (title) VALUES ('c')")
+        conn.commit()
+        UserModel.create_user("u", "p")
+
+        conversation_id = ConversationModel.create_conversation(1, [{"role": "system", "content": "s"}], 1, "t")
+        for turn in range(3):
+            ids = ConversationModel.append_messages_to_conversation(conversation_id, [
+                {"role": "user", "content": f"问{turn}"}, {"role": "assistant", "content": f"答{turn}"}])
+            self.assertEqual(len(ids), 2)
+
+        messages = ConversationModel.get_conversation_messages(conversation_id)
+        self.assertEqual([m["content"] for m in messages], ["s", "问0", "答0", "问1", "答1", "问2", "答2"])
+
+        page = ConversationModel.get_conversation_messages_page(conversation_id, limit=4)
+        self.assertEqual([m["content"] for m in page["messages"]], ["问1", "答1", "问2", "答2"])
+        page = ConversationModel.get_conversation_messages_page(conversation_id, page["next_before_id"], limit=4)
+        self.assertEqual([m["content"] for m in page["messages"]], ["s", "问0", "答0"])
+        self.assertIsNone(page["next_before_id"])
+
+    def test_fork_and_switch_branch(self):
+        """测试重新生成回复时只新增分支，并能在分支之间切换"""
+        conn = database.get_db_connection()
+        conn.execute("INSERT INTO characters (title) VALUES ('c')")
+        conn.commit()
+        UserModel.create_user("u", "p")
+
+        conversation_id = ConversationModel.create_conversation(1, [
+            {"role": "system", "content": "s"}, {"role": "user", "content": "问"},
+            {"role": "assistant", "content": "答1"}, {"role": "user", "content": "继续"}], 1, "t")
+        ids = ConversationModel.get_conversation_message_ids(conversation_id)
+
+        ConversationModel.fork_conversation(conversation_id, ids[1], [{"role": "assistant", "content": "答2"}])
+        self.assertEqual([m["content"] for m in ConversationModel.get_conversation_messages(conversation_id)],
+                         ["s", "问", "答2"])
+        self.assertEqual([m["content"] for m in ConversationModel.get_message_children(ids[1])], ["答1", "答2"])
+        self.assertEqual(len(ConversationModel.get_branch_leaves(conversation_id)), 2)
+
+        # 切回第一条回复时沿它的后续消息走到末尾
+        self.assertEqual(ConversationModel.switch_branch(conversation_id, ids[2]), ids[3])
+        self.assertEqual(ConversationModel.get_conversation_messages(conversation_id)[-1]["content"], "继续")
+
+    def test_persist_detects_changed_middle_message(self):
+        """测试已写入部分中间的消息被修改（最后一条不变）时分出新分支，而不是直接追加"""
+        conn = database.get_db_connection()
+        conn.execute("INSERT INTO characters (title) VALUES ('c')")
+        conn.commit()
+        UserModel.create_user("u", "p")
+
+        memory = [{"role": "system", "content": "s"}, {"role": "user", "content": "问"},
+                  {"role": "assistant", "content": "答"}]
+        conversation_id = ConversationModel.create_conversation(1, memory, 1, "t")
+
+        service = AIService.__new__(AIService)
+        service.memory = [msg.copy() for msg in memory]
+        service._persist_lock = asyncio.Lock()
+        service._appends_since_checkpoint = 0
+        service.checkpoint_interval = 0
+        service.bind_conversation(conversation_id, len(memory))
+
+        service.memory[1]["content"] = "换个问题"
+        service.memory.append({"role": "user", "content": "继续"})
+        self.assertEqual(asyncio.run(service.persist_new_messages()), 3)
+        self.assertEqual([m["content"] for m in ConversationModel.get_conversation_messages(conversation_id)],
+                         ["s", "换个问题", "答", "继续"])
+        self.assertEqual(len(ConversationModel.get_branch_leaves(conversation_id)), 2)
+
+    def test_search_messages(self):
+        """测试全文索引随消息增删同步，短关键词退回LIKE查询"""
+        conn = database.get_db_connection()
+        conn.execute("INSERT INTO characters (title) VALUES ('c')")
+        conn.commit()
+        UserModel.create_user("u", "p")
+
+        conversation_id = ConversationModel.create_conversation(1, [
+            {"role": "system", "content": "你喜欢和用户一起去公园散步"},
+            {"role": "user", "content": "明天一起去公园散步吧"}, {"role": "assistant", "content": "好呀，去公园"}], 1, "t")
+
+        result = UserConversationModel.search_messages(1, "去公园")
+        self.assertEqual(result["total"], 2)
+        self.assertIn("<mark>去公园</mark>", result["results"][0]["snippet"])
+        self.assertEqual(UserConversationModel.search_messages(1, "散步")["total"], 1)
+
+        # 消息中的HTML被转义，只有关键词标记是标签
+        ConversationModel.append_messages_to_conversation(conversation_id, [
+            {"role": "user", "content": "<img src=x onerror=alert(1)>去公园<b>"}])
+        for keyword in ("去公园", "公园"):
+            snippet = UserConversationModel.search_messages(1, keyword)["results"][0]["snippet"]
+            self.assertNotIn("<img", snippet)
+            self.assertIn("alert(1)&gt;", snippet)
+            self.assertIn(f"<mark>{keyword}</mark>&lt;b&gt;", snippet)
+
+        ConversationModel.change_conversation_messages(conversation_id, [{"role": "user", "content": "换个话题"}])
+        self.assertEqual(UserConversationModel.search_messages(1, "去公园")["total"], 0)
+        self.assertEqual(UserConversationModel.search_messages(2, "换个话题")["total"], 0)
+
+
+    def test_sync_characters_skips_unchanged(self):
+        """测试角色同步只解析settings.txt有变化的角色，并删除已不存在的角色"""
+        game_data = Path(self.test_dir.name) / "game_data"
+        for name in ("alice", "bob"):
+            (game_data / "characters" / name).mkdir(parents=True)
+            (game_data / "characters" / name / "settings.txt").write_text(f"title = {name}\n", encoding="utf-8")
+
+        self.assertEqual(len(CharacterModel.sync_characters_from_game_data(game_data)), 2)
+
+        alice_settings = game_data / "characters" / "alice" / "settings.txt"
+        alice_settings.write_text("title = Alice\n", encoding="utf-8")
+        os.utime(alice_settings, ns=(0, alice_settings.stat().st_mtime_ns + 10**9))
+        (game_data / "characters" / "bob" / "settings.txt").unlink()
+        with patch("ling_chat.database.character_model.Function.parse_enhanced_txt",
+                   return_value={"title": "Alice"}) as parse:
+            self.assertEqual(CharacterModel.sync_characters_from_game_data(game_data), [])
+            self.assertEqual(parse.call_count, 1)
+
+        titles = [row[0] for row in database.get_db_connection().execute("SELECT title FROM characters")]
+        self.assertEqual(titles, ["Alice"])
+
+    def test_sync_characters_keeps_referenced(self):
+        """测试角色目录被删除时，仍有对话或用户引用的角色保留下来，对话不会被级联删除"""
+        game_data = Path(self.test_dir.name) / "game_data"
+        for name in ("alice", "bob", "carol"):
+            (game_data / "characters" / name).mkdir(parents=True)
+            (game_data / "characters" / name / "settings.txt").write_text(f"title = {name}\n", encoding="utf-8")
+        alice_id, bob_id, carol_id = CharacterModel.sync_characters_from_game_data(game_data)
+
+        # 用户默认的 last_chat_character 引用 alice，bob 有一个对话，carol 没有引用
+        UserModel.create_user("u", "p")
+        conversation_id = ConversationModel.create_conversation(1, [{"role": "user", "content": "你好"}], bob_id)
+
+        for name in ("alice", "bob", "carol"):
+            shutil.rmtree(game_data / "characters" / name)
+        (game_data / "characters" / "dave").mkdir()
+        (game_data / "characters" / "dave" / "settings.txt").write_text("title = dave\n", encoding="utf-8")
+        CharacterModel.sync_characters_from_game_data(game_data)
+
+        conn = database.get_db_connection()
+        ids = {row[0] for row in conn.execute("SELECT id FROM characters")}
+        self.assertIn(alice_id, ids)
+        self.assertIn(bob_id, ids)
+        self.assertNotIn(carol_id, ids)
+        self.assertEqual(ConversationModel.get_conversation_messages(conversation_id),
+                         [{"role": "user", "content": "你好"}])
+
+
+    def test_init_db_creates_missing_fts(self):
+        """测试全文索引迁移因不支持FTS5被跳过后，再次启动时补建索引"""
+        conn = database.get_db_connection()
+        conn.execute("INSERT INTO characters (title) VALUES ('c')")
+        conn.commit()
+        UserModel.create_user("u", "p")
+        ConversationModel.create_conversation(1, [{"role": "user", "content": "明天一起去公园散步吧"}], 1, "t")
+        for trigger in ("messages_fts_insert", "messages_fts_delete", "messages_fts_update"):
+            conn.execute(f"DROP TRIGGER {trigger}")
+        conn.execute("DROP TABLE messages_fts")
+        conn.commit()
+
+        database.init_db()
+        self.assertTrue(database.FTS_AVAILABLE)
+        self.assertEqual(UserConversationModel.search_messages(1, "去公园")["total"], 1)
+
+    def test_migrations_upgrade_legacy_database(self):
+        """测试没有版本表的旧数据库能升级到最新版本，且对话列表查询使用新索引"""
+        database.close_db_connections()
+        legacy_db = os.path.join(self.test_dir.name, "legacy.db")
+        with patch.object(database, "DB_NAME", legacy_db):
+            conn = database.get_db_connection()
+            database._migration_initial_schema(conn.cursor())
+            conn.execute("INSERT INTO characters (title) VALUES ('c')")
+            conn.commit()
+
+            database.init_db()
+            self.assertEqual(conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0],
+                             database.MIGRATIONS[-1][0])
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(characters)")}
+            self.assertIn("settings_hash", columns)
+            self.assertEqual(database.run_migrations(conn), 0)
+
+            plan = " ".join(row[3] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM conversations WHERE owned_user = 1 ORDER BY updated_at DESC"))
+            self.assertIn("idx_conversation_user_updated", plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+
+
+
+class TestChatHistoryImport(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.patcher = patch.multiple(database, DATA_DIR=self.test_dir.name,
+                                      DB_NAME=os.path.join(self.test_dir.name, "test.db"))
+        self.patcher.start()
+        database.init_db()
+        conn = database.get_db_connection()
+        conn.execute("INSERT INTO characters (title) VALUES ('c')")
+        conn.commit()
+        UserModel.create_user("u", "p")
+
+        app = FastAPI()
+        app.include_router(chat_history.router)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        database.close_db_connections()
+        self.patcher.stop()
+        self.test_dir.cleanup()
+
+    def test_process_log_binds_conversation(self):
+        """测试导入日志创建的对话归属当前角色，并与当前记忆关联"""
+        service = AIService.__new__(AIService)
+        service.character_id = 1
+        content = "对话日期: 2025-01-01 12:00:00\n\n用户: 你好\n\n钦灵: 你好呀"
+        with patch.object(service_manager, "ai_service", service):
+            response = self.client.post("/api/v1/chat/history/process-log", json={"content": content, "user_id": 1})
+
+        self.assertEqual(response.status_code, 200)
+        conversation_id = response.json()["conversation_id"]
+        self.assertEqual(ConversationModel.get_conversation_character(conversation_id), 1)
+        self.assertEqual(service.conversation_id, conversation_id)
+        self.assertEqual(service.persisted_count, response.json()["processed_count"])
+
+if __name__ == '__main__':
+    unittest.main()
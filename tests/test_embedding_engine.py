@@ -0,0 +1,80 @@
+import threading
+import unittest
+
+import numpy as np
+
+from ling_chat.core.ai_service.embedding_engine import EmbeddingEngine
+
+
+class FakeEncoding:
+    def __init__(self, ids):
+        self.ids = ids
+        self.attention_mask = [1 if i else 0 for i in ids]
+
+
+class FakeTokenizer:
+    """按字符编码并填充到同一长度"""
+    def encode_batch(self, texts):
+        width = max(len(text) for text in texts)
+        return [FakeEncoding([ord(c) for c in text] + [0] * (width - len(text))) for text in texts]
+
+
+class FakeSession:
+    """每个token的隐状态为按字符码分桶的one-hot，记录每次推理的批次大小"""
+    def __init__(self):
+        self.batches = []
+
+    def run(self, output_names, inputs):
+        input_ids = inputs["input_ids"]
+        self.batches.append(input_ids.shape[0])
+        hidden = np.zeros(input_ids.shape + (16,), dtype=np.float32)
+        for (i, j), token in np.ndenumerate(input_ids):
+            hidden[i, j, token % 16] = 1.0
+        return [hidden]
+
+
+class TestEmbeddingEngine(unittest.TestCase):
+    def make_engine(self, cache_dtype="float16"):
+        engine = EmbeddingEngine()
+        engine.cache_dtype = cache_dtype
+        engine.batch_wait = 0.05
+        engine.session = FakeSession()
+        engine.tokenizer = FakeTokenizer()
+        engine.dimension = 16
+        engine._loaded = True
+        engine._worker = threading.Thread(target=engine._batch_loop, daemon=True)
+        engine._worker.start()
+        return engine
+
+    def test_concurrent_requests_are_batched(self):
+        """测试多个线程同时请求时合并为一次推理"""
+        engine = self.make_engine()
+        results = {}
+
+        def work(text):
+            results[text] = engine.encode([text])[0]
+
+        threads = [threading.Thread(target=work, args=(f"文本{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(engine.session.batches), 4)
+        self.assertLess(len(engine.session.batches), 4)
+        for vector in results.values():
+            self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=5)
+
+    def test_cache_hit_skips_inference(self):
+        """测试int8缓存命中时不再推理，且向量与原始结果接近"""
+        engine = self.make_engine(cache_dtype="int8")
+        first = engine.encode(["你好", "你好"])
+        self.assertEqual(engine.session.batches, [1])
+        second = engine.encode(["你好"])
+        self.assertEqual(engine.session.batches, [1])
+        self.assertGreater(float(first[0] @ second[0]), 0.999)
+        self.assertEqual(engine.cache_info()["dtype"], "int8")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from ling_chat.core.llm_providers.local_translate import LocalTranslateProvider
+
+
+class FakeEncoding:
+    def __init__(self, ids):
+        self.ids = ids
+
+
+class FakeTokenizer:
+    """按字符编码的假分词器，id = ord(字符)"""
+    def encode(self, text):
+        return FakeEncoding([ord(c) for c in text])
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(chr(i) for i in ids)
+
+
+class FakeEncoder:
+    def run(self, output_names, inputs):
+        return [inputs["input_ids"].astype(np.float32)[:, :, None]]
+
+
+class FakeDecoder:
+    """把源句逐字原样输出，输出完后给出结束标记"""
+    EOS = 2
+
+    def run(self, output_names, inputs):
+        source = inputs["encoder_hidden_states"][:, :, 0].astype(np.int64)
+        mask = inputs["encoder_attention_mask"]
+        step = inputs["input_ids"].shape[1] - 1
+        vocab = 0x10000
+        logits = np.zeros((source.shape[0], step + 1, vocab), dtype=np.float32)
+        for i in range(source.shape[0]):
+            length = int(mask[i].sum())
+            token = source[i, step] if step < length else self.EOS
+            logits[i, -1, token] = 1.0
+        return [logits]
+
+
+class TestLocalTranslateProvider(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        with patch.dict(os.environ, {"LOCAL_TRANSLATE_MODEL_PATH": self.test_dir.name,
+                                     "LOCAL_TRANSLATE_BATCH_SIZE": "2"}):
+            self.provider = LocalTranslateProvider()
+        self.provider.encoder = FakeEncoder()
+        self.provider.decoder = FakeDecoder()
+        self.provider.tokenizer = FakeTokenizer()
+        self.provider.decoder_start_token_id = 0
+        self.provider.eos_token_id = FakeDecoder.EOS
+        self.provider.pad_token_id = 1
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_missing_model_is_reported(self):
+        """测试模型文件缺失时返回错误信息而不是抛出异常"""
+        with patch.dict(os.environ, {"LOCAL_TRANSLATE_MODEL_PATH": self.test_dir.name}):
+            provider = LocalTranslateProvider()
+        self.assertIsNone(provider.encoder)
+        self.assertNotIn("<", provider.generate_response([{"role": "user", "content": "<你好>"}]))
+
+    def test_batches_keep_order(self):
+        """测试多批次、不同长度的句子保持顺序"""
+        messages = [{"role": "system", "content": "..."},
+                    {"role": "user", "content": "<你好呀><今天><天气真不错>"}]
+        self.assertEqual(self.provider.generate_response(messages), "<你好呀><今天><天气真不错>")
+
+    def test_stream_yields_sentences(self):
+        """测试流式接口按句子返回"""
+        async def run():
+            return [chunk async for chunk in self.provider.generate_stream_response(
+                [{"role": "user", "content": "<一><二>"}])]
+
+        self.assertEqual(asyncio.run(run()), ["<一>", "<二>"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch, AsyncMock, MagicMock
+
+from ling_chat.core.ai_service.rag_manager import RAGManager
+from ling_chat.core.memory import MemorySystem
+
+
+class FakeLLM:
+    """第一次返回缺少promises的结构化结果，之后返回单项更新结果"""
+    def __init__(self):
+        self.prompts = []
+
+    def process_message(self, messages):
+        self.prompts.append(messages[0]["content"])
+        if len(self.prompts) == 1:
+            return '```json\n{"short_term": "刚聊了天气", "long_term": "第一次见面", "user_info": "用户叫小明"}\n```'
+        return "约好明天去公园"
+
+
+class TestMemorySystemUpdate(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        with patch("ling_chat.core.memory.LLMManager", MagicMock()):
+            self.memory = MemorySystem({}, 1)
+        self.memory.memory_dir = Path(self.test_dir.name)
+        self.memory.memory_file = self.memory.memory_dir / "char_1_structured.json"
+        self.memory.llm = FakeLLM()
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_single_structured_call_with_fallback(self):
+        """测试一次结构化请求更新全部部分，缺失的部分单独补充"""
+        history = [{"role": "user", "content": "明天去公园吧"},
+                   {"role": "assistant", "content": "好呀"}]
+
+        async def run():
+            self.memory.trigger_update(history)
+            await self.memory._update_task
+
+        asyncio.run(run())
+
+        self.assertEqual(len(self.memory.llm.prompts), 2)
+        self.assertEqual(self.memory.memory_data["user_info"], "用户叫小明")
+        self.assertEqual(self.memory.memory_data["promises"], "约好明天去公园")
+        self.assertEqual(self.memory.last_processed_idx, 2)
+        self.assertFalse(self.memory.is_updating)
+
+        saved = json.loads(self.memory.memory_file.read_text(encoding="utf-8"))
+        self.assertEqual(saved["data"]["short_term"], "刚聊了天气")
+
+    def test_atomic_save_and_legacy_load(self):
+        """测试保存为带版本号的紧凑格式，且能读取旧的缩进格式"""
+        legacy = {"meta": {"last_processed_idx": 7}, "data": {"user_info": "旧档案"}}
+        self.memory.memory_file.write_text(json.dumps(legacy, ensure_ascii=False, indent=2), encoding="utf-8")
+        self.memory._load_memory()
+        self.assertEqual(self.memory.last_processed_idx, 7)
+        self.assertEqual(self.memory.memory_data["user_info"], "旧档案")
+
+        asyncio.run(self.memory.save_memory_async())
+        raw = self.memory.memory_file.read_text(encoding="utf-8")
+        self.assertNotIn("\n", raw)
+        self.assertEqual(json.loads(raw)["version"], 2)
+        self.assertEqual(list(self.memory.memory_dir.glob("*.tmp")), [])
+
+
+class TestMemorySystemEviction(unittest.TestCase):
+    def test_lru_eviction_saves_and_reloads(self):
+        """测试超出常驻上限时保存并卸载最久未使用的角色，再次切换时重新加载"""
+        created = []
+
+        def fake_memory_system(config, character_id):
+            system = MagicMock(is_updating=False, character_id=character_id)
+            system.initialize.return_value = True
+            created.append(system)
+            return system
+
+        with patch.dict("os.environ", {"MEMORY_MAX_RESIDENT_CHARACTERS": "2", "USE_RAG": "false"}), \
+                patch("ling_chat.core.memory.MemorySystem", side_effect=fake_memory_system):
+            manager = RAGManager()
+            for character_id in (1, 2, 1, 3):
+                manager.switch_rag_system_character(character_id)
+
+            self.assertEqual(list(manager.memory_systems_cache), [1, 3])
+            created[1].save_memory.assert_called_once()
+            created[0].save_memory.assert_not_called()
+
+            manager.switch_rag_system_character(2)
+            self.assertEqual(len(created), 4)
+            self.assertEqual(list(manager.memory_systems_cache), [3, 2])
+
+
+    def test_eviction_skips_updating_and_saves_async(self):
+        """测试正在后台总结的记忆库不被淘汰，事件循环中通过save_memory_async保存，退出时保存常驻的记忆库"""
+        created = {}
+
+        def fake_memory_system(config, character_id):
+            system = MagicMock(is_updating=False, character_id=character_id)
+            system.initialize.return_value = True
+            system.save_memory_async = AsyncMock()
+            created[character_id] = system
+            return system
+
+        async def run(manager):
+            manager.switch_rag_system_character(1)
+            created[1].is_updating = True
+            manager.switch_rag_system_character(2)
+            manager.switch_rag_system_character(3)
+            # 淘汰的记忆库保存完成前切换回来，复用同一个实例
+            manager.switch_rag_system_character(2)
+            # 退出时保存常驻的记忆库，并等待淘汰中的保存完成
+            await manager.force_save_memory()
+
+        with patch.dict("os.environ", {"MEMORY_MAX_RESIDENT_CHARACTERS": "2", "USE_RAG": "false"}), \
+                patch("ling_chat.core.memory.MemorySystem", side_effect=fake_memory_system):
+            manager = RAGManager()
+            asyncio.run(run(manager))
+
+        self.assertEqual(list(manager.memory_systems_cache), [1, 3, 2])
+        self.assertEqual(len(created), 3)
+        self.assertEqual(created[2].save_memory_async.await_count, 2)
+        created[2].save_memory.assert_not_called()
+        created[3].save_memory_async.assert_awaited_once()
+        created[1].save_memory_async.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
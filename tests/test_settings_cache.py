@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from ling_chat.utils.function import Function
+
+
+class TestSettingsCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.settings_path = Path(self.test_dir.name) / "settings.txt"
+        self.settings_path.write_text('title = 灵灵\nvoice_models = {"default": 1, "happy": 2}\n', encoding="utf-8")
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_cached_copy_and_invalidation(self):
+        """测试缓存返回独立副本，文件修改后重新解析"""
+        settings = Function.parse_enhanced_txt(str(self.settings_path))
+        self.assertEqual(settings["voice_models"], {"default": 1, "happy": 2})
+        self.assertEqual(settings["resource_path"], self.test_dir.name)
+
+        settings["voice_models"]["default"] = 99
+        self.assertEqual(Function.parse_enhanced_txt(str(self.settings_path))["voice_models"]["default"], 1)
+
+        self.settings_path.write_text('title = 钦灵\nvoice_models = {"default": 3}\n', encoding="utf-8")
+        os.utime(self.settings_path, ns=(0, self.settings_path.stat().st_mtime_ns + 10**9))
+        settings = Function.parse_enhanced_txt(str(self.settings_path))
+        self.assertEqual(settings["title"], "钦灵")
+        self.assertEqual(settings["voice_models"], {"default": 3})
+
+    def test_dict_values_are_not_executed(self):
+        """测试字典字段只按字面量解析，不会执行代码"""
+        self.settings_path.write_text('hook = {__import__("os").getpid(): 1}\n', encoding="utf-8")
+        settings = Function.parse_enhanced_txt(str(self.settings_path))
+        self.assertIsInstance(settings["hook"], str)
+
+
+if __name__ == '__main__':
+    unittest.main()
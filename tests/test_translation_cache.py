@@ -0,0 +1,107 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from ling_chat.core.ai_service.translation_cache import TranslationCache
+from ling_chat.core.ai_service.translator import Translator
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.requests = []
+
+    async def translate(self, text):
+        self.requests.append(text)
+        return f"ja:{text}"
+
+
+class FakeVoiceMaker:
+    async def generate_voice_files(self, segments):
+        pass
+
+
+class TestTranslationCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.test_dir.name) / "translation_cache.db"
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def _make_cache(self, **env) -> TranslationCache:
+        env.setdefault("TRANSLATION_CACHE", "true")
+        env.setdefault("TRANSLATION_CACHE_FUZZY", "0")
+        with patch.dict(os.environ, env):
+            cache = TranslationCache(self.db_path)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_exact_match_is_normalized(self):
+        """测试全半角与空白不同的原文命中同一条缓存"""
+        cache = self._make_cache()
+        cache.store_many([("你好，莱姆！", "こんにちは、レムちゃん！")])
+        self.assertEqual(cache.lookup("你好,莱姆!"), "こんにちは、レムちゃん！")
+        self.assertIsNone(cache.lookup("再见"))
+
+    def test_persists_across_instances(self):
+        """测试缓存写入磁盘后重新打开仍可命中"""
+        cache = self._make_cache()
+        cache.store_many([("早上好", "おはよう")])
+        cache.close()
+        self.assertEqual(self._make_cache().lookup("早上好"), "おはよう")
+
+    def test_fuzzy_match(self):
+        """测试开启近似匹配后相似句子命中，差异过大的句子不命中"""
+        cache = self._make_cache(TRANSLATION_CACHE_FUZZY="0.8")
+        cache.store_many([("今天的天气真不错呀", "今日はいい天気だね")])
+        self.assertEqual(cache.lookup("今天的天气真不错啊"), "今日はいい天気だね")
+        self.assertIsNone(cache.lookup("明天要去学校上课"))
+
+    def test_disabled(self):
+        """测试关闭缓存后不读写"""
+        cache = self._make_cache(TRANSLATION_CACHE="false")
+        cache.store_many([("早上好", "おはよう")])
+        self.assertIsNone(cache.lookup("早上好"))
+        self.assertFalse(self.db_path.exists())
+
+
+    def test_fuzzy_hit_not_stored_as_exact(self):
+        """测试近似命中的译文只用于本次合成，不会记为新原文的翻译"""
+        cache = self._make_cache(TRANSLATION_CACHE_FUZZY="0.8")
+        cache.store_many([("今天的天气真不错呀", "今日はいい天気だね")])
+        translator = Translator.__new__(Translator)
+        translator.cache = cache
+        translator.scheduler = FakeScheduler()
+        translator.voice_maker = FakeVoiceMaker()
+
+        segments = [{"following_text": "今天的天气真不错啊", "japanese_text": ""},
+                    {"following_text": "明天要去学校上课", "japanese_text": ""}]
+        asyncio.run(translator.translate_segments(segments))
+        self.assertEqual([seg["japanese_text"] for seg in segments], ["今日はいい天気だね", "ja:明天要去学校上课"])
+
+        cache.fuzzy_threshold = 0
+        self.assertIsNone(cache.lookup("今天的天气真不错啊"))
+        self.assertEqual(cache.lookup("明天要去学校上课"), "ja:明天要去学校上课")
+
+
+    def test_script_lines_use_cache(self):
+        """测试剧本台词（非流式翻译）同样查询并写入翻译缓存，重复的台词不再请求翻译"""
+        cache = self._make_cache()
+        translator = Translator.__new__(Translator)
+        translator.enable_translate = True
+        translator.cache = cache
+        translator.scheduler = FakeScheduler()
+        translator.voice_maker = FakeVoiceMaker()
+
+        for _ in range(2):
+            segments = [{"following_text": "欢迎回来", "japanese_text": ""},
+                        {"following_text": "今天也辛苦了", "japanese_text": ""}]
+            asyncio.run(translator.translate_ai_response(segments, script=True))
+            self.assertEqual([seg["japanese_text"] for seg in segments], ["ja:欢迎回来", "ja:今天也辛苦了"])
+        self.assertEqual(translator.scheduler.requests, ["欢迎回来", "今天也辛苦了"])
+
+if __name__ == '__main__':
+    unittest.main()
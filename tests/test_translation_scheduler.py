@@ -0,0 +1,140 @@
+import asyncio
+import os
+import unittest
+from unittest.mock import patch
+
+from ling_chat.core.ai_service.bracket_scanner import BracketScanner
+from ling_chat.core.ai_service.translation_scheduler import TranslationScheduler
+
+
+class FakeTranslatorLLM:
+    """把每个<句子>翻译为<ja:句子>（保留编号），并按小块流式返回的假翻译模型"""
+    def __init__(self, drop_last: bool = False, delay: float = 0, strip_numbers: bool = False,
+                 merge_first: bool = False):
+        self.requests = []
+        self.drop_last = drop_last
+        self.delay = delay
+        self.strip_numbers = strip_numbers
+        self.merge_first = merge_first
+
+    def _reply(self, messages) -> str:
+        content = messages[-1]["content"]
+        self.requests.append(content)
+        sentences = []
+        for sentence in content[1:-1].split("><"):
+            number, sep, text = sentence.partition(":")
+            if sep and not self.strip_numbers:
+                sentences.append(f"{number}:ja:{text}")
+            else:
+                sentences.append(f"ja:{text if sep else sentence}")
+        if self.drop_last:
+            sentences = sentences[:-1]
+        if self.merge_first and len(sentences) > 1:
+            sentences[:2] = [sentences[0] + sentences[1]]
+        return "".join(f"<{s}>" for s in sentences)
+
+    async def process_message_stream(self, messages):
+        reply = self._reply(messages)
+        for i in range(0, len(reply), 3):
+            yield reply[i:i + 3]
+
+    async def process_message_async(self, messages):
+        await asyncio.sleep(self.delay)
+        return self._reply(messages)
+
+
+class TestTranslationScheduler(unittest.TestCase):
+    def _make_scheduler(self, llm, **env) -> TranslationScheduler:
+        env.setdefault("TRANSLATE_BATCH_WINDOW", "20")
+        env.setdefault("TRANSLATE_STREAM", "true")
+        with patch.dict(os.environ, env):
+            return TranslationScheduler(llm, [{"role": "system", "content": ""}])
+
+    def test_batches_concurrent_sentences(self):
+        """测试同一窗口内的句子合并为一次请求且结果顺序正确"""
+        llm = FakeTranslatorLLM()
+        scheduler = self._make_scheduler(llm)
+
+        async def run():
+            return await asyncio.gather(*(scheduler.translate(t) for t in ["一", "二", "三"]))
+
+        results = asyncio.run(run())
+        self.assertEqual(results, ["ja:一", "ja:二", "ja:三"])
+        self.assertEqual(llm.requests, ["<1:一><2:二><3:三>"])
+
+    def test_max_batch_splits_requests(self):
+        """测试超过单批上限时拆分为多次请求"""
+        llm = FakeTranslatorLLM()
+        scheduler = self._make_scheduler(llm, TRANSLATE_BATCH_MAX="2")
+
+        async def run():
+            return await asyncio.gather(*(scheduler.translate(t) for t in ["一", "二", "三"]))
+
+        results = asyncio.run(run())
+        self.assertEqual(results, ["ja:一", "ja:二", "ja:三"])
+        self.assertEqual(llm.requests, ["<1:一><2:二>", "<三>"])
+
+    def test_missing_result_returns_none(self):
+        """测试翻译结果缺失的句子返回None而不是一直等待"""
+        scheduler = self._make_scheduler(FakeTranslatorLLM(drop_last=True))
+
+        async def run():
+            return await asyncio.gather(scheduler.translate("一"), scheduler.translate("二"))
+
+        self.assertEqual(asyncio.run(run()), ["ja:一", None])
+
+    def test_mismatched_unnumbered_result_falls_back(self):
+        """测试模型去掉编号并合并句子时不按位置错配，而是逐句重新翻译"""
+        llm = FakeTranslatorLLM(strip_numbers=True, merge_first=True)
+        scheduler = self._make_scheduler(llm)
+
+        async def run():
+            return await asyncio.gather(*(scheduler.translate(t) for t in ["一", "二", "三"]))
+
+        self.assertEqual(asyncio.run(run()), ["ja:一", "ja:二", "ja:三"])
+        self.assertEqual(llm.requests[1:], ["<一>", "<二>", "<三>"])
+
+    def test_unnumbered_result_with_matching_count(self):
+        """测试模型去掉编号但句子数一致时按顺序对应"""
+        llm = FakeTranslatorLLM(strip_numbers=True)
+        scheduler = self._make_scheduler(llm)
+
+        async def run():
+            return await asyncio.gather(scheduler.translate("一"), scheduler.translate("二"))
+
+        self.assertEqual(asyncio.run(run()), ["ja:一", "ja:二"])
+        self.assertEqual(len(llm.requests), 1)
+
+    def test_non_stream_request(self):
+        """测试非流式模式使用异步请求"""
+        llm = FakeTranslatorLLM()
+        scheduler = self._make_scheduler(llm, TRANSLATE_STREAM="false")
+
+        async def run():
+            return await asyncio.gather(scheduler.translate("一"), scheduler.translate("二"))
+
+        self.assertEqual(asyncio.run(run()), ["ja:一", "ja:二"])
+
+    def test_timeout_skips_voice(self):
+        """测试翻译超时后返回None而不是一直等待"""
+        llm = FakeTranslatorLLM(delay=1)
+        scheduler = self._make_scheduler(llm, TRANSLATE_STREAM="false", TRANSLATE_TIMEOUT="0.05")
+        self.assertIsNone(asyncio.run(scheduler.translate("一")))
+
+
+class TestBracketScanner(unittest.TestCase):
+    def test_sentences_split_across_chunks(self):
+        """测试跨chunk的句子被正确拼接，括号外的内容被忽略"""
+        scanner = BracketScanner()
+        self.assertEqual(scanner.feed("前缀<こん"), [])
+        self.assertEqual(scanner.feed("にちは><元気"), ["こんにちは"])
+        self.assertEqual(scanner.feed("？>中间<"), ["元気？"])
+        self.assertEqual(scanner.feed("またね>"), ["またね"])
+
+    def test_stray_close_bracket_ignored(self):
+        """测试孤立的>不会导致死循环或错位"""
+        self.assertEqual(BracketScanner().feed("a>b<c>"), ["c"])
+
+
+if __name__ == '__main__':
+    unittest.main()
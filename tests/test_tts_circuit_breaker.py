@@ -0,0 +1,137 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from ling_chat.core.TTS.base_adapter import TTSBaseAdapter
+from ling_chat.core.TTS import registry
+from ling_chat.core.TTS.circuit_breaker import CircuitBreaker, BreakerState
+from ling_chat.core.TTS.tts_provider import TTS
+from ling_chat.core.ai_service.voice_maker import VoiceMaker
+
+
+class FakeAdapter(TTSBaseAdapter):
+    """按顺序返回预设结果的假适配器"""
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+
+    async def generate_voice(self, text: str) -> bytes:
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def get_params(self):
+        return {}
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_threshold(self):
+        """测试连续失败达到阈值后熔断"""
+        breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=60)
+        breaker.record_failure("boom")
+        self.assertEqual(breaker.state, BreakerState.CLOSED)
+        breaker.record_failure("boom")
+        self.assertEqual(breaker.state, BreakerState.OPEN)
+        self.assertFalse(breaker.allow_request())
+
+    def test_half_open_probe(self):
+        """测试冷却结束后只放行一个探测请求，探测成功后恢复"""
+        breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0)
+        breaker.record_failure("boom")
+        self.assertTrue(breaker.allow_request())
+        self.assertEqual(breaker.state, BreakerState.HALF_OPEN)
+        self.assertFalse(breaker.allow_request())
+        breaker.record_success()
+        self.assertEqual(breaker.state, BreakerState.CLOSED)
+        self.assertTrue(breaker.allow_request())
+
+    def test_failed_probe_reopens(self):
+        """测试探测失败后重新熔断"""
+        breaker = CircuitBreaker("test", failure_threshold=5, recovery_timeout=0)
+        for _ in range(5):
+            breaker.record_failure("boom")
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure("still down")
+        self.assertEqual(breaker.state, BreakerState.OPEN)
+
+
+class TestTTSRecovery(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        env = {
+            "TEMP_VOICE_DIR": self.test_dir.name,
+            "TTS_MAX_RETRIES": "0",
+            "TTS_BREAKER_THRESHOLD": "1",
+            "TTS_BREAKER_RECOVERY": "0",
+        }
+        with patch.dict(os.environ, env):
+            self.tts = TTS()
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_voice_resumes_after_failure(self):
+        """测试TTS服务失败后不会被永久禁用"""
+        adapter = FakeAdapter([ConnectionError("down"), b"RIFF"])
+        self.tts.adapters["sbv2"] = adapter
+        output = os.path.join(self.test_dir.name, "a.wav")
+
+        first = asyncio.run(self.tts.generate_voice("こんにちは", output, tts_type="sbv2"))
+        self.assertIsNone(first)
+        self.assertTrue(self.tts.enable)
+
+        second = asyncio.run(self.tts.generate_voice("こんにちは", output, tts_type="sbv2"))
+        self.assertEqual(second, output)
+        self.assertEqual(self.tts.get_breaker("sbv2").state, BreakerState.CLOSED)
+
+    def test_retry_before_failure(self):
+        """测试单次请求失败会在熔断前重试"""
+        self.tts.max_retries = 1
+        self.tts.retry_base_delay = 0
+        adapter = FakeAdapter([TimeoutError(), b"RIFF"])
+        self.tts.adapters["sbv2"] = adapter
+        output = os.path.join(self.test_dir.name, "b.wav")
+
+        result = asyncio.run(self.tts.generate_voice("テスト", output, tts_type="sbv2"))
+        self.assertEqual(result, output)
+        self.assertEqual(adapter.calls, 2)
+
+
+
+class TestAdapterRegistry(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        with patch.dict(os.environ, {"TEMP_VOICE_DIR": self.test_dir.name}):
+            self.voice_maker = VoiceMaker()
+
+    def tearDown(self):
+        registry.TTS_ADAPTERS.pop("fake", None)
+        self.test_dir.cleanup()
+
+    def test_registered_backend_needs_no_voice_maker_changes(self):
+        """测试注册的新后端由注册表中的configure完成初始化"""
+        registry.register_adapter("fake", __name__, "FakeAdapter", lang="zh",
+                                  configure=lambda settings, path, fmt: {"results": [settings["fake_reply"]]})
+        with patch.dict(os.environ, {"TTS_TYPE": ""}):
+            self.voice_maker.set_tts("fake", {"fake_reply": b"RIFF"}, "测试角色")
+        adapter = self.voice_maker.tts_provider.get_adapter("fake")
+        self.assertIsInstance(adapter, FakeAdapter)
+        self.assertEqual(adapter.results, [b"RIFF"])
+        self.assertEqual(self.voice_maker.lang, "zh")
+
+    def test_missing_settings_fall_back_to_character_default(self):
+        """测试环境变量指定的后端缺少角色卡设置时回退到角色卡的默认后端"""
+        registry.register_adapter("fake", __name__, "FakeAdapter",
+                                  configure=lambda settings, path, fmt: {"results": []})
+        with patch.dict(os.environ, {"TTS_TYPE": "sbv2"}):
+            self.voice_maker.set_tts("fake", {}, "测试角色")
+        self.assertEqual(self.voice_maker.tts_type, "fake")
+        self.assertIsNone(self.voice_maker.tts_provider.get_adapter("sbv2"))
+
+
+if __name__ == '__main__':
+    unittest.main()
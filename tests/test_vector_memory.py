@@ -0,0 +1,76 @@
+import asyncio
+import unittest
+
+import chromadb
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+
+from ling_chat.core.ai_service.rag_manager import RAGManager
+from ling_chat.core.ai_service.vector_memory import VectorMemory
+
+
+class CharHistogramEmbedding(EmbeddingFunction):
+    """按字符分桶计数的假向量化函数，字面相近的文本向量相近"""
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vector = np.zeros(64, dtype=np.float32)
+            for char in text:
+                vector[ord(char) % 64] += 1
+            vectors.append(vector / (np.linalg.norm(vector) or 1))
+        return vectors
+
+    @staticmethod
+    def name():
+        return "char-histogram"
+
+
+def build_history(count):
+    messages = [{"role": "system", "content": "你是一个助手"}]
+    for i in range(count):
+        messages.append({"role": "user", "content": f"第{i}次聊天，我们聊到了话题{i}"})
+        messages.append({"role": "assistant", "content": f"收到{i}"})
+    return messages
+
+
+class TestVectorMemory(unittest.TestCase):
+    def setUp(self):
+        self.client = chromadb.EphemeralClient()
+        self.vector_memory = VectorMemory(9001, embedding_function=CharHistogramEmbedding(), client=self.client)
+        self.vector_memory.latency_budget = 5
+
+    def tearDown(self):
+        self.client.delete_collection("char_9001_memory")
+
+    def test_incremental_index_and_exclude_context(self):
+        """测试增量索引按ID去重，且检索结果不包含仍在上下文中的对话"""
+        history = build_history(10)
+        self.assertEqual(self.vector_memory.index_messages(history), 10)
+        self.assertEqual(self.vector_memory.index_messages(history), 0)
+
+        context = history[-2:]
+        documents = asyncio.run(self.vector_memory.retrieve("话题9", context))
+        self.assertEqual(len(documents), self.vector_memory.top_k)
+        self.assertFalse(any("话题9" in doc for doc in documents))
+
+    def test_rag_manager_inserts_after_system_messages(self):
+        """测试检索结果插入在开头的系统消息之后"""
+        history = build_history(5)
+        self.vector_memory.index_messages(history)
+        manager = RAGManager()
+        manager.active_vector_memory = self.vector_memory
+
+        context = [history[0], {"role": "system", "content": "记忆库"}] + history[-2:]
+        rag_messages = []
+        asyncio.run(manager.rag_append_retrieved_messages(context, rag_messages, "话题1"))
+
+        self.assertEqual(len(rag_messages), 1)
+        self.assertIs(context[2], rag_messages[0])
+        self.assertEqual(context[3]["role"], "user")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from ling_chat.core.TTS.voice_janitor import VoiceJanitor
+
+
+class TestVoiceJanitor(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.voice_dir = Path(self.test_dir.name)
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def _make_janitor(self, **env) -> VoiceJanitor:
+        env.setdefault("VOICE_CACHE_TTL_HOURS", "24")
+        env.setdefault("VOICE_CACHE_MAX_MB", "512")
+        env["TEMP_VOICE_DIR"] = str(self.voice_dir)
+        janitor = VoiceJanitor()
+        with patch.dict(os.environ, env):
+            janitor._load_config()
+        return janitor
+
+    def _make_file(self, name: str, size: int, age_seconds: float) -> Path:
+        path = self.voice_dir / name
+        path.write_bytes(b"\0" * size)
+        mtime = time.time() - age_seconds
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_evicts_expired_files(self):
+        """测试超过保留时间的文件被删除"""
+        janitor = self._make_janitor(VOICE_CACHE_TTL_HOURS="1")
+        old = self._make_file("old.wav", 10, 7200)
+        new = self._make_file("new.wav", 10, 10)
+
+        removed, _ = janitor.sweep()
+        self.assertEqual(removed, 1)
+        self.assertFalse(old.exists())
+        self.assertTrue(new.exists())
+
+    def test_evicts_oldest_until_under_limit(self):
+        """测试超出大小上限时从最旧的文件开始删除"""
+        janitor = self._make_janitor()
+        janitor.max_bytes = 250
+        files = [self._make_file(f"{i}.wav", 100, 100 - i) for i in range(4)]
+
+        janitor.sweep()
+        self.assertEqual([f.exists() for f in files], [False, False, True, True])
+
+    def test_recent_files_are_protected(self):
+        """测试最近回复引用的文件不会被删除"""
+        janitor = self._make_janitor(VOICE_CACHE_TTL_HOURS="1")
+        protected = self._make_file("keep.wav", 10, 7200)
+        other = self._make_file("other.txt", 10, 7200)
+        janitor.register(str(protected))
+
+        removed, _ = janitor.sweep()
+        self.assertEqual(removed, 0)
+        self.assertTrue(protected.exists())
+        self.assertTrue(other.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()